@@ -0,0 +1,151 @@
+import json
+import os
+import time
+
+from journal import row_key
+from ranking import MODEL, TEMPERATURE, build_messages, format_company_prompt, request_options, system_prompt_for
+
+
+# Offline mode through the OpenAI Batch API: every company becomes one line of a
+# JSONL request file, results come back within the completion window at lower cost.
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def default_state_path(output_file):
+    return os.path.splitext(output_file)[0] + ".batch.json"
+
+
+def custom_id(idx, row):
+    # Row index plus a fingerprint of the row, so results are never applied to a changed input
+    return f"row-{idx}-{row_key(row)[:12]}"
+
+
+def write_batch_requests(rows, requests_file):
+    count = 0
+    with open(requests_file, "w", encoding="utf-8") as f:
+        for idx, row in rows:
+            request = {
+                "custom_id": custom_id(idx, row),
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": MODEL,
+                    "temperature": TEMPERATURE,
+                    "messages": build_messages(format_company_prompt(row), system_prompt_for(row)[0]),
+                    **request_options()
+                }
+            }
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def load_state(state_file):
+    if not os.path.exists(state_file):
+        return None
+    with open(state_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state_file, state):
+    with open(state_file + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(state_file + ".tmp", state_file)
+
+
+def submit_batch(client, requests_file, state_file, input_file):
+    with open(requests_file, "rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+        metadata={"input": os.path.basename(input_file)}
+    )
+    save_state(state_file, {
+        "batch_id": batch.id,
+        "input_file_id": uploaded.id,
+        "requests_file": requests_file,
+        "input": input_file,
+        "submitted_at": time.time()
+    })
+    print(f"📤 Submitted batch {batch.id} ({batch.status}); state saved to {state_file}")
+    return batch
+
+
+def poll_batch(client, batch_id, interval=30.0, wait=True):
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        done = f"{counts.completed}/{counts.total}" if counts else "?"
+        print(f"⏱️ Batch {batch_id}: {batch.status} ({done} requests done)")
+        if batch.status in FINAL_STATUSES or not wait:
+            return batch
+        time.sleep(interval)
+
+
+def _read_file(client, file_id):
+    if not file_id:
+        return []
+    content = client.files.content(file_id)
+    text = content.text if hasattr(content, "text") else content.read().decode("utf-8")
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _body_usage(body):
+    usage = body.get("usage") or {}
+    prompt_tokens = usage.get("prompt_tokens") or 0
+    cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+    return {
+        "source": "batch_api",
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "uncached_tokens": prompt_tokens - cached_tokens,
+        "completion_tokens": usage.get("completion_tokens") or 0,
+        "total_tokens": usage.get("total_tokens")
+    }
+
+
+def download_results(client, batch):
+    # Returns {custom_id: (markdown response, usage)} for every successful request
+    results = {}
+    for item in _read_file(client, batch.output_file_id):
+        response = item.get("response") or {}
+        if item.get("error") or response.get("status_code") != 200:
+            continue
+        body = response.get("body") or {}
+        results[item["custom_id"]] = (body["choices"][0]["message"]["content"].strip(), _body_usage(body))
+    for item in _read_file(client, batch.error_file_id):
+        error = item.get("error") or {}
+        print(f"❌ Batch request {item.get('custom_id')} failed: {error.get('message', error)}")
+    return results
+
+
+def ingest_batch(client, state_file, rows, on_result, local_analysis=None):
+    # Feeds finished batch results through on_result(idx, row, markdown_row, usage) in
+    # input order; rows without a result are reported and left for a --resume run.
+    state = load_state(state_file)
+    if state is None:
+        raise ValueError(f"No submitted batch found in {state_file}. Run with --batch-api submit first.")
+    batch = poll_batch(client, state["batch_id"], wait=False)
+    if batch.status != "completed":
+        print(f"⚠️ Batch {batch.id} is {batch.status}; nothing to ingest yet.")
+        return 0
+
+    results = download_results(client, batch)
+    missing = 0
+    for idx, row in rows:
+        local_result = local_analysis(idx, row) if local_analysis is not None else None
+        if local_result is not None:
+            on_result(idx, row, *local_result)
+            continue
+        result = results.get(custom_id(idx, row))
+        if result is None:
+            missing += 1
+            continue
+        on_result(idx, row, *result)
+    if missing:
+        print(f"⚠️ {missing} companies had no batch result; rerun them with --resume")
+    return len(results)
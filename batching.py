@@ -0,0 +1,96 @@
+import re
+import time
+
+from entities import normalize_domain
+from prompts import ROM_FDI_BATCH_COMPANY_TEMPLATE, ROM_FDI_BATCH_TEMPLATE, ROM_FDI_STRUCTURED_BATCH_TEMPLATE
+from ranking import build_messages, complete_chat_async, format_company, request_options, structured_output_enabled
+from schema import company_record
+from structured import split_structured_batch
+
+
+def company_key(row):
+    # Stable key the model copies into its answer: the website domain, or the firm name
+    company = company_record(row)
+    domain = normalize_domain(company.company_website)
+    if domain:
+        return domain
+    name = re.sub(r'[^a-z0-9]+', '-', company.firm_name.lower()).strip('-')
+    return name or 'company'
+
+
+def assign_company_keys(rows):
+    # Keys must be unique inside one request, so repeated domains get a suffix
+    keys, seen = [], {}
+    for row in rows:
+        key = company_key(row)
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}#{seen[key]}")
+    return keys
+
+
+def format_batch_prompt(rows, keys):
+    companies = "".join(
+        format_company(ROM_FDI_BATCH_COMPANY_TEMPLATE, row, company_key=key)
+        for row, key in zip(rows, keys)
+    )
+    template = ROM_FDI_STRUCTURED_BATCH_TEMPLATE if structured_output_enabled() else ROM_FDI_BATCH_TEMPLATE
+    return template.format(count=len(rows), companies=companies)
+
+
+def _normalize_key(key):
+    return key.strip().strip('`*[]"\'').lower()
+
+
+def split_batch_response(content, keys):
+    # Maps every Company Key to a single-company 9-column row; keys whose row is
+    # missing or malformed are left out so the caller can fall back to single calls.
+    wanted = {_normalize_key(key): key for key in keys}
+    rows = {}
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line.startswith('|'):
+            continue
+        parts = [part.strip() for part in line.strip('|').split('|')]
+        if len(parts) < 10:
+            continue
+        key = wanted.get(_normalize_key(parts[0]))
+        if key is None or key in rows:
+            continue
+        if not re.search(r'\d', parts[4]):
+            continue
+        rows[key] = "| " + " | ".join(parts[1:10]) + " |"
+    return rows
+
+
+def split_usage(usage, count):
+    # Attribute a batch request's tokens evenly to the companies it covered
+    shared = dict(usage)
+    shared["source"] = "batch"
+    for field in ("prompt_tokens", "cached_tokens", "uncached_tokens", "completion_tokens", "total_tokens"):
+        if shared.get(field):
+            shared[field] = shared[field] // count
+    return shared
+
+
+async def analyze_batch_async(rows, client):
+    # Returns one (markdown response, usage) per row, or None where the batch answer
+    # had no usable row for that company
+    started = time.perf_counter()
+    keys = assign_company_keys(rows)
+    messages = build_messages(format_batch_prompt(rows, keys))
+    prompt_seconds = time.perf_counter() - started
+    label = f"batch of {len(rows)} ({keys[0]} ...)"
+    content, usage = await complete_chat_async(messages, client, label, request_options(batch=True))
+    if content == "API_ERROR":
+        return [None] * len(rows)
+
+    if structured_output_enabled():
+        by_key = split_structured_batch(content, keys)
+    else:
+        by_key = split_batch_response(content, keys)
+    found = len(by_key)
+    if found < len(rows):
+        print(f"⚠️ Batch answer covered {found}/{len(rows)} companies, falling back to single calls for the rest")
+    row_usage = split_usage(usage, max(found, 1))
+    row_usage["prompt_seconds"] = round(prompt_seconds / len(rows), 6)
+    return [(by_key[key], row_usage) if key in by_key else None for key in keys]
@@ -0,0 +1,50 @@
+import argparse
+import json
+import timeit
+
+from local_openai import canned_analysis
+from main import parse_analysis_response
+
+
+# Micro-benchmark of the two parse paths in main.parse_analysis_response: the
+# structured-output (JSON) answer against the markdown table row, plus a drifted
+# prose answer that exercises the regex and keyword fallbacks.
+
+def sample_responses(names):
+    messages = [[{"role": "user", "content": f"Company Name: {name}"}] for name in names]
+    prose_lines = [
+        "ANALYSIS:",
+        "The company shows strong growth and a clear ambition to expand into Europe over the coming years.",
+        "Its Dutch market presence is limited, but partners in Amsterdam and Eindhoven are a natural fit.",
+        "Overall I would rate this firm with a score: 68 given the funding and patents.",
+        "Sources: LinkedIn posts about EU hiring and a news item on the Series B round in 2024.",
+    ]
+    return {
+        "structured": [canned_analysis(m, structured=True) for m in messages],
+        "markdown": [canned_analysis(m) for m in messages],
+        "fallback": ["\n".join(prose_lines * 4).replace("Company", name) for name in names]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare structured-output and markdown response parsing")
+    parser.add_argument("--rows", type=int, default=500, help="Distinct responses per parse path")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats; the best run is reported")
+    args = parser.parse_args(argv)
+
+    responses = sample_responses([f"Company {i}" for i in range(args.rows)])
+    baseline = None
+    for path, items in responses.items():
+        parsed = [parse_analysis_response(item) for item in items]
+        valid = sum(1 for result in parsed if result[1] != "N/A")
+        best = min(timeit.repeat(lambda: [parse_analysis_response(item) for item in items],
+                                 number=1, repeat=args.repeat))
+        per_row = best / len(items) * 1e6
+        baseline = baseline or per_row
+        print(f"{path:>10}: {per_row:8.1f} µs/response  ({per_row / baseline:.1f}x structured), "
+              f"{valid}/{len(items)} with a score")
+    print(json.dumps(parse_analysis_response(responses["structured"][0]), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
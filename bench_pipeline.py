@@ -0,0 +1,185 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from local_openai import RESPONSE_SHAPES, Behavior, make_server
+
+
+# End-to-end throughput benchmark: starts local_openai.py in-process with the given
+# latency, jitter, 429 rate and answer shape, then runs main.py as a subprocess for
+# every input size x concurrency combination. Reports rows/sec, the child's memory
+# high-water mark and the bytes it wrote, so hot-path regressions show up without
+# spending API credits.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs main.main() and records the child's own peak RSS and write I/O on exit
+CHILD = """
+import json, os, resource, sys
+sys.path.insert(0, {script_dir!r})
+import main
+main.main(sys.argv[1:])
+io = {{}}
+if os.path.exists("/proc/self/io"):
+    with open("/proc/self/io") as f:
+        io = dict(line.strip().split(": ") for line in f if ": " in line)
+usage = resource.getrusage(resource.RUSAGE_SELF)
+with open(os.environ["BENCH_STATS"], "w") as f:
+    json.dump({{"max_rss_kb": usage.ru_maxrss, "wchar": int(io.get("wchar", 0)),
+               "write_bytes": int(io.get("write_bytes", 0)), "out_blocks": usage.ru_oublock}}, f)
+"""
+
+INDUSTRIES = ["Software, AI", "Medical Devices, Biotech", "Energy, Battery Technology",
+              "Payments, Fintech", "Education Technology", "Manufacturing, Industrial"]
+CITIES = [("Berlin", "Germany"), ("Boston", "United States"), ("Lyon", "France"),
+          ("Toronto", "Canada"), ("Utrecht", "Netherlands"), ("Seoul", "South Korea")]
+
+
+def write_input(path, rows, dutch_share):
+    headers = ["Firm name", "Company Website", "Booth nr", "Company Summary", "All Industries", "Revenue",
+               "Employees", "Year Founded", "Total funding (EUR M)", "Last round", "HQ Country", "HQ City",
+               "Other office locations", "LinkedIn URL", "In Achilles", "In NL?"]
+    dutch_every = int(1 / dutch_share) if dutch_share > 0 else 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=headers)
+        writer.writeheader()
+        for i in range(rows):
+            city, country = CITIES[i % 4]
+            if dutch_every and i % dutch_every == 0:
+                city, country = CITIES[4]
+            writer.writerow({
+                "Firm name": f"Bench Company {i}",
+                "Company Website": f"https://bench{i}.example.com",
+                "Booth nr": f"B{i % 300}",
+                "Company Summary": f"Bench Company {i} develops {INDUSTRIES[i % len(INDUSTRIES)].lower()} "
+                                   "products for enterprise customers in Europe and North America.",
+                "All Industries": INDUSTRIES[i % len(INDUSTRIES)],
+                "Revenue": ";;;;;;;;;" + str(5 + i % 50) + ";;",
+                "Employees": str(10 + i % 400),
+                "Year Founded": str(2000 + i % 24),
+                "Total funding (EUR M)": str(i % 80),
+                "Last round": ["Seed", "Series A", "Series B", "Series C"][i % 4],
+                "HQ Country": country,
+                "HQ City": city,
+                "Other office locations": "London; Paris",
+                "LinkedIn URL": f"https://www.linkedin.com/company/bench{i}",
+                "In Achilles": "No",
+                "In NL?": "Unknown"
+            })
+
+
+def read_summary(metrics_file):
+    summary = None
+    if os.path.exists(metrics_file):
+        with open(metrics_file, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if "summary" in record:
+                    summary = record["summary"]
+    return summary or {}
+
+
+def run_case(workdir, input_file, rows, concurrency, base_url, extra_args):
+    case_dir = os.path.join(workdir, f"rows{rows}_c{concurrency}")
+    os.makedirs(case_dir, exist_ok=True)
+    stats_file = os.path.join(case_dir, "child_stats.json")
+    metrics_file = os.path.join(case_dir, "output.metrics.jsonl")
+    # The account limits are lifted so the stand-in's latency is what is measured;
+    # pass --tpm/--rpm after the benchmark options to include the rate limiter
+    argv = ["--input", input_file, "--output", os.path.join(case_dir, "output.csv"),
+            "--concurrency", str(concurrency), "--no-cache", "--metrics", metrics_file,
+            "--tpm", "100000000", "--rpm", "1000000"] + extra_args
+    env = dict(os.environ, OPENAI_BASE_URL=base_url, BENCH_STATS=stats_file,
+               OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "bench-key"))
+
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", CHILD.format(script_dir=SCRIPT_DIR)] + argv,
+                            env=env, cwd=case_dir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise RuntimeError(f"main.py failed for {rows} rows at concurrency {concurrency}")
+
+    with open(stats_file) as f:
+        stats = json.load(f)
+    summary = read_summary(metrics_file)
+    return {
+        "rows": rows,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 2),
+        "rows_per_second": round(rows / elapsed, 2),
+        "max_rss_mb": round(stats["max_rss_kb"] / 1024, 1),
+        "written_mb": round(stats["wchar"] / 1024 / 1024, 2),
+        "disk_write_mb": round(stats["write_bytes"] / 1024 / 1024, 2),
+        "p50_seconds": summary.get("latency", {}).get("p50"),
+        "p95_seconds": summary.get("latency", {}).get("p95"),
+        "retries": summary.get("retries"),
+        "fallback_parses": summary.get("parse_methods", {}).get("fallback", 0)
+    }
+
+
+def parse_list(value):
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark main.py end to end against the local OpenAI stand-in")
+    parser.add_argument("--sizes", type=parse_list, default=[50, 200], help="Comma-separated input sizes (rows)")
+    parser.add_argument("--concurrency", type=parse_list, default=[1, 5, 20],
+                        help="Comma-separated --concurrency levels")
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds per stand-in chat completion")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Random +/- seconds added to --latency")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--shape", choices=RESPONSE_SHAPES, default="table", help="Shape of the canned answers")
+    parser.add_argument("--dutch-share", type=float, default=0.1,
+                        help="Share of generated companies located in Utrecht (scored by the pre-screen)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary run directory")
+    args, extra_args = parser.parse_known_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    behavior = Behavior(args.latency, args.jitter, args.rate_429, args.shape, args.seed)
+    server = make_server(os.path.join(workdir, "stand_in"), 0, behavior=behavior)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    print(f"🧪 Stand-in API on {base_url}: latency {args.latency}s ±{args.jitter}s, "
+          f"{args.rate_429:.0%} 429s, '{args.shape}' answers")
+
+    results = []
+    try:
+        for rows in args.sizes:
+            input_file = os.path.join(workdir, f"input_{rows}.csv")
+            write_input(input_file, rows, args.dutch_share)
+            for concurrency in args.concurrency:
+                result = run_case(workdir, input_file, rows, concurrency, base_url, extra_args)
+                results.append(result)
+                print(f"🚀 {rows:>6} rows, concurrency {concurrency:>3}: {result['rows_per_second']:>7} rows/s, "
+                      f"p50 {result['p50_seconds']}s, p95 {result['p95_seconds']}s, "
+                      f"peak RSS {result['max_rss_mb']} MB, written {result['written_mb']} MB "
+                      f"({result['disk_write_mb']} MB to disk), {result['retries']} retries, "
+                      f"{result['fallback_parses']} fallback parses")
+    finally:
+        server.shutdown()
+        server.server_close()
+        if args.keep:
+            print(f"📁 Run directory kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results saved to {args.json}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
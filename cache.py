@@ -0,0 +1,195 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_CACHE_PATH = "Project/response_cache.sqlite"
+
+
+def cache_key(messages, model, temperature):
+    # Content address of a request: any change to the formatted prompt (row data or
+    # ROM_FDI_PROMPT_TEMPLATE), the model or the temperature yields a new key.
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": messages},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                temperature REAL NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE responses SET hits = hits + 1, last_used_at = ? WHERE key = ?",
+                (time.time(), key)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key, model, temperature, response):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, temperature, response, size, created_at, last_used_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, model, temperature, response, len(response.encode('utf-8')), now, now)
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            count, total_bytes, oldest, newest, hits = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), MIN(created_at), MAX(created_at), COALESCE(SUM(hits), 0) "
+                "FROM responses"
+            ).fetchone()
+            models = self._conn.execute(
+                "SELECT model, COUNT(*) FROM responses GROUP BY model ORDER BY COUNT(*) DESC"
+            ).fetchall()
+        return {
+            "entries": count,
+            "bytes": total_bytes,
+            "oldest": oldest,
+            "newest": newest,
+            "hits": hits,
+            "models": dict(models)
+        }
+
+    def entries(self, limit=20):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, model, temperature, size, created_at, last_used_at, hits, substr(response, 1, 80) "
+                "FROM responses ORDER BY last_used_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+    def prune(self, max_age_days=None, max_entries=None, max_bytes=None):
+        # Age-based expiry first, then least-recently-used eviction down to the size limits
+        removed = 0
+        with self._lock:
+            if max_age_days is not None:
+                cutoff = time.time() - max_age_days * 86400
+                removed += self._conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,)).rowcount
+            if max_entries is not None:
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                    (max_entries,)
+                ).rowcount
+            if max_bytes is not None:
+                keep, total = [], 0
+                for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used_at DESC"):
+                    total += size
+                    if total > max_bytes:
+                        break
+                    keep.append(key)
+                self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_keys (key TEXT PRIMARY KEY)")
+                self._conn.execute("DELETE FROM keep_keys")
+                self._conn.executemany("INSERT INTO keep_keys (key) VALUES (?)", ((key,) for key in keep))
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE key NOT IN (SELECT key FROM keep_keys)"
+                ).rowcount
+            self._conn.commit()
+        return removed
+
+    def clear(self):
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM responses").rowcount
+            self._conn.commit()
+        return removed
+
+    def vacuum(self):
+        with self._lock:
+            self._conn.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _format_time(timestamp):
+    if timestamp is None:
+        return "-"
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and prune the OpenAI response cache")
+    parser.add_argument("--path", default=DEFAULT_CACHE_PATH, help="Cache database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Show number of entries, size and hits")
+    list_parser = commands.add_parser("list", help="Show the most recently used entries")
+    list_parser.add_argument("--limit", type=int, default=20)
+    prune_parser = commands.add_parser("prune", help="Evict entries by age and/or size")
+    prune_parser.add_argument("--max-age-days", type=float)
+    prune_parser.add_argument("--max-entries", type=int)
+    prune_parser.add_argument("--max-mb", type=float)
+    commands.add_parser("clear", help="Remove all entries")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(f"No cache found at {args.path}")
+        return
+
+    cache = ResponseCache(args.path)
+    try:
+        if args.command == "stats":
+            stats = cache.stats()
+            print(f"📦 Cache: {args.path}")
+            print(f"Entries: {stats['entries']}")
+            print(f"Size: {stats['bytes'] / 1024:.1f} KB")
+            print(f"Hits: {stats['hits']}")
+            print(f"Oldest: {_format_time(stats['oldest'])}  Newest: {_format_time(stats['newest'])}")
+            for model, count in stats['models'].items():
+                print(f"  {model}: {count}")
+        elif args.command == "list":
+            for key, model, temperature, size, created, used, hits, preview in cache.entries(args.limit):
+                print(f"{key[:12]}  {model}@{temperature}  {size}B  created {_format_time(created)}  "
+                      f"used {_format_time(used)}  hits {hits}  {preview!r}")
+        elif args.command == "prune":
+            max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+            removed = cache.prune(args.max_age_days, args.max_entries, max_bytes)
+            cache.vacuum()
+            print(f"🧹 Removed {removed} entries")
+        elif args.command == "clear":
+            removed = cache.clear()
+            cache.vacuum()
+            print(f"🧹 Removed {removed} entries")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
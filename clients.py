@@ -0,0 +1,85 @@
+import os
+
+import httpx
+import openai
+from dotenv import load_dotenv
+
+
+# Process-wide OpenAI clients. The .env file is read once and every request reuses
+# the same keep-alive connection pool, so a row only pays for the model's time
+# instead of a new TLS handshake.
+
+DEFAULT_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '120'))
+CONNECT_TIMEOUT = 10.0
+DEFAULT_MAX_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 90.0
+
+_env_loaded = False
+_client_options = {"timeout": DEFAULT_TIMEOUT, "max_connections": DEFAULT_MAX_CONNECTIONS}
+_client = None
+_async_client = None
+
+
+def load_env():
+    # Load the .env file next to this script once per process
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+    try:
+        if os.path.exists(env_path):
+            load_dotenv(env_path)
+    except Exception as e:
+        print(f"⚠️ Warning: Could not load .env file: {e}")
+
+
+def get_api_key():
+    load_env()
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        raise ValueError("No OpenAI API key found. Please set OPENAI_API_KEY environment variable or check your .env file.")
+    return api_key
+
+
+def configure_clients(timeout=DEFAULT_TIMEOUT, max_connections=DEFAULT_MAX_CONNECTIONS):
+    # Call once at startup, before the first request; later calls replace the sync client
+    global _client
+    _client_options.update(timeout=timeout, max_connections=max(1, max_connections))
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def _http_options():
+    max_connections = _client_options["max_connections"]
+    return dict(
+        timeout=httpx.Timeout(_client_options["timeout"], connect=CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                            keepalive_expiry=KEEPALIVE_EXPIRY),
+        follow_redirects=True
+    )
+
+
+def get_client():
+    # Shared openai.OpenAI client, created on first use; honors OPENAI_BASE_URL
+    global _client
+    if _client is None:
+        _client = openai.OpenAI(api_key=get_api_key(), http_client=httpx.Client(**_http_options()))
+    return _client
+
+
+def get_async_client():
+    # Shared openai.AsyncOpenAI client. Its connections belong to the running event
+    # loop, so close it with close_async_client() before that loop ends.
+    global _async_client
+    if _async_client is None:
+        _async_client = openai.AsyncOpenAI(api_key=get_api_key(), http_client=httpx.AsyncClient(**_http_options()))
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        client, _async_client = _async_client, None
+        await client.close()
@@ -0,0 +1,144 @@
+import asyncio
+from collections import OrderedDict, deque
+
+from batching import analyze_batch_async
+from clients import close_async_client, get_async_client
+from ranking import analyze_company_async, empty_usage
+
+# Entity keys of recently scheduled analyses kept for folding duplicate rows; older
+# duplicates are answered from the persistent entity index instead
+DEDUPE_WINDOW = 4096
+
+
+async def _follow(original):
+    # A duplicate row gets the analysis of the first row of its entity, without its tokens
+    content, _ = await original
+    return content, empty_usage("duplicate")
+
+
+async def _analyze_rows(rows, concurrency, on_result, local_analysis, batch_size, entity_keys, router, prefetch):
+    client = get_async_client()
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+
+    async def analyze(row):
+        # The website is fetched before taking a slot, so it overlaps other rows' API calls
+        if prefetch is not None:
+            await prefetch.prefetch(row)
+        async with semaphore:
+            return await analyze_company_async(row, client)
+
+    async def escalate(row, first):
+        # Second tier: borderline or unparsed first-pass answers go to the stronger model
+        content, usage = await first
+        reason = router.escalation_reason(content)
+        if reason is None:
+            return content, router.kept(content, usage)
+        async with semaphore:
+            second = await analyze_company_async(row, client, model=router.model, slim=False)
+        return router.escalated(content, usage, *second, reason)
+
+    async def analyze_batch(batch):
+        try:
+            if prefetch is not None:
+                await asyncio.gather(*(prefetch.prefetch(row) for row, _ in batch))
+            async with semaphore:
+                results = await analyze_batch_async([row for row, _ in batch], client)
+            missing = []
+            for (row, future), result in zip(batch, results):
+                if result is None:
+                    missing.append((row, future))
+                else:
+                    future.set_result(result)
+            # Companies missing from the batch answer fall back to single-company calls
+            retried = await asyncio.gather(*(analyze(row) for row, _ in missing))
+            for (_, future), result in zip(missing, retried):
+                future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    # Rows are scheduled in a sliding window so a slow company at the head cannot let
+    # finished results pile up without bound while still keeping results in input order.
+    window = max(concurrency * batch_size * 2, 1)
+    pending = deque()
+    batch = []
+    batch_tasks = set()
+    recent = OrderedDict()
+
+    def flush_batch():
+        nonlocal batch
+        if batch:
+            task = asyncio.ensure_future(analyze_batch(batch))
+            batch_tasks.add(task)
+            task.add_done_callback(batch_tasks.discard)
+            batch = []
+
+    async def emit_head():
+        head_idx, head_row, future, first = pending.popleft()
+        scheduled = first if first is not None else future
+        if any(scheduled is queued for _, queued in batch):
+            flush_batch()
+        result = await future
+        # on_result (the writer's bounded put) may block, so it runs off the event loop
+        # and in-flight requests keep going while the writer catches up
+        await loop.run_in_executor(None, on_result, head_idx, head_row, *result)
+
+    try:
+        for idx, row in rows:
+            local_result = local_analysis(idx, row) if local_analysis is not None else None
+            keys = entity_keys(row) if entity_keys is not None else ()
+            original = next((recent[key] for key in keys if key in recent), None)
+            first = None
+            if local_result is not None:
+                future = loop.create_future()
+                future.set_result(local_result)
+            elif original is not None:
+                future = asyncio.ensure_future(_follow(original))
+            else:
+                if batch_size > 1:
+                    future = loop.create_future()
+                    batch.append((row, future))
+                    if len(batch) >= batch_size:
+                        flush_batch()
+                else:
+                    future = asyncio.ensure_future(analyze(row))
+                if router is not None:
+                    first, future = future, asyncio.ensure_future(escalate(row, future))
+                for key in keys:
+                    recent[key] = future
+                    recent.move_to_end(key)
+                while len(recent) > DEDUPE_WINDOW:
+                    recent.popitem(last=False)
+            pending.append((idx, row, future, first))
+            if len(pending) >= window:
+                await emit_head()
+
+        flush_batch()
+        while pending:
+            await emit_head()
+    finally:
+        for _, _, future, first in pending:
+            future.cancel()
+            if first is not None:
+                first.cancel()
+        for task in list(batch_tasks):
+            task.cancel()
+        if prefetch is not None:
+            await prefetch.aclose()
+        await close_async_client()
+
+
+def run_analyses(rows, concurrency, on_result, local_analysis=None, batch_size=1, entity_keys=None, router=None,
+                 prefetch=None):
+    # Analyze (idx, row) pairs with up to `concurrency` API calls in flight and call
+    # on_result(idx, row, markdown_row, usage) for every row in input order. When
+    # local_analysis(idx, row) returns a (response, usage) pair the API call is skipped.
+    # With batch_size > 1 companies are packed into shared requests. When
+    # entity_keys(row) is given, rows sharing a key with an earlier row are not sent
+    # again but get that row's analysis. With a routing.TieredRouter, API answers it
+    # does not trust are analyzed again by its stronger model. With a
+    # prefetch.WebsitePrefetcher, each company's website is fetched before its prompt is built.
+    asyncio.run(_analyze_rows(rows, max(1, concurrency), on_result, local_analysis, max(1, batch_size),
+                              entity_keys, router, prefetch))
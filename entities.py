@@ -0,0 +1,245 @@
+import argparse
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import unquote, urlsplit
+
+from schema import company_record
+
+
+# Entity resolution: rows are matched on their canonical website domain and LinkedIn
+# page rather than on the firm name, which differs between exports. Duplicates in one
+# run share a single analysis (see engine.py); the EntityIndex keeps every analyzed
+# company across runs and fairs with the fingerprint of its prompt input, so it is
+# not analyzed again unless that input changed.
+
+DEFAULT_INDEX_PATH = "Project/entity_index.sqlite"
+DEFAULT_MAX_AGE_DAYS = 120
+
+# Hosts shared by many companies; a website on one of these does not identify a company
+SHARED_HOSTS = {
+    "linkedin.com", "facebook.com", "instagram.com", "twitter.com", "x.com", "youtube.com",
+    "google.com", "sites.google.com", "medium.com", "github.com", "crunchbase.com", "dealroom.co"
+}
+
+_LINKEDIN_PATTERN = re.compile(r"linkedin\.com/(company|school|showcase|in)/([^/?#\s]+)", re.IGNORECASE)
+
+
+def normalize_domain(url):
+    # "HTTPS://www.Example.com:443/en/about?x=1" -> "example.com"
+    url = re.split(r"[\s;,]+", (url or "").strip().lower())[0]
+    if not url:
+        return None
+    if "//" not in url:
+        url = "//" + url
+    try:
+        host = urlsplit(url).hostname or ""
+    except ValueError:
+        return None
+    host = host.rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    if "." not in host or host in SHARED_HOSTS or host.endswith(".linkedin.com"):
+        return None
+    return host
+
+
+def normalize_linkedin(url):
+    # "https://nl.linkedin.com/company/Acme-BV/about/" -> "company/acme-bv"
+    match = _LINKEDIN_PATTERN.search(url or "")
+    if match is None:
+        return None
+    return f"{match.group(1).lower()}/{unquote(match.group(2)).strip().lower()}"
+
+
+def entity_keys(row):
+    # Canonical keys of a row, most specific first; empty when the row has neither
+    keys = []
+    company = company_record(row)
+    website = company.company_website
+    domain = normalize_domain(website)
+    if domain:
+        keys.append("domain:" + domain)
+    for url in (company.linkedin_url, website):
+        linkedin = normalize_linkedin(url)
+        if linkedin and "linkedin:" + linkedin not in keys:
+            keys.append("linkedin:" + linkedin)
+    return keys
+
+
+class EntityIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.path = path
+        self.max_age_days = max_age_days
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entities (
+                id INTEGER PRIMARY KEY,
+                firm_name TEXT NOT NULL,
+                response TEXT NOT NULL,
+                model TEXT NOT NULL,
+                fair TEXT NOT NULL,
+                analyzed_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                fingerprint TEXT
+            )
+            """
+        )
+        # Indexes from before fingerprints get the column; their entries never match
+        columns = [column[1] for column in self._conn.execute("PRAGMA table_info(entities)")]
+        if "fingerprint" not in columns:
+            self._conn.execute("ALTER TABLE entities ADD COLUMN fingerprint TEXT")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entity_keys (key TEXT PRIMARY KEY, entity_id INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _find(self, keys):
+        if not keys:
+            return None
+        placeholders = ",".join("?" * len(keys))
+        row = self._conn.execute(
+            f"SELECT entity_id FROM entity_keys WHERE key IN ({placeholders}) LIMIT 1", keys
+        ).fetchone()
+        return row[0] if row else None
+
+    def lookup(self, keys, fingerprint):
+        # Latest analysis of the entity behind any of the keys, unless it is too old or
+        # was made from different input (see incremental.input_fingerprint)
+        with self._lock:
+            entity_id = self._find(keys)
+            if entity_id is None:
+                return None
+            row = self._conn.execute(
+                "SELECT response, analyzed_at, fingerprint FROM entities WHERE id = ?", (entity_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, analyzed_at, stored_fingerprint = row
+            if stored_fingerprint != fingerprint:
+                return None
+            if self.max_age_days is not None and time.time() - analyzed_at > self.max_age_days * 86400:
+                return None
+            self._conn.execute("UPDATE entities SET hits = hits + 1 WHERE id = ?", (entity_id,))
+            self._conn.commit()
+            return response
+
+    def record(self, keys, firm_name, response, model, fair, fingerprint):
+        # Stores the analysis under every key, linking e.g. a domain to a LinkedIn page
+        if not keys:
+            return
+        now = time.time()
+        with self._lock:
+            entity_id = self._find(keys)
+            if entity_id is None:
+                entity_id = self._conn.execute(
+                    "INSERT INTO entities (firm_name, response, model, fair, analyzed_at, fingerprint) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (firm_name, response, model, fair, now, fingerprint)
+                ).lastrowid
+            else:
+                self._conn.execute(
+                    "UPDATE entities SET firm_name = ?, response = ?, model = ?, fair = ?, analyzed_at = ?, "
+                    "fingerprint = ? WHERE id = ?",
+                    (firm_name, response, model, fair, now, fingerprint, entity_id)
+                )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO entity_keys (key, entity_id) VALUES (?, ?)",
+                ((key, entity_id) for key in keys)
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            count, hits, oldest, newest = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0), MIN(analyzed_at), MAX(analyzed_at) FROM entities"
+            ).fetchone()
+            keys = self._conn.execute("SELECT COUNT(*) FROM entity_keys").fetchone()[0]
+            fairs = self._conn.execute(
+                "SELECT fair, COUNT(*) FROM entities GROUP BY fair ORDER BY COUNT(*) DESC"
+            ).fetchall()
+        return {"entities": count, "keys": keys, "hits": hits, "oldest": oldest, "newest": newest,
+                "fairs": dict(fairs)}
+
+    def entries(self, limit=20):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT e.firm_name, e.fair, e.analyzed_at, e.hits, GROUP_CONCAT(k.key, ' ') "
+                "FROM entities e JOIN entity_keys k ON k.entity_id = e.id "
+                "GROUP BY e.id ORDER BY e.analyzed_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+    def prune(self, max_age_days):
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM entities WHERE analyzed_at < ?", (cutoff,)).rowcount
+            self._conn.execute("DELETE FROM entity_keys WHERE entity_id NOT IN (SELECT id FROM entities)")
+            self._conn.commit()
+        return removed
+
+    def clear(self):
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM entities").rowcount
+            self._conn.execute("DELETE FROM entity_keys")
+            self._conn.commit()
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _format_time(timestamp):
+    if timestamp is None:
+        return "-"
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and prune the cross-fair company index")
+    parser.add_argument("--path", default=DEFAULT_INDEX_PATH, help="Index database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Show number of companies, keys and reuse hits")
+    list_parser = commands.add_parser("list", help="Show the most recently analyzed companies")
+    list_parser.add_argument("--limit", type=int, default=20)
+    prune_parser = commands.add_parser("prune", help="Remove companies analyzed longer ago than --max-age-days")
+    prune_parser.add_argument("--max-age-days", type=float, required=True)
+    commands.add_parser("clear", help="Remove all companies")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(f"No entity index found at {args.path}")
+        return
+
+    index = EntityIndex(args.path)
+    try:
+        if args.command == "stats":
+            stats = index.stats()
+            print(f"🔗 Entity index: {args.path}")
+            print(f"Companies: {stats['entities']} ({stats['keys']} keys)")
+            print(f"Reuse hits: {stats['hits']}")
+            print(f"Oldest: {_format_time(stats['oldest'])}  Newest: {_format_time(stats['newest'])}")
+            for fair, count in stats['fairs'].items():
+                print(f"  {fair}: {count}")
+        elif args.command == "list":
+            for firm_name, fair, analyzed_at, hits, keys in index.entries(args.limit):
+                print(f"{firm_name}  [{fair}]  analyzed {_format_time(analyzed_at)}  hits {hits}  {keys}")
+        elif args.command == "prune":
+            print(f"🧹 Removed {index.prune(args.max_age_days)} companies")
+        elif args.command == "clear":
+            print(f"🧹 Removed {index.clear()} companies")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import datetime
+import time
+
+import numpy as np
+import pandas as pd
+
+from schema import compile_schema
+
+
+# Vectorized feature extraction over the whole input: the numeric columns the prompt
+# asks the model to interpret (revenue series, headcount, growth, founding year,
+# funding) are parsed with pandas in one pass and turned into the prompt's signals.
+# Their weighted sum is a cheap heuristic pre-score used to triage which companies
+# are worth the LLM analysis.
+
+CHUNK_SIZE = 50000
+
+FEATURE_COLUMNS = [
+    "Revenue", "Revenue growth", "Employees", "Employee growth % (last 12 months)", "Year Founded",
+    "Total funding (EUR M)", "Last funding date", "Last round", "Number of patents", "In Achilles"
+]
+
+# Signal -> (weight, description); the positive weights add up to 100
+SIGNALS = {
+    "employees_15_plus": (20, "15+ employees"),
+    "age_3_plus": (15, "3+ years old"),
+    "funded_last_2_years": (20, "funding in the last 2 years"),
+    "series_a_to_c": (15, "Series A-C round"),
+    "revenue_growing": (10, "growing revenue"),
+    "has_patents": (10, "patents"),
+    "in_achilles": (10, "in Achilles"),
+    "declining_headcount": (-20, "declining headcount"),
+}
+SIGNAL_NAMES = list(SIGNALS)
+SIGNAL_WEIGHTS = np.array([weight for weight, _ in SIGNALS.values()], dtype=np.float32)
+
+
+def _text(frame, column):
+    if column not in frame:
+        return pd.Series("", index=frame.index, dtype=object)
+    return frame[column].fillna("").astype(str).str.strip()
+
+
+def _number(series):
+    # First number in the cell: "1,250" -> 1250, "11-50" -> 11, "-4.5%" -> -4.5
+    extracted = series.str.replace(",", "", regex=False).str.extract(r"(-?\d+(?:\.\d+)?)", expand=False)
+    return pd.to_numeric(extracted, errors="coerce")
+
+
+def _latest_value(series):
+    # ";;;;;;;22727273;90909091;;" -> 90909091: last filled entry of a yearly series
+    parts = series.str.replace(" ", "", regex=False).str.split(";", expand=True)
+    if parts.shape[1] == 0:
+        return pd.Series(np.nan, index=series.index)
+    values = parts.apply(lambda column: pd.to_numeric(column, errors="coerce"))
+    return values.ffill(axis=1).iloc[:, -1]
+
+
+def _years_since(series, today):
+    # Age in years of a date cell; ISO dates are exact, otherwise the year counts from mid-year
+    iso = pd.to_datetime(series.str.extract(r"(\d{4}-\d{1,2}-\d{1,2})", expand=False),
+                         format="%Y-%m-%d", errors="coerce")
+    days = (pd.Timestamp(today) - iso).dt.days / 365.25
+    year = pd.to_numeric(series.str.extract(r"((?:19|20)\d{2})", expand=False), errors="coerce")
+    return days.fillna(today.year + (today.timetuple().tm_yday / 365.25) - (year + 0.5))
+
+
+def compute_features(frame, today=None):
+    # One row per input row with the parsed values, the boolean signals and the pre-score
+    today = today or datetime.date.today()
+    features = pd.DataFrame(index=frame.index)
+    features["employees"] = _number(_text(frame, "Employees"))
+    features["employee_growth"] = _number(_text(frame, "Employee growth % (last 12 months)"))
+    founded = pd.to_numeric(_text(frame, "Year Founded").str.extract(r"((?:19|20)\d{2})", expand=False),
+                            errors="coerce")
+    features["age_years"] = today.year - founded
+    features["revenue"] = _latest_value(_text(frame, "Revenue"))
+    features["revenue_growth"] = _latest_value(_text(frame, "Revenue growth"))
+    features["total_funding"] = _number(_text(frame, "Total funding (EUR M)"))
+    features["funding_age_years"] = _years_since(_text(frame, "Last funding date"), today)
+    features["patents"] = _number(_text(frame, "Number of patents"))
+
+    # NaN comparisons are False, so a missing value never triggers a signal
+    signals = pd.DataFrame({
+        "employees_15_plus": features["employees"] >= 15,
+        "age_3_plus": features["age_years"] >= 3,
+        "funded_last_2_years": features["funding_age_years"] <= 2,
+        "series_a_to_c": _text(frame, "Last round").str.contains(r"series\s*[abc]\b", case=False, regex=True),
+        "revenue_growing": features["revenue_growth"] > 0,
+        "has_patents": features["patents"] > 0,
+        "in_achilles": _text(frame, "In Achilles").str.lower().isin(["yes", "y", "true", "1", "ja"]),
+        "declining_headcount": features["employee_growth"] < 0,
+    }, index=frame.index)[SIGNAL_NAMES].fillna(False).astype(bool)
+
+    features["prescore"] = np.clip(signals.to_numpy(dtype=np.float32) @ SIGNAL_WEIGHTS, 0, 100)
+    return pd.concat([features, signals], axis=1)
+
+
+def score_input(path, chunk_size=CHUNK_SIZE, today=None):
+    # Pre-scores and signal bitmasks for every input row, in input order. Only the
+    # feature columns are read, chunk by chunk, so memory stays small.
+    header = pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns
+    # Feature columns under the names this file uses, e.g. "Launch year" for "Year Founded"
+    schema = compile_schema(header)
+    renamed = {schema.column(column): column for column in FEATURE_COLUMNS if schema.column(column) is not None}
+    wanted = set(renamed) | {header[0]} if len(header) else set(renamed)
+    scores, bits = [], []
+    bit_values = (1 << np.arange(len(SIGNAL_NAMES))).astype(np.uint16)
+    reader = pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8-sig",
+                         usecols=lambda column: column in wanted, chunksize=chunk_size)
+    for chunk in reader:
+        features = compute_features(chunk.rename(columns=renamed), today)
+        scores.append(features["prescore"].to_numpy(dtype=np.float32))
+        bits.append(features[SIGNAL_NAMES].to_numpy(dtype=np.uint16) @ bit_values)
+    if not scores:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.uint16)
+    return np.concatenate(scores), np.concatenate(bits).astype(np.uint16)
+
+
+def triage_mask(prescores, top_k=None, min_prescore=None):
+    # True for the rows selected for LLM analysis: the top_k highest pre-scores (ties
+    # go to the earlier row) and/or every row at or above min_prescore
+    selected = np.ones(len(prescores), dtype=bool)
+    if min_prescore is not None:
+        selected &= prescores >= min_prescore
+    if top_k is not None and top_k < selected.sum():
+        candidates = np.flatnonzero(selected)
+        order = np.argsort(-prescores[candidates], kind="stable")[:max(top_k, 0)]
+        selected[:] = False
+        selected[candidates[order]] = True
+    return selected
+
+
+def describe_signals(bits):
+    present = [SIGNALS[name][1] for i, name in enumerate(SIGNAL_NAMES) if int(bits) >> i & 1]
+    return ", ".join(present) or "none"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Heuristic pre-score of every company in an input CSV")
+    parser.add_argument("--input", default="Project/IBC_2025_Complete -Dealroom and Achilles data.csv")
+    parser.add_argument("--top", type=int, default=25, help="Number of companies to list")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    prescores, bits = score_input(args.input)
+    elapsed = time.perf_counter() - started
+    print(f"🧮 Pre-scored {len(prescores)} companies in {elapsed:.2f}s")
+    if not len(prescores):
+        return
+    print(f"Pre-score p25/p50/p75: {np.percentile(prescores, 25):.0f} / "
+          f"{np.percentile(prescores, 50):.0f} / {np.percentile(prescores, 75):.0f}")
+    name_column = compile_schema(pd.read_csv(args.input, nrows=0, encoding="utf-8-sig").columns).column("Firm name")
+    names = pd.read_csv(args.input, dtype=str, keep_default_na=False, encoding="utf-8-sig",
+                        usecols=lambda column: column == name_column)
+    names = names[name_column].tolist() if name_column in names else [""] * len(prescores)
+    for position in np.argsort(-prescores, kind="stable")[:args.top]:
+        print(f"{position + 1:>6}  {prescores[position]:5.0f}  {names[position]}  ({describe_signals(bits[position])})")
+
+
+if __name__ == "__main__":
+    main()
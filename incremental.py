@@ -0,0 +1,98 @@
+import csv
+import hashlib
+import json
+
+from batching import company_key
+from journal import read_journal
+from ranking import empty_usage, prompt_fields
+
+
+# Incremental re-analysis: GPT columns from a previous output.csv (or its checkpoint
+# journal) are carried over for companies whose prompt input did not change, so a
+# refreshed export only sends new and changed companies to the API.
+
+CARRIED_MARKER = "carried_over"
+
+
+def input_fingerprint(row):
+    # Hash of exactly the values that feed ROM_FDI_PROMPT_TEMPLATE.format
+    payload = json.dumps(prompt_fields(row), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _previous_rows(path):
+    if path.endswith(".jsonl"):
+        for record in read_journal(path):
+            yield record["row"]
+        return
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        yield from csv.DictReader(file)
+
+
+def carried_response(fields):
+    # Response text for a carried-over row; parse_carried turns it back into the fields
+    return json.dumps({CARRIED_MARKER: fields}, ensure_ascii=False)
+
+
+def parse_carried(content):
+    if not content.startswith('{"' + CARRIED_MARKER):
+        return None
+    try:
+        fields = json.loads(content)[CARRIED_MARKER]
+    except (ValueError, KeyError, TypeError):
+        return None
+    return tuple(fields)
+
+
+class PreviousResults:
+    def __init__(self, path, gpt_fields):
+        # gpt_fields: output columns to carry over, "GPT Score" among them
+        self.path = path
+        self._results = {}
+        self._keys = set()
+        for row in _previous_rows(path):
+            score = (row.get("GPT Score") or "").strip()
+            self._keys.add(company_key(row))
+            # Rows that never got a usable score are analyzed again
+            if not score or score == "N/A":
+                continue
+            self._results[input_fingerprint(row)] = [row.get(field, "") for field in gpt_fields]
+        self.counts = {"reused": 0, "changed": 0, "added": 0}
+        # Changed and new companies that actually went to the API; the others were
+        # answered locally (pre-screen, entity index, triage)
+        self.analyzed = {"changed": 0, "added": 0}
+
+    def __len__(self):
+        return len(self._results)
+
+    def lookup(self, row):
+        # Returns the previous GPT columns for an unchanged company, otherwise None
+        return self._results.get(input_fingerprint(row))
+
+    def classify(self, row):
+        fields = self.lookup(row)
+        if fields is not None:
+            status = "reused"
+        elif company_key(row) in self._keys:
+            status = "changed"
+        else:
+            status = "added"
+        self.counts[status] += 1
+        return status, fields
+
+    def record_analyzed(self, row):
+        # Called for every row whose answer came from the API
+        self.analyzed["changed" if company_key(row) in self._keys else "added"] += 1
+
+    def analysis(self, row):
+        # local_analysis hook: the carried-over response for unchanged companies
+        status, fields = self.classify(row)
+        if status != "reused":
+            return None
+        return carried_response(fields), empty_usage("previous")
+
+    def print_summary(self):
+        counts, analyzed = self.counts, self.analyzed
+        print(f"♻️ Compared with {self.path}: {counts['reused']} unchanged companies reused, "
+              f"{counts['changed']} changed and {counts['added']} new companies; {analyzed['changed']} changed "
+              f"and {analyzed['added']} new companies sent to the API, the rest answered locally")
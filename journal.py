@@ -0,0 +1,146 @@
+import csv
+import hashlib
+import heapq
+import json
+import os
+
+
+def default_journal_path(output_file):
+    return os.path.splitext(output_file)[0] + ".journal.jsonl"
+
+
+def row_key(row):
+    # Identifies an input row so --resume never reuses a result for a row that changed
+    payload = json.dumps(dict(row), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def read_journal(path):
+    # Yields every complete record; a torn last line from a crash is skipped
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as journal:
+        for line in journal:
+            if not line.endswith('\n'):
+                break
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def journal_keys(path):
+    # {idx: row key} of every journaled row, without holding the rows themselves. Rows
+    # whose analysis failed are left out, so --resume analyzes them again.
+    keys = {}
+    for record in read_journal(path):
+        if record.get('failed'):
+            keys.pop(record['idx'], None)
+        else:
+            keys[record['idx']] = record['key']
+    return keys
+
+
+def _run_offsets(path):
+    # Rows are journaled in input order within one run, so the journal is a sequence of
+    # sorted runs; a new run starts wherever the row index goes down (after --resume).
+    offsets, previous_idx, offset = [], None, 0
+    with open(path, 'rb') as journal:
+        for line in journal:
+            try:
+                idx = json.loads(line)['idx']
+            except (ValueError, KeyError):
+                offset += len(line)
+                continue
+            if previous_idx is None or idx <= previous_idx:
+                offsets.append(offset)
+            previous_idx = idx
+            offset += len(line)
+    return offsets + [offset]
+
+
+def _read_run(path, start, end):
+    with open(path, 'rb') as journal:
+        journal.seek(start)
+        while journal.tell() < end:
+            line = journal.readline()
+            if not line.endswith(b'\n'):
+                return
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def iter_journal_in_order(path):
+    # Merges the sorted runs by row index with constant memory. heapq.merge keeps
+    # equal indices in run order, so a row journaled twice yields its latest record.
+    if not os.path.exists(path):
+        return
+    offsets = _run_offsets(path)
+    runs = [_read_run(path, start, end) for start, end in zip(offsets, offsets[1:])]
+    previous = None
+    for record in heapq.merge(*runs, key=lambda record: record['idx']):
+        if previous is not None and record['idx'] != previous['idx']:
+            yield previous
+        previous = record
+    if previous is not None:
+        yield previous
+
+
+class CheckpointJournal:
+    def __init__(self, path, resume=False):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not resume and os.path.exists(path):
+            os.remove(path)
+        self._file = open(path, 'a+', encoding='utf-8')
+        self._terminate_torn_line()
+
+    def _terminate_torn_line(self):
+        # If the previous run died mid-write, start the next record on a fresh line
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() == 0:
+            return
+        self._file.seek(self._file.tell() - 1)
+        if self._file.read(1) != '\n':
+            self._file.write('\n')
+            self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._sync()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def build_output_from_journal(journal_path, output_file, headers, on_row=None):
+    # Single streaming pass over the journal; the CSV is written to a temp file and
+    # swapped in atomically so output.csv is never left half-written.
+    written = 0
+    tmp_file = output_file + ".tmp"
+    with open(tmp_file, "w", newline='', encoding="utf-8-sig") as out_csv:
+        writer = csv.DictWriter(out_csv, fieldnames=headers, extrasaction='ignore')
+        writer.writeheader()
+        for record in iter_journal_in_order(journal_path):
+            writer.writerow(record['row'])
+            if on_row is not None:
+                on_row(record['idx'], record['row'])
+            written += 1
+        out_csv.flush()
+        os.fsync(out_csv.fileno())
+    os.replace(tmp_file, output_file)
+    return written
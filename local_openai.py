@@ -0,0 +1,446 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Local stand-in for the parts of the OpenAI API this tool uses: chat completions,
+# files and batches. All state lives under --root, so batch jobs survive restarts.
+# Point the tool at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+DEFAULT_ROOT = ".local_openai"
+DEFAULT_PORT = 8765
+RESPONSE_SHAPES = ("table", "header", "prose", "chatty", "mixed")
+
+
+def _score(name):
+    return int(hashlib.sha1(name.encode("utf-8")).hexdigest(), 16) % 101
+
+
+def canned_structured(names, keys):
+    # Same canned analysis as JSON following structured.ANALYSIS_SCHEMA / BATCH_SCHEMA
+    def analysis(name):
+        return {
+            "short_description": f"{name} builds products for its market",
+            "analyzed_sector": "IT and Cyber",
+            "gpt_score": _score(name),
+            "explanation": f"Stand-in analysis for {name}: growth signals and EU focus.",
+            "ecosystem_fit": "Could partner with TNO and SURF on digital infrastructure.",
+            "utrecht_connections": "Utrecht University; Utrecht Science Park.",
+            "sources": f"LinkedIn: stand-in evidence for {name} in Jan 2025."
+        }
+
+    if keys:
+        return json.dumps({"companies": [{"company_key": key, **analysis(name.strip())}
+                                         for key, name in zip(keys, names)]})
+    return json.dumps(analysis(names[0].strip() if names else "Company"))
+
+
+def canned_analysis(messages, structured=False):
+    # A response in the ROM_FDI_PROMPT_TEMPLATE output format with a score derived
+    # from the company data, so repeated runs give identical output
+    prompt = messages[-1].get("content", "") if messages else ""
+    names = re.findall(r"Company Name: *(.*)", prompt)
+    keys = re.findall(r"Company Key: *(\S+)", prompt)
+    if structured:
+        return canned_structured(names, keys)
+
+    def row(name):
+        score = _score(name)
+        return (f"| {name} builds products for its market | IT and Cyber | | {score} | "
+                f"Stand-in analysis for {name}: growth signals and EU focus. | "
+                f"Could partner with TNO and SURF on digital infrastructure. | "
+                f"Utrecht University; Utrecht Science Park. | | "
+                f"LinkedIn: stand-in evidence for {name} in Jan 2025. |")
+
+    if keys:
+        return "\n".join(f"| {key} " + row(name.strip()) for key, name in zip(keys, names))
+    return row(names[0].strip() if names else "Company")
+
+
+def reshape(content, shape, rng):
+    # "table" is the row as the prompt asks for it; "header" adds the header and
+    # separator lines models sometimes repeat; "prose" is a drifted answer without a
+    # table that only the text fallback parser can read; "chatty" is the row followed
+    # by commentary the tool does not need; "mixed" picks one at random.
+    if shape == "mixed":
+        shape = rng.choice(RESPONSE_SHAPES[:4])
+    if shape == "header":
+        header = ("| Short description | Analyzed Sector | | GPT Score | GPT Score Explanation | "
+                  "GPT Dutch Ecosystem Fit & Chain Partners | Potential connections and partnerships in "
+                  "Utrecht Region | | GPT Source |")
+        return header + "\n|---|---|---|---|---|---|---|---|---|\n" + content
+    if shape == "prose":
+        rows = [[part.strip() for part in line.strip().strip("|").split("|")] for line in content.split("\n")]
+        return "\n\n".join(
+            f"ANALYSIS:\n{parts[-5]} Overall this gives a score: {parts[-6]} out of 100.\n"
+            f"Dutch ecosystem: {parts[-4]}\nSources: {parts[-1]}"
+            for parts in rows
+        )
+    if shape == "chatty":
+        return content + "\n\n" + " ".join(
+            "Note that these signals are based on public information and should be verified "
+            "with the company before any outreach or site visit is planned." for _ in range(8))
+    return content
+
+
+class Behavior:
+    # Latency, rate limiting and answer shape of the stand-in chat endpoint
+    def __init__(self, latency=0.0, jitter=0.0, rate_429=0.0, shape="table", seed=None, token_latency=0.0,
+                 rate_5xx=0.0, outage=None):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.rate_5xx = rate_5xx
+        # (start, end) seconds after startup during which every chat request gets a 503
+        self.outage = outage
+        self.started = time.monotonic()
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.shape = shape
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    def rate_limited(self):
+        with self._lock:
+            return self._rng.random() < self.rate_429
+
+    def server_error(self):
+        elapsed = time.monotonic() - self.started
+        if self.outage and self.outage[0] <= elapsed < self.outage[1]:
+            return True
+        with self._lock:
+            return self._rng.random() < self.rate_5xx
+
+    def reshape(self, content):
+        with self._lock:
+            return reshape(content, self.shape, self._rng)
+
+
+def chat_completion(body, behavior=None):
+    messages = body.get("messages", [])
+    structured = (body.get("response_format") or {}).get("type") == "json_schema"
+    content = canned_analysis(messages, structured)
+    if behavior is not None and not structured:
+        content = behavior.reshape(content)
+    finish_reason = "stop"
+    max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+    if max_tokens and len(content) > max_tokens * 4:
+        content, finish_reason = content[:max_tokens * 4], "length"
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": "chatcmpl-" + uuid.uuid4().hex[:24],
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o-mini"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": finish_reason
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": (prompt_tokens // 1024) * 1024 // 2}
+        }
+    }
+
+
+class Store:
+    def __init__(self, root, batch_delay):
+        self.root = root
+        self.batch_delay = batch_delay
+        self._lock = threading.Lock()
+        for sub in ("files", "batches"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+
+    def _path(self, kind, object_id, suffix=".json"):
+        if not re.fullmatch(r"[\w-]+", object_id):
+            raise KeyError(object_id)
+        return os.path.join(self.root, kind, object_id + suffix)
+
+    def _load(self, kind, object_id):
+        path = self._path(kind, object_id)
+        if not os.path.exists(path):
+            raise KeyError(object_id)
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save(self, kind, obj):
+        path = self._path(kind, obj["id"])
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(obj, f)
+        os.replace(path + ".tmp", path)
+
+    def create_file(self, filename, purpose, data):
+        file_id = "file-" + uuid.uuid4().hex[:24]
+        with open(self._path("files", file_id, ".data"), "wb") as f:
+            f.write(data)
+        obj = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed"
+        }
+        self._save("files", obj)
+        return obj
+
+    def get_file(self, file_id):
+        return self._load("files", file_id)
+
+    def file_content(self, file_id):
+        self.get_file(file_id)
+        with open(self._path("files", file_id, ".data"), "rb") as f:
+            return f.read()
+
+    def create_batch(self, body):
+        self.get_file(body["input_file_id"])
+        now = int(time.time())
+        obj = {
+            "id": "batch_" + uuid.uuid4().hex[:24],
+            "object": "batch",
+            "endpoint": body.get("endpoint", "/v1/chat/completions"),
+            "errors": None,
+            "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": now,
+            "in_progress_at": now,
+            "expires_at": now + 86400,
+            "completed_at": None,
+            "failed_at": None,
+            "expired_at": None,
+            "cancelled_at": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": body.get("metadata")
+        }
+        self._save("batches", obj)
+        return obj
+
+    def get_batch(self, batch_id):
+        with self._lock:
+            obj = self._load("batches", batch_id)
+            if obj["status"] == "in_progress" and time.time() - obj["created_at"] >= self.batch_delay:
+                obj = self._run_batch(obj)
+            return obj
+
+    def cancel_batch(self, batch_id):
+        with self._lock:
+            obj = self._load("batches", batch_id)
+            if obj["status"] in ("validating", "in_progress"):
+                obj["status"] = "cancelled"
+                obj["cancelled_at"] = int(time.time())
+                self._save("batches", obj)
+            return obj
+
+    def _run_batch(self, obj):
+        outputs, errors = [], []
+        for line in self.file_content(obj["input_file_id"]).decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            result = {"id": "batch_req_" + uuid.uuid4().hex[:24], "custom_id": request.get("custom_id")}
+            if request.get("url") != obj["endpoint"]:
+                result.update(response=None, error={"code": "invalid_url", "message": request.get("url")})
+                errors.append(result)
+                continue
+            result.update(
+                response={"status_code": 200, "request_id": uuid.uuid4().hex, "body": chat_completion(request["body"])},
+                error=None
+            )
+            outputs.append(result)
+
+        def write(results, name):
+            data = "".join(json.dumps(r) + "\n" for r in results).encode("utf-8")
+            return self.create_file(name, "batch_output", data)["id"] if results else None
+
+        obj["output_file_id"] = write(outputs, obj["id"] + "_output.jsonl")
+        obj["error_file_id"] = write(errors, obj["id"] + "_error.jsonl")
+        obj["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+        obj["status"] = "completed"
+        obj["completed_at"] = int(time.time())
+        self._save("batches", obj)
+        return obj
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    store = None
+    behavior = Behavior()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, content_type="application/json", headers=None):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message):
+        self._send(status, {"error": {"message": message, "type": "invalid_request_error", "code": None}})
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        try:
+            match = re.fullmatch(r"/v1/files/([\w-]+)(/content)?", path)
+            if match and match.group(2):
+                return self._send(200, self.store.file_content(match.group(1)), "application/octet-stream")
+            if match:
+                return self._send(200, self.store.get_file(match.group(1)))
+            match = re.fullmatch(r"/v1/batches/([\w-]+)", path)
+            if match:
+                return self._send(200, self.store.get_batch(match.group(1)))
+        except KeyError as e:
+            return self._error(404, f"No such object: {e}")
+        self._error(404, f"Unknown path {path}")
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        body = self._body()
+        try:
+            if path == "/v1/chat/completions":
+                return self._chat(json.loads(body))
+            if path == "/v1/files":
+                return self._upload(body)
+            if path == "/v1/batches":
+                return self._send(200, self.store.create_batch(json.loads(body)))
+            match = re.fullmatch(r"/v1/batches/([\w-]+)/cancel", path)
+            if match:
+                return self._send(200, self.store.cancel_batch(match.group(1)))
+        except KeyError as e:
+            return self._error(404, f"No such object: {e}")
+        except (ValueError, TypeError) as e:
+            return self._error(400, str(e))
+        self._error(404, f"Unknown path {path}")
+
+    def _chat(self, body):
+        time.sleep(self.behavior.delay())
+        if self.behavior.rate_limited():
+            return self._send(429, {"error": {"message": "Rate limit reached (stand-in)", "type": "requests",
+                                              "code": "rate_limit_exceeded"}},
+                              headers={"retry-after-ms": "200", "x-ratelimit-reset-requests": "200ms",
+                                       "x-ratelimit-remaining-requests": "0"})
+        if self.behavior.server_error():
+            return self._send(503, {"error": {"message": "The server is overloaded (stand-in)", "type": "server_error",
+                                              "code": None}})
+        completion = chat_completion(body, self.behavior)
+        if body.get("stream"):
+            return self._stream(completion, (body.get("stream_options") or {}).get("include_usage"))
+        return self._send(200, completion)
+
+    def _stream(self, completion, include_usage):
+        # Server-sent events as the real endpoint sends them: one chunk per ~4 characters
+        # ("token"), then a usage chunk when asked for and [DONE]. A client that closes
+        # the stream early simply stops the generation.
+        content = completion["choices"][0]["message"]["content"]
+        base = {key: completion[key] for key in ("id", "created", "model")}
+        base["object"] = "chat.completion.chunk"
+
+        def chunk(delta, finish_reason=None, **extra):
+            return dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra)
+
+        events = [chunk({"role": "assistant", "content": ""})]
+        events += [chunk({"content": content[i:i + 4]}) for i in range(0, len(content), 4)]
+        events.append(chunk({}, completion["choices"][0]["finish_reason"]))
+        if include_usage:
+            events.append(dict(base, choices=[], usage=completion["usage"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for event in events + ["[DONE]"]:
+                data = ("data: " + (event if isinstance(event, str) else json.dumps(event)) + "\n\n").encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+                if self.behavior.token_latency:
+                    time.sleep(self.behavior.token_latency)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _upload(self, body):
+        header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8")
+        message = BytesParser(policy=HTTP).parsebytes(header + body)
+        fields, filename, data = {}, "upload.jsonl", b""
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name == "file":
+                filename = part.get_filename() or filename
+                data = part.get_payload(decode=True) or b""
+            else:
+                fields[name] = part.get_content().strip()
+        return self._send(200, self.store.create_file(filename, fields.get("purpose", "batch"), data))
+
+
+def make_server(root=DEFAULT_ROOT, port=DEFAULT_PORT, batch_delay=0.0, handler=StandInHandler, behavior=None):
+    handler_class = type("BoundStandInHandler", (handler,),
+                         {"store": Store(root, batch_delay), "behavior": behavior or Behavior()})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler_class)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI chat, files and batch endpoints")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Directory for uploaded files and batch state")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--batch-delay", type=float, default=2.0,
+                        help="Seconds before a submitted batch is reported as completed")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per chat completion")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds added to --latency")
+    parser.add_argument("--rate-429", type=float, default=0.0,
+                        help="Share of chat completions answered with 429 Too Many Requests")
+    parser.add_argument("--shape", choices=RESPONSE_SHAPES, default="table",
+                        help="Shape of the canned markdown answers")
+    parser.add_argument("--seed", type=int, help="Seed for jitter, 429s and mixed shapes")
+    parser.add_argument("--rate-5xx", type=float, default=0.0,
+                        help="Share of chat completions answered with 503 Service Unavailable")
+    parser.add_argument("--outage", type=lambda value: tuple(float(part) for part in value.split("-")),
+                        help="START-END seconds after startup during which every chat completion gets a 503")
+    parser.add_argument("--token-latency", type=float, default=0.0,
+                        help="Seconds between streamed chunks (stream=True requests)")
+    args = parser.parse_args(argv)
+
+    behavior = Behavior(args.latency, args.jitter, args.rate_429, args.shape, args.seed, args.token_latency,
+                        args.rate_5xx, args.outage)
+    server = make_server(args.root, args.port, args.batch_delay, behavior=behavior)
+    print(f"🧪 Stand-in OpenAI API on http://127.0.0.1:{args.port}/v1 (state in {args.root})")
+    print(f"   export OPENAI_BASE_URL=http://127.0.0.1:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Local stand-in web server for prefetch.py: every host gets a small generated company
+# site (home, about, contact) served under /<host>/<path>. Pages carry an ETag and
+# Last-Modified and answer conditional GETs with 304, and the server records how
+# many requests each host got at once so per-host politeness can be checked.
+# Point the tool at it with PREFETCH_BASE_URL=http://127.0.0.1:<port>.
+
+DEFAULT_PORT = 8766
+LAST_MODIFIED = "Mon, 06 Jan 2025 09:00:00 GMT"
+
+OFFICE_SETS = [
+    ["Boston, United States", "Berlin, Germany"],
+    ["Toronto, Canada"],
+    ["Lyon, France", "Amsterdam, Netherlands"],
+    ["Seoul, South Korea", "Munich, Germany"],
+    ["Austin, United States", "Utrecht, the Netherlands"],
+]
+
+
+def _number(host):
+    return int(hashlib.sha1(host.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def site_pages(host):
+    # path -> HTML of the generated site for a host
+    name = host.split(".")[0].replace("-", " ").title()
+    offices = OFFICE_SETS[_number(host) % len(OFFICE_SETS)]
+    nav = '<nav><a href="/">Home</a> <a href="/about-us">About us</a> <a href="/contact">Contact</a> ' \
+          '<a href="/careers">Careers</a></nav>'
+    page = ("<html><head><title>{title}</title><meta name=\"description\" content=\"{description}\">"
+            "<style>body {{ font-family: sans-serif; }}</style><script>var tracking = 1;</script></head>"
+            "<body>" + nav + "<main>{body}</main><footer>© 2025 " + name + "</footer></body></html>")
+    return {
+        "/": page.format(title=f"{name} | Home", description=f"{name} builds software for industrial customers.",
+                         body=f"<h1>{name}</h1><p>Trusted by 200 customers in 14 countries.</p>"),
+        "/about-us": page.format(title=f"About {name}", description="About us",
+                                 body=f"<h1>About {name}</h1><p>Founded in 2015, {name} employs 120 people and "
+                                      "raised a Series B in 2024 to expand in Europe.</p>"),
+        "/contact": page.format(title=f"Contact {name}", description="Contact",
+                                body="<h1>Our offices</h1>" + "".join(f"<p>{office}</p>" for office in offices)),
+    }
+
+
+class WebStandInHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    stats = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        _, _, rest = self.path.partition("/")
+        host, _, path = rest.partition("/")
+        path = "/" + path.split("?")[0].rstrip("/") if path.strip("/") else "/"
+        with self.stats["lock"]:
+            self.stats["requests"] += 1
+            in_flight = self.stats["in_flight"][host] = self.stats["in_flight"].get(host, 0) + 1
+            self.stats["max_per_host"] = max(self.stats["max_per_host"], in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            html = site_pages(host).get(path)
+            if html is None:
+                return self._send(404, b"Not found", {"Content-Type": "text/plain"})
+            body = html.encode("utf-8")
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                with self.stats["lock"]:
+                    self.stats["not_modified"] += 1
+                return self._send(304, headers={"ETag": etag})
+            self._send(200, body, {"Content-Type": "text/html; charset=utf-8", "ETag": etag,
+                                   "Last-Modified": LAST_MODIFIED})
+        finally:
+            with self.stats["lock"]:
+                self.stats["in_flight"][host] -= 1
+
+
+def make_server(port=DEFAULT_PORT, latency=0.0):
+    # server.stats holds the request counts and the highest number of requests one
+    # host had in flight at once
+    stats = {"lock": threading.Lock(), "requests": 0, "not_modified": 0, "in_flight": {}, "max_per_host": 0}
+    handler_class = type("BoundWebStandInHandler", (WebStandInHandler,), {"latency": latency, "stats": stats})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler_class)
+    server.daemon_threads = True
+    server.stats = stats
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in web server with generated company websites")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per page")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.port, args.latency)
+    print(f"🧪 Stand-in websites on http://127.0.0.1:{args.port}/<host>/<path>")
+    print(f"   export PREFETCH_BASE_URL=http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"{server.stats['requests']} requests, {server.stats['not_modified']} not modified, "
+              f"at most {server.stats['max_per_host']} at once per host")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,32 @@
-import csv
+import argparse
+import os
 import re
-from ranking import read_csv, get_company_analysis
+import time
+from cache import DEFAULT_CACHE_PATH
+from ranking import DEFAULT_RPM, DEFAULT_TPM, MODEL, configure_rate_limits, configure_response_cache, configure_retries, configure_sector_prompts, configure_streaming, configure_structured_output, configure_website_context, empty_usage
+from batch_job import default_state_path, ingest_batch, load_state, poll_batch, submit_batch, write_batch_requests
+from clients import DEFAULT_TIMEOUT, configure_clients, get_client
+from engine import run_analyses
+from prescreen import prescreen_company
+from features import describe_signals, score_input, triage_mask
+from incremental import PreviousResults, input_fingerprint, parse_carried
+from entities import DEFAULT_INDEX_PATH, DEFAULT_MAX_AGE_DAYS, EntityIndex, entity_keys
+from metrics import RunMetrics, default_metrics_path
+from retry import BREAKER_COOLDOWN, BREAKER_THRESHOLD, MAX_RETRIES, CircuitBreaker, DeadLetterFile, default_dead_letter_path, load_dead_letters
+from schema import GPT_FIELDS, company_record, compile_schema, describe_schema, normalize_column
+from routing import DEFAULT_BAND, ESCALATION_MODEL, TieredRouter, parse_band
+from sharding import merge_shards, parse_shard, shard_of, shard_output_path
+from shortlist import DEFAULT_K, DEFAULT_TIE_BREAKERS, Shortlist, default_shortlist_path, parse_tie_breakers
+from sectors import DEFAULT_MIN_CONFIDENCE, guess_sector
+from streaming import DEFAULT_MAX_TOKENS
+from prefetch import DEFAULT_MAX_AGE_HOURS, DEFAULT_PREFETCH_CONCURRENCY, DEFAULT_WEB_CACHE_PATH, PageCache, WebsitePrefetcher
+from journal import CheckpointJournal, build_output_from_journal, default_journal_path, journal_keys, row_key
+from pipeline import OutputWriter, StageWorker, iter_input_rows, read_header
+from structured import parse_structured
+
+
+# Extra output column with the --escalate routing decision of every row
+ROUTE_FIELD = "Analysis Route"
 
 
 def parse_markdown_row(markdown_row):
@@ -8,197 +34,579 @@ def parse_markdown_row(markdown_row):
     return [part.strip() for part in parts]
 
 
-def main():
-    input_file = "Project/IBC_2025_Complete -Dealroom and Achilles data.csv"
-    output_file = "Project/output.csv"
+def build_output_headers(original_headers):
+    # Remove the GPT columns of an earlier output to avoid duplicates. Only the GPT
+    # fields themselves are dropped; input columns that merely mention a score or a
+    # source are kept.
+    gpt_columns = {normalize_column(field) for field in GPT_FIELDS}
+    headers = [header for header in original_headers if normalize_column(header) not in gpt_columns]
+
+    # Insert new GPT fields after "Short description" field
+    description = compile_schema(headers).column("Company Summary")
+    if description is None:
+        description = next((header for header in headers
+                            if 'description' in header.lower() or 'summary' in header.lower()), None)
+    if description is None:
+        # Fallback: append at end if no description field found
+        return headers + GPT_FIELDS
+    position = headers.index(description) + 1
+    return headers[:position] + GPT_FIELDS + headers[position:]
+
+
+def parse_analysis_response(markdown_row):
+    return parse_analysis(markdown_row)[0]
+
+
+def parse_analysis(markdown_row):
+    # Returns (fields, method) where method is the parser that produced the fields:
+    # "structured", "carried" (from --previous), "table" or "fallback".
+    # Structured-output answers are validated in one pass; anything else goes through
+    # the markdown table parser and its text fallbacks below.
+    structured = parse_structured(markdown_row)
+    if structured is not None:
+        return structured, "structured"
+    carried = parse_carried(markdown_row)
+    if carried is not None:
+        return carried, "carried"
+
+    lines = markdown_row.split('\n')
+    sector = ""
+    score = "N/A"
+    explanation = ""
+    ecosystem_fit = ""
+    potential_connections = ""
+    sources_details = ""
+
+    for line in lines:
+        if line.strip().startswith('|') and '|' in line:
+            parsed = parse_markdown_row(line)
+            # Expected 9 columns per prompt: [0]=Short desc, [1]=Analyzed Sector, [2]=empty,
+            # [3]=GPT Score, [4]=Explanation, [5]=Dutch Ecosystem Fit & Chain Partners,
+            # [6]=Potential connections, [7]=empty, [8]=GPT Source
+            if len(parsed) >= 9:
+                # [0]=Short desc, [1]=Analyzed Sector, [2]=empty,
+                # [3]=GPT Score, [4]=Explanation, [5]=Dutch Ecosystem Fit & Chain Partners,
+                # [6]=Potential connections, [7]=empty, [8]=GPT Source
+                sector = parsed[1].strip()
+                score = parsed[3].strip()
+                explanation = parsed[4].strip()
+                ecosystem_fit = parsed[5].strip()
+                potential_connections = parsed[6].strip()
+                sources_details = parsed[8].strip()
+                break
+
+    method = "table" if score != "N/A" else "fallback"
+    if score == "N/A":
+        score_patterns = [
+            r'score[:\s]*(\d{1,3})',
+            r'rating[:\s]*(\d{1,3})',
+            r'(\d{1,3})/100',
+            r'(\d{1,3})\s*out\s*of\s*100',
+            r'assessment[:\s]*(\d{1,3})'
+        ]
+        for line in lines:
+            for pattern in score_patterns:
+                match = re.search(pattern, line.lower())
+                if match:
+                    score_val = int(match.group(1))
+                    if 0 <= score_val <= 100:
+                        score = str(score_val)
+                        break
+            if score != "N/A":
+                break
+
+        meaningful_lines = []
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith('|') and not line.startswith('ANALYSIS:') and len(line) > 20:
+                meaningful_lines.append(line)
+                if len(meaningful_lines) >= 3:
+                    break
+        if meaningful_lines:
+            explanation = ' '.join(meaningful_lines)
+            words = explanation.split()
+            if len(words) > 100:
+                explanation = ' '.join(words[:100]) + "..."
+
+        dutch_mentions = [
+            line.strip() for line in lines
+            if any(word in line.lower() for word in ['dutch', 'netherlands', 'amsterdam', 'rotterdam', 'eindhoven'])
+        ]
+        if dutch_mentions:
+            ecosystem_fit = ' '.join(dutch_mentions[:2])
+            words = ecosystem_fit.split()
+            if len(words) > 100:
+                ecosystem_fit = ' '.join(words[:100]) + "..."
+        else:
+            ecosystem_fit = "No specific Dutch market mention found"
+
+        # Extract sources details from text if not found in table
+        if not sources_details:
+            sources_mentions = []
+            for line in lines:
+                if any(word in line.lower() for word in ['linkedin', 'website', 'news', 'source', 'patent', 'trade', 'industry', 'regulatory', 'publication', 'database', 'project', 'accelerator', 'portxl', 'buccaneer', 'horizon', 'interreg', 'emsa', 'imo']):
+                    sources_mentions.append(line.strip())
+
+            if sources_mentions:
+                sources_details = ' '.join(sources_mentions[:4])  # Take up to 4 sources
+                if len(sources_details) > 250:
+                    sources_details = sources_details[:250] + "..."
+            else:
+                sources_details = "No specific sources mentioned"
+
+    return (sector, score, explanation, ecosystem_fit, potential_connections, sources_details), method
 
-    input_data = read_csv(input_file)
 
-    if not input_data:
+def enrich_row(row, markdown_row, reordered_headers):
+    return fill_gpt_fields(row, parse_analysis_response(markdown_row), reordered_headers)
+
+
+def fill_gpt_fields(row, fields, reordered_headers):
+    sector, score, explanation, ecosystem_fit, potential_connections, sources_details = fields
+
+    enriched_row = {
+        **row,
+        GPT_FIELDS[0]: sector,
+        GPT_FIELDS[1]: score,
+        GPT_FIELDS[2]: explanation,
+        GPT_FIELDS[3]: ecosystem_fit,
+        GPT_FIELDS[4]: potential_connections,
+        GPT_FIELDS[5]: sources_details
+    }
+    return {field: enriched_row.get(field, "") for field in reordered_headers}
+
+
+def failure_fields(usage):
+    # GPT columns of a row whose analysis failed; the row stays in the output so the
+    # file keeps every company, and --retry-failed replaces it later
+    error = usage.get("error", "API error")
+    return "", "N/A", f"Analysis failed ({error}); rerun with --retry-failed", "", "", ""
+
+
+def triage_response(row, prescore, signal_bits):
+    # Same 9-column row as the prompt output, with an empty GPT Score
+    return (f"| | {guess_sector(row)} | | | Not analyzed: heuristic pre-score {prescore:.0f} is below the "
+            f"triage cut-off. Signals: {describe_signals(signal_bits)}. | | | | Input data (heuristic triage) |")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ROM Utrecht Region FDI trade fair analysis")
+    parser.add_argument("--input", default="Project/IBC_2025_Complete -Dealroom and Achilles data.csv",
+                        help="Input CSV exported from Dealroom/Achilles")
+    parser.add_argument("--output", default="Project/output.csv", help="Enriched output CSV")
+    parser.add_argument("--concurrency", type=int, default=5,
+                        help="Number of company analyses in flight at once")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Seconds before an OpenAI request times out (env OPENAI_TIMEOUT)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Companies packed into one request (1 = one request per company)")
+    parser.add_argument("--tpm", type=int, default=DEFAULT_TPM,
+                        help="Tokens-per-minute budget of the OpenAI account (env OPENAI_TPM_LIMIT)")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_RPM,
+                        help="Requests-per-minute budget of the OpenAI account (env OPENAI_RPM_LIMIT)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                        help="SQLite response cache; manage it with `python cache.py`")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the API")
+    parser.add_argument("--structured", action="store_true",
+                        help="Request JSON structured output (typed fields) instead of a markdown table row")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream single-company answers and stop reading once the table row is complete")
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS,
+                        help="Completion token cap of streamed answers (default: twice the expected row)")
+    parser.add_argument("--sector-prompts", action="store_true",
+                        help="Classify the sector locally and send only that sector's rules and signals; "
+                             "companies below --sector-confidence get the full prompt")
+    parser.add_argument("--sector-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE,
+                        help="Minimum classifier confidence (0-1) for a slim sector prompt")
+    parser.add_argument("--prefetch", action="store_true",
+                        help="Fetch each company's website (home, about, contact/locations) and add its text "
+                             "and Dutch locations to the prompt")
+    parser.add_argument("--web-cache", default=DEFAULT_WEB_CACHE_PATH,
+                        help="SQLite page cache for --prefetch; manage it with `python prefetch.py`")
+    parser.add_argument("--prefetch-concurrency", type=int, default=DEFAULT_PREFETCH_CONCURRENCY,
+                        help="Website requests in flight at once (one per host)")
+    parser.add_argument("--prefetch-max-age-hours", type=float, default=DEFAULT_MAX_AGE_HOURS,
+                        help="Cached pages older than this are revalidated with a conditional GET")
+    parser.add_argument("--prefetch-base-url", default=os.getenv("PREFETCH_BASE_URL"),
+                        help="Fetch websites from a stand-in server instead (local_web.py)")
+    parser.add_argument("--no-prescreen", action="store_true",
+                        help="Send companies already in Utrecht Region/the Netherlands to the API as well")
+    parser.add_argument("--previous",
+                        help="Previous output CSV or checkpoint journal; companies whose input did not change "
+                             "keep their GPT columns instead of being analyzed again")
+    parser.add_argument("--entity-index", default=DEFAULT_INDEX_PATH,
+                        help="Cross-fair company index; manage it with `python entities.py`")
+    parser.add_argument("--entity-max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS,
+                        help="Analyses older than this are not reused from the entity index")
+    parser.add_argument("--no-dedupe", action="store_true",
+                        help="Analyze every row, even when the same company appears more than once or in earlier fairs")
+    parser.add_argument("--top-k", type=int,
+                        help="Only analyze the K companies with the highest heuristic pre-score")
+    parser.add_argument("--min-prescore", type=float,
+                        help="Only analyze companies with at least this heuristic pre-score (0-100)")
+    parser.add_argument("--escalate", action="store_true",
+                        help="Analyze companies whose score is in the uncertainty band, or whose answer could not "
+                             "be parsed, again with --escalation-model")
+    parser.add_argument("--escalation-model", default=ESCALATION_MODEL,
+                        help="Stronger model for escalated companies (env OPENAI_ESCALATION_MODEL)")
+    parser.add_argument("--uncertainty-band", type=parse_band, default=DEFAULT_BAND,
+                        help="Score range LOW-HIGH that is escalated (default: 40-70)")
+    parser.add_argument("--journal", help="Checkpoint journal (default: <output>.journal.jsonl)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip rows already in the checkpoint journal from a previous run")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES,
+                        help="Retries of a request after a timeout, connection error, 429 or 5xx")
+    parser.add_argument("--breaker-threshold", type=int, default=BREAKER_THRESHOLD,
+                        help="Failures in a row that open the circuit breaker and pause all requests")
+    parser.add_argument("--breaker-cooldown", type=float, default=BREAKER_COOLDOWN,
+                        help="Seconds the circuit breaker stays open before a probe request is sent")
+    parser.add_argument("--dead-letter", help="Rows that failed after every retry (default: <output>.failed.jsonl)")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Analyze only the rows in the dead-letter file again and merge them into the output "
+                             "(implies --resume)")
+    parser.add_argument("--shortlist", help="Ranked top companies per sector and overall "
+                                            "(default: <output>.shortlist.csv)")
+    parser.add_argument("--shortlist-k", type=int, default=DEFAULT_K,
+                        help="Companies per shortlist (0 = no shortlist)")
+    parser.add_argument("--tie-breakers", type=parse_tie_breakers, default=DEFAULT_TIE_BREAKERS,
+                        help="Order of shortlist tie-breakers for equal GPT Scores, from funding (most recent "
+                             "round), growth (employee growth), achilles (in Achilles); default: "
+                             + ",".join(DEFAULT_TIE_BREAKERS))
+    parser.add_argument("--shard", type=parse_shard,
+                        help="Analyze only shard I of N (e.g. 2/4), assigned by a hash of the company website or "
+                             "name; output, journal and metrics go to <output>.shard-I-of-N.*")
+    parser.add_argument("--merge-shards", type=int, metavar="N",
+                        help="Rebuild --output in input order from the journals of N finished shards")
+    parser.add_argument("--shard-journals", nargs="+",
+                        help="Shard journals to merge, in shard order (default: <output>.shard-I-of-N.journal.jsonl)")
+    parser.add_argument("--metrics", help="Per-row timings, tokens and cost (default: <output>.metrics.jsonl)")
+    parser.add_argument("--batch-api", choices=["write", "submit", "poll", "ingest", "run"],
+                        help="Offline mode through the OpenAI Batch API: write the request file, submit it, "
+                             "poll until done, ingest the results, or run all steps")
+    parser.add_argument("--batch-requests", help="Batch request file (default: <output>.batch_requests.jsonl)")
+    parser.add_argument("--batch-poll-interval", type=float, default=60.0,
+                        help="Seconds between Batch API status checks")
+    return parser.parse_args(argv)
+
+
+def run_batch_api_steps(args, pending_rows, answered_locally, prefetcher=None):
+    # write/submit/poll steps of --batch-api; returns False when the run should stop
+    # before ingesting results
+    state_file = default_state_path(args.output)
+    requests_file = args.batch_requests or os.path.splitext(args.output)[0] + ".batch_requests.jsonl"
+
+    if args.batch_api in ("write", "submit", "run"):
+        api_rows = ((idx, row) for idx, row in pending_rows if not answered_locally(idx, row))
+        if prefetcher is not None:
+            api_rows = prefetcher.iter_prefetched(api_rows)
+        count = write_batch_requests(api_rows, requests_file)
+        print(f"📝 Wrote {count} batch requests to {requests_file}")
+        if args.batch_api == "write":
+            return False
+        submit_batch(get_client(), requests_file, state_file, args.input)
+        if args.batch_api == "submit":
+            return False
+
+    if args.batch_api in ("poll", "run"):
+        state = load_state(state_file)
+        if state is None:
+            print(f"❌ No submitted batch found in {state_file}. Run with --batch-api submit first.")
+            return False
+        batch = poll_batch(get_client(), state["batch_id"], args.batch_poll_interval)
+        if args.batch_api == "poll" or batch.status != "completed":
+            return False
+    return True
+
+
+def merge_shard_outputs(args):
+    original_headers = read_header(args.input)
+    if not original_headers:
         print("No data found.")
+        return False
+    if args.shard_journals and len(args.shard_journals) != args.merge_shards:
+        print(f"❌ --merge-shards {args.merge_shards} needs {args.merge_shards} shard journals, "
+              f"got {len(args.shard_journals)}")
+        return False
+    shortlist = Shortlist(args.shortlist_k, args.tie_breakers) if args.shortlist_k > 0 else None
+    problems = merge_shards(args.input, args.output, args.merge_shards, build_output_headers(original_headers),
+                            args.shard_journals, route_field=ROUTE_FIELD,
+                            on_row=shortlist.add if shortlist is not None else None)
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        print(f"❌ {args.output} was not written; finish or rerun the shards listed above and merge again")
+        return False
+    if shortlist is not None:
+        shortlist_file = args.shortlist or default_shortlist_path(args.output)
+        shortlist.write(shortlist_file)
+        shortlist.print_summary(shortlist_file)
+    return True
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.merge_shards:
+        if not merge_shard_outputs(args):
+            raise SystemExit(1)
         return
+    if args.retry_failed:
+        args.resume = True
+    if args.shard is not None:
+        # Everything derived from --output (journal, metrics, dead letters, Batch API
+        # files) becomes shard-local with it
+        args.output = shard_output_path(args.output, *args.shard)
+        print(f"🧩 Shard {args.shard[0]}/{args.shard[1]}: writing {args.output}")
+    input_file = args.input
+    output_file = args.output
+    configure_rate_limits(args.tpm, args.rpm)
+    breaker = configure_retries(args.max_retries, CircuitBreaker(args.breaker_threshold, args.breaker_cooldown))
+    # One keep-alive connection per request in flight, shared by every row
+    configure_clients(args.timeout, max_connections=args.concurrency)
+    configure_response_cache(None if args.no_cache else args.cache)
+    configure_structured_output(args.structured)
+    configure_sector_prompts(args.sector_prompts, args.sector_confidence)
+    configure_streaming(args.stream, args.max_tokens)
+    if args.stream and (args.batch_size > 1 or args.batch_api):
+        print("⚠️ --stream only applies to single-company requests; batched requests are read whole")
+    prefetcher = None
+    if args.prefetch:
+        prefetcher = WebsitePrefetcher(PageCache(args.web_cache), args.prefetch_concurrency,
+                                       args.prefetch_max_age_hours, base_url=args.prefetch_base_url)
+    configure_website_context(prefetcher.context if prefetcher is not None else None)
 
-    original_headers = list(input_data[0].keys())
+    original_headers = read_header(input_file)
 
-    gpt_fields = [
-        "Analyzed Sector",
-        "GPT Score",
-        "GPT Score Explanation",
-        "GPT Dutch Ecosystem Fit & Chain Partners",
-        "Potential connections and partnerships in Utrecht Region",
-        "GPT Source"
-    ]
+    if not original_headers:
+        print("No data found.")
+        return
 
-    # Insert new GPT fields after "Short description" field
-    short_desc_index = None
-    for i, header in enumerate(original_headers):
-        if 'description' in header.lower() or 'summary' in header.lower():
-            short_desc_index = i
-            break
-    
-    if short_desc_index is not None:
-        # Remove ALL existing GPT-related columns to avoid duplicates
-        # This includes variations and partial matches
-        original_headers_clean = []
-        for col in original_headers:
-            is_gpt_column = False
-            for gpt_field in gpt_fields:
-                # Check for exact matches and partial matches
-                if (gpt_field.lower() in col.lower() or 
-                    col.lower() in gpt_field.lower() or
-                    any(word in col.lower() for word in ['gpt', 'score', 'sector', 'explanation', 'ecosystem', 'connections', 'source'])):
-                    is_gpt_column = True
-                    break
-            if not is_gpt_column:
-                original_headers_clean.append(col)
-        
-
-        
-        reordered_headers = (
-            original_headers_clean[:short_desc_index + 1] + 
-            gpt_fields + 
-            original_headers_clean[short_desc_index + 1:]
-        )
-    else:
-        # Fallback: append at end if no description field found
-        reordered_headers = original_headers + gpt_fields
-
-    # Ensure clean output by removing existing file if it exists
-    import os
-    if os.path.exists(output_file):
-        os.remove(output_file)
-    
-    with open(output_file, "w", newline='', encoding="utf-8-sig") as out_csv:
-        writer = csv.DictWriter(out_csv, fieldnames=reordered_headers)
-        writer.writeheader()
-
-        # Store processed rows to save periodically
-        processed_rows = []
-        
-        for idx, row in enumerate(input_data, 1):
-            print(f"Processing row {idx}: {row.get('Firm name')}")
-            markdown_row = get_company_analysis(row)
+    for line in describe_schema(compile_schema(original_headers)):
+        print(line)
+    reordered_headers = build_output_headers(original_headers)
+    router = None
+    if args.escalate:
+        router = TieredRouter(parse_analysis, args.escalation_model, args.uncertainty_band)
+        if ROUTE_FIELD not in reordered_headers:
+            reordered_headers.append(ROUTE_FIELD)
+        if args.batch_api:
+            print("⚠️ --escalate does not apply to Batch API results; they keep their first-pass answers")
+    journal_file = args.journal or default_journal_path(output_file)
+
+    # Rows already in the journal with identical input are not analyzed again
+    journaled = {}
+    if args.resume:
+        journaled = journal_keys(journal_file)
+        print(f"⏩ Resuming: {len(journaled)} companies already in {journal_file}")
+
+    # Rows whose analysis failed after every retry; --retry-failed runs only those.
+    # Only read here: the file is opened (and truncated without --resume) just before
+    # the row pipeline, so the --batch-api steps leave it alone.
+    dead_letter_file = args.dead_letter or default_dead_letter_path(output_file)
+    retry_only = None
+    if args.retry_failed:
+        retry_only = set(load_dead_letters(dead_letter_file))
+        if not retry_only:
+            print(f"✅ No failed rows in {dead_letter_file}, nothing to retry.")
+            return
+        print(f"🩹 Retrying {len(retry_only)} failed companies from {dead_letter_file}")
+
+    # Read time per row still in flight, for the end-to-end row latency
+    read_at = {}
+
+    def pending_rows():
+        # Read stage: one input row at a time, skipping rows finished by an earlier run
+        for idx, row in iter_input_rows(input_file):
+            if args.shard is not None and shard_of(row, args.shard[1]) != args.shard[0]:
+                continue
+            if retry_only is not None and idx not in retry_only:
+                continue
+            if journaled.get(idx) != row_key(row):
+                read_at[idx] = time.perf_counter()
+                yield idx, row
+
+    completed = 0
+    prescreened = 0
+
+    # Loaded up front, so --previous may point at the output file this run replaces
+    previous = PreviousResults(args.previous, GPT_FIELDS) if args.previous else None
+    if previous is not None:
+        print(f"♻️ Loaded {len(previous)} scored companies from {args.previous}")
+
+    # Companies analyzed before, in this or another fair, keyed by website domain and LinkedIn
+    # page; like the response cache it is skipped with --no-cache
+    entity_index = None if args.no_dedupe or args.no_cache \
+        else EntityIndex(args.entity_index, args.entity_max_age_days)
+    fair = os.path.basename(input_file)
+
+    # Heuristic pre-score of the whole input; companies outside the --top-k /
+    # --min-prescore cut-off are not sent to the API
+    triage = None
+    if args.top_k is not None or args.min_prescore is not None:
+        started = time.perf_counter()
+        prescores, signal_bits = score_input(input_file)
+        triage = triage_mask(prescores, args.top_k, args.min_prescore)
+        print(f"🧮 Pre-scored {len(prescores)} companies in {time.perf_counter() - started:.2f}s; "
+              f"{int(triage.sum())} selected for analysis")
+
+    def triaged(idx):
+        return triage is not None and idx <= len(triage) and not triage[idx - 1]
+
+    def local_analysis(idx, row):
+        # Unchanged companies keep their previous analysis, then the local pre-screen,
+        # then the latest analysis of the same company from the entity index, and
+        # companies cut by the triage get a note instead of an API call
+        nonlocal prescreened
+        if previous is not None:
+            carried = previous.analysis(row)
+            if carried is not None:
+                return carried
+        if not args.no_prescreen:
+            markdown_row = prescreen_company(row)
+            if markdown_row is not None:
+                prescreened += 1
+                return markdown_row, empty_usage("prescreen")
+        if entity_index is not None:
+            indexed = entity_index.lookup(entity_keys(row), input_fingerprint(row))
+            if indexed is not None:
+                return indexed, empty_usage("entity_index")
+        if triaged(idx):
+            return triage_response(row, prescores[idx - 1], signal_bits[idx - 1]), empty_usage("triage")
+        return None
+
+    def answered_locally(idx, row):
+        if triaged(idx):
+            return True
+        if previous is not None and previous.lookup(row) is not None:
+            return True
+        if not args.no_prescreen and prescreen_company(row) is not None:
+            return True
+        return entity_index is not None and entity_index.lookup(entity_keys(row), input_fingerprint(row)) is not None
+
+    if args.batch_api and not run_batch_api_steps(args, pending_rows(), answered_locally, prefetcher):
+        return
+
+    dead_letters = DeadLetterFile(dead_letter_file, resume=args.resume)
+
+    # Without --resume rows are written to output.csv as they complete; a resumed run
+    # rebuilds the file from the journal at the end so earlier rows are included
+    output_writer = None if args.resume else OutputWriter(output_file, reordered_headers)
+
+    # Top companies per sector and overall, updated as rows finish; a resumed run
+    # rebuilds it from the journal at the end so earlier rows are ranked too
+    shortlist = Shortlist(args.shortlist_k, args.tie_breakers) if args.shortlist_k > 0 else None
+    shortlist_file = args.shortlist or default_shortlist_path(output_file)
+
+    metrics_file = args.metrics or default_metrics_path(output_file)
+    with CheckpointJournal(journal_file, resume=args.resume) as journal, \
+            RunMetrics(metrics_file, MODEL, resume=args.resume) as metrics:
+        def write_result(idx, row, markdown_row, usage):
+            # Parse and write stage, on the writer thread
+            nonlocal completed
+            firm = company_record(row).firm_name
+            print(f"Processed row {idx}: {firm}")
             print(f"AI Response for row {idx}: {markdown_row[:200]}...")
+            if usage["source"] in ("api", "batch", "batch_api"):
+                print(f"🧮 Tokens row {idx}: {usage['prompt_tokens']} input "
+                      f"({usage['cached_tokens']} cached, {usage['uncached_tokens']} uncached), "
+                      f"{usage['completion_tokens']} output")
 
+            parse_started = time.perf_counter()
+            failed = markdown_row == "API_ERROR"
             try:
-                lines = markdown_row.split('\n')
-                sector = ""
-                score = "N/A"
-                explanation = ""
-                ecosystem_fit = ""
-                potential_connections = ""
-                sources_details = ""
-
-                for line in lines:
-                    if line.strip().startswith('|') and '|' in line:
-                        parsed = parse_markdown_row(line)
-                        # Expected 9 columns per prompt: [0]=Short desc, [1]=Analyzed Sector, [2]=empty,
-                        # [3]=GPT Score, [4]=Explanation, [5]=Dutch Ecosystem Fit & Chain Partners,
-                        # [6]=Potential connections, [7]=empty, [8]=GPT Source
-                        if len(parsed) >= 9:
-                            # [0]=Short desc, [1]=Analyzed Sector, [2]=empty,
-                            # [3]=GPT Score, [4]=Explanation, [5]=Dutch Ecosystem Fit & Chain Partners,
-                            # [6]=Potential connections, [7]=empty, [8]=GPT Source
-                            sector = parsed[1].strip()
-                            score = parsed[3].strip()
-                            explanation = parsed[4].strip()
-                            ecosystem_fit = parsed[5].strip()
-                            potential_connections = parsed[6].strip()
-                            sources_details = parsed[8].strip()
-                            break
-
-                if score == "N/A":
-                    score_patterns = [
-                        r'score[:\s]*(\d{1,3})',
-                        r'rating[:\s]*(\d{1,3})',
-                        r'(\d{1,3})/100',
-                        r'(\d{1,3})\s*out\s*of\s*100',
-                        r'assessment[:\s]*(\d{1,3})'
-                    ]
-                    for line in lines:
-                        for pattern in score_patterns:
-                            match = re.search(pattern, line.lower())
-                            if match:
-                                score_val = int(match.group(1))
-                                if 0 <= score_val <= 100:
-                                    score = str(score_val)
-                                    break
-                        if score != "N/A":
-                            break
-
-                    meaningful_lines = []
-                    for line in lines:
-                        line = line.strip()
-                        if line and not line.startswith('|') and not line.startswith('ANALYSIS:') and len(line) > 20:
-                            meaningful_lines.append(line)
-                            if len(meaningful_lines) >= 3:
-                                break
-                    if meaningful_lines:
-                        explanation = ' '.join(meaningful_lines)
-                        words = explanation.split()
-                        if len(words) > 100:
-                            explanation = ' '.join(words[:100]) + "..."
-
-                    dutch_mentions = [
-                        line.strip() for line in lines
-                        if any(word in line.lower() for word in ['dutch', 'netherlands', 'amsterdam', 'rotterdam', 'eindhoven'])
-                    ]
-                    if dutch_mentions:
-                        ecosystem_fit = ' '.join(dutch_mentions[:2])
-                        words = ecosystem_fit.split()
-                        if len(words) > 100:
-                            ecosystem_fit = ' '.join(words[:100]) + "..."
-                    else:
-                        ecosystem_fit = "No specific Dutch market mention found"
-
-                    # Extract sources details from text if not found in table
-                    if not sources_details:
-                        sources_mentions = []
-                        for line in lines:
-                            if any(word in line.lower() for word in ['linkedin', 'website', 'news', 'source', 'patent', 'trade', 'industry', 'regulatory', 'publication', 'database', 'project', 'accelerator', 'portxl', 'buccaneer', 'horizon', 'interreg', 'emsa', 'imo']):
-                                sources_mentions.append(line.strip())
-                        
-                        if sources_mentions:
-                            sources_details = ' '.join(sources_mentions[:4])  # Take up to 4 sources
-                            if len(sources_details) > 250:
-                                sources_details = sources_details[:250] + "..."
-                        else:
-                            sources_details = "No specific sources mentioned"
-
-                enriched_row = {
-                    **row,
-                    gpt_fields[0]: sector,
-                    gpt_fields[1]: score,
-                    gpt_fields[2]: explanation,
-                    gpt_fields[3]: ecosystem_fit,
-                    gpt_fields[4]: potential_connections,
-                    gpt_fields[5]: sources_details
-                }
-
-                ordered_row = {field: enriched_row.get(field, "") for field in reordered_headers}
-                processed_rows.append(ordered_row)
-                
-                # Save progress every 5 companies
-                if idx % 5 == 0:
-                    print(f"💾 Saving progress after {idx} companies...")
-                    # Write all processed rows to file
-                    with open(output_file, "w", newline='', encoding="utf-8-sig") as temp_csv:
-                        temp_writer = csv.DictWriter(temp_csv, fieldnames=reordered_headers)
-                        temp_writer.writeheader()
-                        temp_writer.writerows(processed_rows)
-                    print(f"✅ Progress saved! {idx}/{len(input_data)} companies completed.")
-
+                fields, parse_method = (failure_fields(usage), "error") if failed else parse_analysis(markdown_row)
+                ordered_row = fill_gpt_fields(row, fields, reordered_headers)
+                if router is not None:
+                    ordered_row[ROUTE_FIELD] = usage.get("route", usage["source"])
             except Exception as e:
                 print(f"❌ Failed to process row {idx}: {e}")
-                continue
-        
-        # Final save - write all processed rows
-        print(f"💾 Final save - writing all {len(processed_rows)} companies to output file...")
-        with open(output_file, "w", newline='', encoding="utf-8-sig") as final_csv:
-            final_writer = csv.DictWriter(final_csv, fieldnames=reordered_headers)
-            final_writer.writeheader()
-            final_writer.writerows(processed_rows)
-        print(f"🎉 All done! Output saved to {output_file}")
+                read_at.pop(idx, None)
+                return
+
+            if entity_index is not None and usage["source"] in ("api", "batch", "batch_api") \
+                    and markdown_row != "API_ERROR" and fields[1] != "N/A":
+                entity_index.record(entity_keys(row), firm, markdown_row,
+                                    usage.get("model", MODEL), fair, input_fingerprint(row))
+            if previous is not None and usage["source"] in ("api", "batch", "batch_api"):
+                previous.record_analyzed(row)
+
+            write_started = time.perf_counter()
+            key = row_key(row)
+            record = {"idx": idx, "key": key, "row": ordered_row, "usage": usage}
+            if failed:
+                record["failed"] = True
+                dead_letters.failed_row(idx, key, firm, usage.get("error", "API error"))
+            else:
+                dead_letters.succeeded_row(idx, key)
+            journal.append(record)
+            if output_writer is not None:
+                output_writer.write(ordered_row)
+            if shortlist is not None:
+                shortlist.add(idx, ordered_row, company_record(row))
+            written_at = time.perf_counter()
+            metrics.record(idx, row, usage, parse_method, written_at - read_at.pop(idx, parse_started),
+                           parse_seconds=write_started - parse_started, write_seconds=written_at - write_started)
+            completed += 1
+            if completed % 5 == 0:
+                print(f"✅ Progress saved! {completed} companies completed.")
+                if shortlist is not None and shortlist.changed:
+                    shortlist.write(shortlist_file)
+
+        with StageWorker(write_result) as writer:
+            if args.batch_api:
+                print("📥 Ingesting Batch API results...")
+                ingest_batch(get_client(), default_state_path(output_file), pending_rows(), writer.put,
+                             local_analysis=local_analysis)
+            else:
+                print(f"🚀 Analyzing companies with up to {args.concurrency} requests in flight...")
+                run_analyses(pending_rows(), args.concurrency, writer.put,
+                             local_analysis=local_analysis,
+                             batch_size=args.batch_size,
+                             entity_keys=None if args.no_dedupe else entity_keys,
+                             router=router,
+                             prefetch=prefetcher)
+
+        summary = metrics.print_summary()
+
+    dead_letters.close()
+    if breaker.trips:
+        print(f"🔌 The circuit breaker opened {breaker.trips} times during API outages")
+    if dead_letters.recovered:
+        print(f"🩹 {dead_letters.recovered} previously failed companies analyzed successfully")
+    if dead_letters.failing:
+        print(f"☠️ {len(dead_letters.failing)} companies still failed after {args.max_retries} retries; they are "
+              f"listed in {dead_letter_file}. Run again with --retry-failed to analyze only those.")
+
+    if entity_index is not None:
+        entity_index.close()
+        folded = summary["sources"].get("duplicate", 0)
+        indexed = summary["sources"].get("entity_index", 0)
+        if folded or indexed:
+            print(f"🔗 {folded} duplicate rows shared an in-flight analysis, "
+                  f"{indexed} rows reused an analysis from the entity index ({args.entity_index})")
+
+    if prefetcher is not None:
+        prefetcher.print_summary()
+        configure_website_context(None)
+        prefetcher.cache.close()
+    if previous is not None:
+        previous.print_summary()
+    if prescreened:
+        print(f"🏠 {prescreened} companies already in Utrecht Region/the Netherlands scored locally without an API call")
+
+    if output_writer is not None:
+        output_writer.close()
+        print(f"🎉 All done! {completed} companies saved to {output_file}")
+    else:
+        # Build the output file from the journal in one streaming pass
+        print(f"💾 Writing output file from {journal_file}...")
+        if shortlist is not None:
+            shortlist = Shortlist(args.shortlist_k, args.tie_breakers)
+        written = build_output_from_journal(journal_file, output_file, reordered_headers,
+                                            on_row=shortlist.add if shortlist is not None else None)
+        print(f"🎉 All done! {written} companies saved to {output_file}")
+    if shortlist is not None:
+        shortlist.write(shortlist_file)
+        shortlist.print_summary(shortlist_file)
 
 
 if __name__ == "__main__":
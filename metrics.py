@@ -0,0 +1,218 @@
+import json
+import os
+import time
+
+from schema import company_record
+
+
+# Per-row instrumentation: every written row gets one JSON line in the metrics file
+# with its stage timings, token counts, retries and which parser handled the
+# answer. summary() condenses the run into latency percentiles, throughput and cost.
+
+# USD per 1M tokens: (input, cached input, output). Batch API requests are billed at half price.
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+}
+BATCH_API_DISCOUNT = 0.5
+
+TOKEN_FIELDS = ("prompt_tokens", "cached_tokens", "uncached_tokens", "completion_tokens")
+STAGES = ("prompt_seconds", "wait_seconds", "api_seconds", "parse_seconds", "write_seconds")
+
+
+def default_metrics_path(output_file):
+    return os.path.splitext(output_file)[0] + ".metrics.jsonl"
+
+
+def percentile(values, pct):
+    # Nearest-rank percentile of an already sorted list
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * pct // 100))
+    return values[int(rank) - 1]
+
+
+def estimate_cost(usage, model):
+    # A routed row (see routing.py) costs the sum of its tiers
+    if "tiers" in usage:
+        costs = [tier["cost_usd"] for tier in usage["tiers"]]
+        return None if None in costs else sum(costs)
+    prices = MODEL_PRICES.get(usage.get("model", model))
+    if prices is None:
+        return None
+    input_price, cached_price, output_price = prices
+    cost = ((usage.get("uncached_tokens") or 0) * input_price
+            + (usage.get("cached_tokens") or 0) * cached_price
+            + (usage.get("completion_tokens") or 0) * output_price) / 1_000_000
+    if usage.get("source") == "batch_api":
+        cost *= BATCH_API_DISCOUNT
+    return cost
+
+
+class RunMetrics:
+    def __init__(self, path, model, resume=False):
+        self.path = path
+        self.model = model
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.sources = {}
+        self.parse_methods = {}
+        self.retries = 0
+        self.tokens = dict.fromkeys(TOKEN_FIELDS, 0)
+        self.cost = 0.0 if model in MODEL_PRICES else None
+        self.model_costs = {}
+        self.latencies = []
+        self.api_latencies = []
+        self.tiers = {}
+        self.prompts = {}
+        self.streams = {}
+        self._file = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def record(self, idx, row, usage, parse_method, wall_seconds, **timings):
+        source = usage.get("source", "api")
+        row_cost = estimate_cost(usage, self.model)
+        record = {
+            "idx": idx,
+            "firm": company_record(row).firm_name,
+            "source": source,
+            "parse": parse_method,
+            "wall_seconds": round(wall_seconds, 4),
+            "retries": usage.get("retries", 0),
+            "cost_usd": round(row_cost, 6) if row_cost is not None else None
+        }
+        if "prompt" in usage:
+            record["prompt"] = usage["prompt"]
+        if "stream" in usage:
+            record["stream"] = usage["stream"]
+        if "route" in usage:
+            record["route"] = usage["route"]
+            record["tiers"] = usage["tiers"]
+        for stage in STAGES:
+            record[stage] = round(timings.get(stage, usage.get(stage, 0.0)), 6)
+        for field in TOKEN_FIELDS:
+            record[field] = usage.get(field, 0)
+        if self._file is not None:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+        self.rows += 1
+        self.sources[source] = self.sources.get(source, 0) + 1
+        self.parse_methods[parse_method] = self.parse_methods.get(parse_method, 0) + 1
+        self.retries += record["retries"]
+        for field in TOKEN_FIELDS:
+            self.tokens[field] += record[field]
+        if self.cost is not None and row_cost is not None:
+            self.cost += row_cost
+        # Cost per model: a routed row is split over the models of its tiers
+        if "tiers" in usage:
+            costs = [(tier["model"], tier["cost_usd"]) for tier in usage["tiers"]]
+        else:
+            costs = [(usage.get("model", self.model), row_cost)]
+        for model, cost in costs:
+            if cost:
+                self.model_costs[model] = self.model_costs.get(model, 0.0) + cost
+        self.latencies.append(record["wall_seconds"])
+        if source in ("api", "batch"):
+            self.api_latencies.append(record["api_seconds"])
+        # Input tokens and API time per system prompt variant (full or slim, see sectors.py)
+        for call in usage.get("tiers", [usage]):
+            if call.get("prompt") and call.get("source", source) in ("api", "batch"):
+                variant = "full" if call["prompt"] == "full" else "slim"
+                totals = self.prompts.setdefault(variant, {"calls": 0, "prompt_tokens": 0, "api_seconds": 0.0})
+                totals["calls"] += 1
+                totals["prompt_tokens"] += call.get("prompt_tokens", 0)
+                totals["api_seconds"] += call.get("api_seconds", 0.0)
+        # How streamed answers ended: "cut off" after the table row, "complete" or "max tokens"
+        for call in usage.get("tiers", [usage]):
+            if call.get("stream"):
+                self.streams[call["stream"]] = self.streams.get(call["stream"], 0) + 1
+        for tier in usage.get("tiers", ()):
+            totals = self.tiers.setdefault(tier["model"], {"companies": 0, "api_seconds": 0.0, "cost_usd": 0.0})
+            totals["companies"] += 1
+            totals["api_seconds"] += tier["api_seconds"]
+            if tier["cost_usd"] is not None:
+                totals["cost_usd"] += tier["cost_usd"]
+        return record
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        latencies = sorted(self.latencies)
+        api_latencies = sorted(self.api_latencies)
+        return {
+            "rows": self.rows,
+            "elapsed_seconds": round(elapsed, 2),
+            "rows_per_minute": round(self.rows / elapsed * 60, 1) if elapsed > 0 else 0.0,
+            "latency": {f"p{pct}": round(percentile(latencies, pct), 3) for pct in (50, 95, 99)},
+            "api_latency": {f"p{pct}": round(percentile(api_latencies, pct), 3) for pct in (50, 95, 99)},
+            "retries": self.retries,
+            "sources": dict(self.sources),
+            "parse_methods": dict(self.parse_methods),
+            "tokens": dict(self.tokens),
+            "cost_usd": round(self.cost, 4) if self.cost is not None else None,
+            "cost_by_model": {model: round(cost, 4) for model, cost in self.model_costs.items()},
+            "tiers": {model: {"companies": totals["companies"], "api_seconds": round(totals["api_seconds"], 2),
+                              "cost_usd": round(totals["cost_usd"], 4)}
+                      for model, totals in self.tiers.items()},
+            "prompts": {variant: {"calls": totals["calls"],
+                                  "avg_prompt_tokens": round(totals["prompt_tokens"] / totals["calls"]),
+                                  "avg_api_seconds": round(totals["api_seconds"] / totals["calls"], 3)}
+                        for variant, totals in self.prompts.items()},
+            "streams": dict(self.streams)
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        latency, api_latency, tokens = summary["latency"], summary["api_latency"], summary["tokens"]
+        print(f"📊 {summary['rows']} rows in {summary['elapsed_seconds']}s "
+              f"({summary['rows_per_minute']} rows/min)")
+        print(f"⏱️ Row latency p50/p95/p99: {latency['p50']}s / {latency['p95']}s / {latency['p99']}s; "
+              f"API call p50/p95/p99: {api_latency['p50']}s / {api_latency['p95']}s / {api_latency['p99']}s")
+        if tokens["prompt_tokens"]:
+            cached_share = tokens["cached_tokens"] / tokens["prompt_tokens"]
+            print(f"🧮 Input tokens: {tokens['prompt_tokens']} "
+                  f"({tokens['cached_tokens']} cached, {cached_share:.0%} prefix cache hit rate), "
+                  f"output tokens: {tokens['completion_tokens']}")
+        if summary["cost_usd"] is not None:
+            by_model = summary["cost_by_model"]
+            if len(by_model) > 1:
+                models = " + ".join(f"{model} ${cost:.4f}" for model, cost in by_model.items())
+                print(f"💶 Estimated cost: ${summary['cost_usd']:.4f} over {len(by_model)} models ({models})")
+            else:
+                print(f"💶 Estimated cost: ${summary['cost_usd']:.4f} ({next(iter(by_model), self.model)})")
+        for model, totals in summary["tiers"].items():
+            print(f"🪜 {model}: {totals['companies']} companies, {totals['api_seconds']}s in API calls, "
+                  f"${totals['cost_usd']:.4f}")
+        if "slim" in summary["prompts"]:
+            for variant, totals in summary["prompts"].items():
+                print(f"✂️ {variant.capitalize()} prompt: {totals['calls']} calls, "
+                      f"{totals['avg_prompt_tokens']} input tokens and {totals['avg_api_seconds']}s per call on average")
+        if summary["streams"]:
+            streams = summary["streams"]
+            print(f"📡 {sum(streams.values())} streamed answers: {streams.get('cut off', 0)} cut off after the "
+                  f"table row, {streams.get('max tokens', 0)} stopped at max_tokens")
+        fallbacks = summary["parse_methods"].get("fallback", 0)
+        print(f"🔁 {summary['retries']} retries, {fallbacks} responses needed the text fallback parser")
+        if self._file is not None:
+            # The last line of every run holds its summary
+            self._file.write(json.dumps({"summary": summary}, ensure_ascii=False) + "\n")
+            self._file.flush()
+            print(f"📈 Per-row metrics written to {self.path}")
+        return summary
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,92 @@
+import csv
+import queue
+import threading
+
+from schema import InputRow, compile_schema
+
+
+# Streaming building blocks for main(): rows are read lazily, finished rows are handed
+# to a writer thread through a bounded queue and written out as soon as they arrive,
+# so memory stays flat no matter how large the export is.
+
+QUEUE_SIZE = 64
+
+_DONE = object()
+
+
+def read_header(file_path):
+    with open(file_path, newline='', encoding='utf-8-sig') as file:
+        return next(csv.reader(file), None)
+
+
+def iter_input_rows(file_path):
+    # Yields (idx, row) with 1-based row numbers, one row in memory at a time. The
+    # header's column schema is compiled once and every row is a compact InputRow.
+    with open(file_path, newline='', encoding='utf-8-sig') as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        schema = compile_schema(header)
+        idx = 0
+        for values in reader:
+            # Blank lines are skipped, as csv.DictReader does
+            if not values:
+                continue
+            idx += 1
+            yield idx, InputRow(schema, values)
+
+
+class OutputWriter:
+    def __init__(self, output_file, headers):
+        self._file = open(output_file, "w", newline='', encoding="utf-8-sig")
+        self._writer = csv.DictWriter(self._file, fieldnames=headers, extrasaction='ignore')
+        self._writer.writeheader()
+        self._file.flush()
+
+    def write(self, row):
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class StageWorker:
+    # Runs handler(*item) for every item put on a bounded queue in a background thread.
+    # put() blocks while the queue is full, which holds back the stage feeding it.
+    def __init__(self, handler, maxsize=QUEUE_SIZE, name="writer"):
+        self._handler = handler
+        self._queue = queue.Queue(maxsize)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if self._error is not None:
+                continue
+            try:
+                self._handler(*item)
+            except BaseException as e:
+                self._error = e
+
+    def put(self, *item):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(item)
+
+    def close(self):
+        self._queue.put(_DONE)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,512 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from entities import normalize_domain
+from pipeline import iter_input_rows
+from prescreen import dutch_places
+from prompts import ROM_FDI_WEBSITE_TEMPLATE
+from schema import company_record
+
+
+# Website prefetch: the prompt treats the company website as a primary source, but the
+# chat completion cannot browse. Before a company is analyzed its home page and up to
+# MAX_EXTRA_PAGES about/contact/locations pages are fetched with a pooled async client,
+# one request at a time per host, and their compact text plus the Dutch locations they
+# mention are added to the prompt. Pages are kept in an SQLite cache and revalidated
+# with conditional GETs (ETag / Last-Modified) once they are older than max_age_hours.
+
+DEFAULT_WEB_CACHE_PATH = "Project/web_cache.sqlite"
+DEFAULT_MAX_AGE_HOURS = 168
+DEFAULT_PREFETCH_CONCURRENCY = 10
+HOST_DELAY = 1.0
+FETCH_TIMEOUT = 15.0
+MAX_EXTRA_PAGES = 3
+MAX_PAGE_BYTES = 1_000_000
+MAX_PAGE_TEXT = 4000
+MAX_CONTEXT_CHARS = 1500
+USER_AGENT = "ROM-Utrecht-FDI-Analysis/1.0 (website prefetch)"
+
+# Links worth following from the home page, most useful first
+PAGE_HINTS = [
+    re.compile(r"location|office|vestiging|standort|where-we-are", re.IGNORECASE),
+    re.compile(r"contact|kontakt", re.IGNORECASE),
+    re.compile(r"about|over-ons|ueber-uns|company|who-we-are", re.IGNORECASE),
+]
+SKIPPED_TAGS = {"script", "style", "noscript", "svg", "template", "iframe"}
+# Repeated on every page: their links are followed but their text is left out
+BOILERPLATE_TAGS = {"nav", "header", "footer"}
+
+
+class _PageParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.description = ""
+        self.links = []
+        self._chunks = []
+        self._skipping = 0
+        self._boilerplate = 0
+        self._in_title = False
+        self._link = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in SKIPPED_TAGS:
+            self._skipping += 1
+        elif tag in BOILERPLATE_TAGS:
+            self._boilerplate += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "meta" and (attrs.get("name") or attrs.get("property") or "").lower() in (
+                "description", "og:description") and not self.description:
+            self.description = (attrs.get("content") or "").strip()
+        elif tag == "a" and attrs.get("href"):
+            self._link = [attrs["href"], ""]
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skipping:
+            self._skipping -= 1
+        elif tag in BOILERPLATE_TAGS and self._boilerplate:
+            self._boilerplate -= 1
+        elif tag == "title":
+            self._in_title = False
+        elif tag == "a" and self._link is not None:
+            self.links.append(tuple(self._link))
+            self._link = None
+
+    def handle_data(self, data):
+        if self._skipping:
+            return
+        if self._in_title:
+            self.title += data
+            return
+        if self._link is not None:
+            self._link[1] += data
+        if not self._boilerplate:
+            self._chunks.append(data)
+
+    def text(self):
+        return re.sub(r"\s+", " ", " ".join(self._chunks)).strip()
+
+
+def extract_page(html):
+    # (title, meta description, visible text, [(href, anchor text)])
+    parser = _PageParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass
+    return parser.title.strip(), parser.description, parser.text()[:MAX_PAGE_TEXT], parser.links
+
+
+def website_url(website):
+    # First URL of the "Company Website" cell, https when no scheme is given
+    url = re.split(r"[\s;,]+", (website or "").strip())[0]
+    if url and "//" not in url:
+        url = "https://" + url
+    return url
+
+
+def select_links(base_url, links, domain, limit=MAX_EXTRA_PAGES):
+    # Same-site about/contact/locations pages linked from the home page
+    ranked = []
+    for href, anchor in links:
+        url = urljoin(base_url, href.strip()).split("#")[0]
+        if not url.startswith(("http://", "https://")) or normalize_domain(url) != domain:
+            continue
+        target = urlsplit(url).path + " " + anchor
+        rank = next((i for i, pattern in enumerate(PAGE_HINTS) if pattern.search(target)), None)
+        if rank is not None and url.rstrip("/") != base_url.rstrip("/"):
+            ranked.append((rank, url))
+    selected = []
+    for _, url in sorted(ranked, key=lambda item: item[0]):
+        if url not in selected:
+            selected.append(url)
+    return selected[:limit]
+
+
+class PageCache:
+    def __init__(self, path=DEFAULT_WEB_CACHE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                domain TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                title TEXT NOT NULL,
+                description TEXT NOT NULL,
+                text TEXT NOT NULL,
+                links TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                checked_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sites (
+                domain TEXT PRIMARY KEY,
+                pages TEXT NOT NULL,
+                context TEXT NOT NULL,
+                locations TEXT NOT NULL,
+                checked_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_page(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, title, description, text, links, checked_at FROM pages WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, title, description, text, links, checked_at = row
+        return {"url": url, "etag": etag, "last_modified": last_modified, "title": title,
+                "description": description, "text": text, "links": json.loads(links), "checked_at": checked_at}
+
+    def put_page(self, url, domain, etag, last_modified, title, description, text, links):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, domain, etag, last_modified, title, description, text, links, "
+                "fetched_at, checked_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, domain, etag, last_modified, title, description, text, json.dumps(links), now, now)
+            )
+            self._conn.commit()
+
+    def touch_page(self, url):
+        # A 304 Not Modified answer: the stored page is current again
+        with self._lock:
+            self._conn.execute("UPDATE pages SET checked_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def get_site(self, domain):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pages, context, locations, checked_at FROM sites WHERE domain = ?", (domain,)
+            ).fetchone()
+        if row is None:
+            return None
+        pages, context, locations, checked_at = row
+        return {"pages": json.loads(pages), "context": context, "locations": json.loads(locations),
+                "checked_at": checked_at}
+
+    def put_site(self, domain, pages, context, locations):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sites (domain, pages, context, locations, checked_at) VALUES (?, ?, ?, ?, ?)",
+                (domain, json.dumps(pages), context, json.dumps(locations), time.time())
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            pages, size, oldest, newest = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(text)), 0), MIN(checked_at), MAX(checked_at) FROM pages"
+            ).fetchone()
+            sites, located = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(locations != '[]'), 0) FROM sites"
+            ).fetchone()
+        return {"pages": pages, "text_bytes": size, "sites": sites, "sites_with_locations": located,
+                "oldest": oldest, "newest": newest}
+
+    def entries(self, limit=20):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT domain, pages, locations, checked_at FROM sites ORDER BY checked_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+
+    def prune(self, max_age_days):
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM pages WHERE checked_at < ?", (cutoff,)).rowcount
+            self._conn.execute("DELETE FROM sites WHERE checked_at < ?", (cutoff,))
+            self._conn.commit()
+        return removed
+
+    def clear(self):
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM pages").rowcount
+            self._conn.execute("DELETE FROM sites")
+            self._conn.commit()
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def build_context(pages):
+    # Compact website text for the prompt: the home page description, then the text of
+    # each page in order until MAX_CONTEXT_CHARS, plus the Dutch places on any page
+    parts = []
+    home = pages[0]
+    if home["description"]:
+        parts.append(home["description"])
+    elif home["title"]:
+        parts.append(home["title"])
+    budget = MAX_CONTEXT_CHARS - sum(len(part) for part in parts)
+    share = max(budget // len(pages), 200)
+    for page in pages:
+        if budget <= 0:
+            break
+        text = page["text"][:min(share, budget)]
+        if text:
+            parts.append(f"[{urlsplit(page['url']).path or '/'}] {text}")
+            budget -= len(text)
+    locations = dutch_places(" ".join(page["text"] for page in pages))
+    return " ".join(parts), locations
+
+
+class WebsitePrefetcher:
+    def __init__(self, cache, concurrency=DEFAULT_PREFETCH_CONCURRENCY, max_age_hours=DEFAULT_MAX_AGE_HOURS,
+                 host_delay=HOST_DELAY, base_url=None):
+        # base_url sends every request to a stand-in server as <base_url>/<host><path>
+        # (see local_web.py); pages are still cached under their real URL
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+        self.max_age = max_age_hours * 3600
+        self.host_delay = host_delay
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.counts = {"sites": 0, "cached_sites": 0, "fetched": 0, "not_modified": 0, "failed": 0}
+        self._client = None
+
+    def _start(self):
+        # Client, semaphore and per-host locks belong to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(FETCH_TIMEOUT),
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+                headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"},
+                follow_redirects=True
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._hosts = {}
+            self._sites = {}
+
+    def _target(self, url):
+        if self.base_url is None:
+            return url
+        parts = urlsplit(url)
+        return f"{self.base_url}/{parts.hostname}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else "")
+
+    @contextlib.asynccontextmanager
+    async def _polite(self, host):
+        # One request at a time per host, at least host_delay seconds apart; the host is
+        # released however the request ends, a cancellation during the wait included
+        entry = self._hosts.setdefault(host, [asyncio.Lock(), 0.0])
+        async with entry[0]:
+            wait = entry[1] + self.host_delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                yield
+            finally:
+                entry[1] = time.monotonic()
+
+    async def _get_page(self, url, domain):
+        cached = self.cache.get_page(url)
+        if cached is not None and time.time() - cached["checked_at"] < self.max_age:
+            return cached
+        headers = {}
+        if cached is not None:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        host = urlsplit(url).hostname or domain
+        async with self._polite(host), self._semaphore:
+            try:
+                async with self._client.stream("GET", self._target(url), headers=headers) as response:
+                    if response.status_code == 304 and cached is not None:
+                        self.cache.touch_page(url)
+                        self.counts["not_modified"] += 1
+                        return cached
+                    content_type = response.headers.get("content-type", "")
+                    if response.status_code != 200 or "html" not in content_type:
+                        self.counts["failed"] += 1
+                        return cached
+                    body = b""
+                    async for chunk in response.aiter_bytes():
+                        body += chunk
+                        if len(body) >= MAX_PAGE_BYTES:
+                            break
+                    html = body.decode(response.encoding or "utf-8", errors="replace")
+                    etag, last_modified = response.headers.get("etag"), response.headers.get("last-modified")
+            except (httpx.HTTPError, httpx.InvalidURL, UnicodeError) as e:
+                print(f"⚠️ Could not fetch {url}: {e.__class__.__name__}")
+                self.counts["failed"] += 1
+                return cached
+
+        title, description, text, links = extract_page(html)
+        self.cache.put_page(url, domain, etag, last_modified, title, description, text, links)
+        self.counts["fetched"] += 1
+        return {"url": url, "title": title, "description": description, "text": text, "links": links}
+
+    async def _fetch_site(self, url, domain):
+        site = self.cache.get_site(domain)
+        if site is not None and time.time() - site["checked_at"] < self.max_age:
+            self.counts["cached_sites"] += 1
+            return site
+        home = await self._get_page(url, domain)
+        if home is None:
+            return site
+        extra = await asyncio.gather(*(self._get_page(link, domain)
+                                       for link in select_links(url, home["links"], domain)))
+        pages = [home] + [page for page in extra if page is not None]
+        context, locations = build_context(pages)
+        self.cache.put_site(domain, [page["url"] for page in pages], context, locations)
+        self.counts["sites"] += 1
+        return self.cache.get_site(domain)
+
+    async def prefetch(self, row):
+        # Fetches the row's website unless it is fresh in the cache; never raises, a
+        # company without a reachable website is simply analyzed without its text
+        url = website_url(company_record(row).company_website)
+        domain = normalize_domain(url)
+        if not domain:
+            return None
+        self._start()
+        # Rows of the same company share one fetch
+        task = self._sites.get(domain)
+        if task is None:
+            task = self._sites[domain] = asyncio.ensure_future(self._fetch_site(url, domain))
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            print(f"⚠️ Website prefetch failed for {domain}: {e}")
+            return None
+        finally:
+            if task.done():
+                self._sites.pop(domain, None)
+
+    async def aclose(self):
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+    def context(self, row):
+        # Prompt block with the cached website text of the row, "" when there is none
+        site = None
+        domain = normalize_domain(website_url(company_record(row).company_website))
+        if domain:
+            site = self.cache.get_site(domain)
+        if site is None or not site["context"]:
+            return ""
+        return ROM_FDI_WEBSITE_TEMPLATE.format(
+            fetched=time.strftime("%Y-%m-%d", time.localtime(site["checked_at"])),
+            pages=", ".join(urlsplit(url).path or "/" for url in site["pages"]),
+            text=site["context"],
+            locations=", ".join(site["locations"]) or "none"
+        )
+
+    def prefetch_all(self, rows):
+        async def run():
+            try:
+                await asyncio.gather(*(self.prefetch(row) for row in rows))
+            finally:
+                await self.aclose()
+        asyncio.run(run())
+
+    def iter_prefetched(self, rows, chunk_size=500):
+        # Synchronous stage for the Batch API request file and the CLI: yields the
+        # (idx, row) pairs again once their chunk's websites are in the cache
+        chunk = []
+        for item in rows:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                self.prefetch_all([row for _, row in chunk])
+                yield from chunk
+                chunk = []
+        if chunk:
+            self.prefetch_all([row for _, row in chunk])
+            yield from chunk
+
+    def print_summary(self):
+        counts = self.counts
+        print(f"🌐 Website prefetch: {counts['sites']} sites read ({counts['fetched']} pages downloaded, "
+              f"{counts['not_modified']} not modified, {counts['failed']} failed), "
+              f"{counts['cached_sites']} sites fresh in the cache")
+
+
+def _format_time(timestamp):
+    if timestamp is None:
+        return "-"
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prefetch company websites and manage the page cache")
+    parser.add_argument("--path", default=DEFAULT_WEB_CACHE_PATH, help="Page cache database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    fetch_parser = commands.add_parser("fetch", help="Fetch the websites of every company in an input CSV")
+    fetch_parser.add_argument("--input", default="Project/IBC_2025_Complete -Dealroom and Achilles data.csv")
+    fetch_parser.add_argument("--concurrency", type=int, default=DEFAULT_PREFETCH_CONCURRENCY)
+    fetch_parser.add_argument("--max-age-hours", type=float, default=DEFAULT_MAX_AGE_HOURS)
+    fetch_parser.add_argument("--base-url", default=os.getenv("PREFETCH_BASE_URL"),
+                              help="Send requests to a stand-in web server (local_web.py)")
+    commands.add_parser("stats", help="Show number of cached pages and sites")
+    list_parser = commands.add_parser("list", help="Show the most recently checked sites")
+    list_parser.add_argument("--limit", type=int, default=20)
+    prune_parser = commands.add_parser("prune", help="Remove pages checked longer ago than --max-age-days")
+    prune_parser.add_argument("--max-age-days", type=float, required=True)
+    commands.add_parser("clear", help="Remove all pages and sites")
+    args = parser.parse_args(argv)
+
+    if args.command != "fetch" and not os.path.exists(args.path):
+        print(f"No page cache found at {args.path}")
+        return
+
+    cache = PageCache(args.path)
+    try:
+        if args.command == "fetch":
+            prefetcher = WebsitePrefetcher(cache, args.concurrency, args.max_age_hours, base_url=args.base_url)
+            started = time.perf_counter()
+            for _ in prefetcher.iter_prefetched(iter_input_rows(args.input)):
+                pass
+            prefetcher.print_summary()
+            print(f"⏱️ {time.perf_counter() - started:.1f}s")
+        elif args.command == "stats":
+            stats = cache.stats()
+            print(f"🌐 Page cache: {args.path}")
+            print(f"Sites: {stats['sites']} ({stats['sites_with_locations']} mention Dutch locations)")
+            print(f"Pages: {stats['pages']} ({stats['text_bytes'] / 1024:.1f} KB of text)")
+            print(f"Oldest: {_format_time(stats['oldest'])}  Newest: {_format_time(stats['newest'])}")
+        elif args.command == "list":
+            for domain, pages, locations, checked_at in cache.entries(args.limit):
+                print(f"{domain}  checked {_format_time(checked_at)}  {len(json.loads(pages))} pages  "
+                      f"locations: {', '.join(json.loads(locations)) or '-'}")
+        elif args.command == "prune":
+            print(f"🧹 Removed {cache.prune(args.max_age_days)} pages")
+        elif args.command == "clear":
+            print(f"🧹 Removed {cache.clear()} pages")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import re
+
+from schema import company_record
+from sectors import guess_sector
+
+
+# STEP 1 and STEP 2 of the scoring rules in prompts.ROM_FDI_PROMPT_TEMPLATE, applied
+# locally so companies that already have a Dutch presence never reach the API.
+
+UTRECHT_REGION_MUNICIPALITIES = [
+    "Amersfoort", "Baarn", "de Bilt", "Bilthoven", "Bunnik", "Bunschoten", "Eemnes", "Houten",
+    "IJsselstein", "Leusden", "Lopik", "Montfoort", "Nieuwegein", "Oudewater", "Renswoude",
+    "Rhenen", "de Ronde Venen", "de Ronde Vennen", "Soest", "Soesterberg", "Stichtse Vecht",
+    "Utrecht", "de Meern", "Utrechtse Heuvelrug", "Veenendaal", "Vijfheerenlanden",
+    "Wijk bij Duurstede", "Woerden", "Woudenberg", "Zeist", "Hilversum", "Gooise Meren",
+    "Blaricum", "Huizen", "Laren"
+]
+
+DUTCH_CITIES = [
+    "Amsterdam", "Rotterdam", "The Hague", "Den Haag", "'s-Gravenhage", "Eindhoven", "Tilburg",
+    "Groningen", "Breda", "Nijmegen", "Enschede", "Apeldoorn", "Haarlem", "Almere", "Arnhem",
+    "Maastricht", "Leiden", "Delft", "Zwolle", "Hoofddorp", "Schiphol", "Amstelveen",
+    "Den Bosch", "'s-Hertogenbosch", "Dordrecht", "Zoetermeer", "Helmond", "Venlo", "Deventer",
+    "Leeuwarden", "Hengelo", "Alkmaar", "Zaandam", "Wageningen", "Naarden", "Nederhorst den Berg"
+]
+
+DUTCH_PROVINCES = [
+    "Utrecht", "North Holland", "Noord-Holland", "South Holland", "Zuid-Holland", "North Brabant",
+    "Noord-Brabant", "Gelderland", "Overijssel", "Flevoland", "Groningen", "Friesland", "Fryslân",
+    "Drenthe", "Zeeland", "Limburg"
+]
+
+# Place names that also exist outside the Netherlands (Soest in Germany, Rotterdam
+# and Amsterdam in New York state); only trusted when the field also names the Netherlands.
+AMBIGUOUS_PLACES = {"soest", "laren", "rotterdam", "amsterdam"}
+
+NETHERLANDS_VALUES = {"yes", "ja", "true", "y"}
+
+
+def _compile_names(names, flags=re.IGNORECASE):
+    # Longest names first so "Utrechtse Heuvelrug" wins over "Utrecht"; the lookarounds
+    # make every name a standalone token, so "NL" never matches inside "NLP".
+    alternatives = sorted({re.escape(name) for name in names}, key=len, reverse=True)
+    return re.compile(r"(?<![\w-])(" + "|".join(alternatives) + r")(?![\w-])", flags)
+
+
+UTRECHT_PATTERN = _compile_names(UTRECHT_REGION_MUNICIPALITIES)
+DUTCH_CITY_PATTERN = _compile_names(DUTCH_CITIES)
+DUTCH_PROVINCE_PATTERN = _compile_names(DUTCH_PROVINCES)
+# "NL" is only a country code in capitals; lower-case "nl" is usually a .nl domain or word
+NETHERLANDS_PATTERN = re.compile(
+    r"(?<![\w-])(?:(?i:the netherlands|netherlands|nederland)|NL)(?![\w-])"
+)
+DUTCH_ENTITY_PATTERN = re.compile(r"(?<![\w.])(B\.V\.|N\.V\.|BV|NV)(?![\w])")
+
+# Index from lower-cased name to the spelling used in the explanation
+_CANONICAL_NAMES = {name.lower(): name for name in UTRECHT_REGION_MUNICIPALITIES + DUTCH_CITIES}
+
+
+def _canonical(match):
+    return _CANONICAL_NAMES.get(match.lower(), match)
+
+
+def _matches(pattern, text):
+    return [_canonical(match) for match in pattern.findall(text or "")]
+
+
+def _has_provinces(value):
+    value = (value or "").strip()
+    return value not in ("", "0")
+
+
+def _trusted(names, dutch_context):
+    return [name for name in names if dutch_context or name.lower() not in AMBIGUOUS_PLACES]
+
+
+def dutch_places(text):
+    # Utrecht Region municipalities and Dutch cities named in free text, such as a
+    # website's contact page; ambiguous names only count next to the Netherlands
+    dutch_context = bool(NETHERLANDS_PATTERN.search(text or ""))
+    places = _trusted(_matches(UTRECHT_PATTERN, text) + _matches(DUTCH_CITY_PATTERN, text), dutch_context)
+    return list(dict.fromkeys(places))
+
+
+def check_utrecht_region(row):
+    company = company_record(row)
+    hq_country = company.hq_country
+    hq_is_dutch = bool(NETHERLANDS_PATTERN.search(hq_country))
+    hq_city = _trusted(_matches(UTRECHT_PATTERN, company.hq_city), hq_is_dutch)
+    if hq_city and (hq_is_dutch or not hq_country.strip()):
+        return f"Already in Utrecht Region: HQ city shows {hq_city[0]}", "HQ City"
+
+    other_offices = company.other_office_locations
+    offices_dutch = bool(NETHERLANDS_PATTERN.search(other_offices))
+    offices = _trusted(_matches(UTRECHT_PATTERN, other_offices), offices_dutch)
+    if offices:
+        return f"Already in Utrecht Region: Other office locations shows {offices[0]}", "Other office locations"
+
+    provinces = company.provinces_and_employees
+    if _has_provinces(provinces) and re.search(r"(?<![\w-])Utrecht(?![\w-])", provinces, re.IGNORECASE):
+        return "Already in Utrecht Region: Provinces and Employees shows Utrecht", "Provinces and Employees"
+    return None
+
+
+def check_netherlands(row):
+    company = company_record(row)
+    entity = DUTCH_ENTITY_PATTERN.search(company.firm_name)
+    if entity:
+        return f"Already in Netherlands: Dutch entity {entity.group(1)} in company name", "Firm name"
+
+    if company.in_nl.strip().lower() in NETHERLANDS_VALUES:
+        return "Already in Netherlands: In NL? = Yes in data", "In NL?"
+
+    provinces = company.provinces_and_employees
+    if _has_provinces(provinces):
+        province = DUTCH_PROVINCE_PATTERN.search(provinces)
+        if province:
+            return (f"Already in Netherlands: Provinces and Employees shows {province.group(1)}",
+                    "Provinces and Employees")
+
+    hq_country = company.hq_country
+    if NETHERLANDS_PATTERN.search(hq_country):
+        return "Already in Netherlands: HQ country shows Netherlands", "HQ Country"
+
+    other_offices = company.other_office_locations
+    if NETHERLANDS_PATTERN.search(other_offices):
+        return "Already in Netherlands: Other office locations shows Netherlands", "Other office locations"
+    cities = _trusted(_matches(DUTCH_CITY_PATTERN, other_offices), False)
+    if cities:
+        return f"Already in Netherlands: Other office locations shows {cities[0]}", "Other office locations"
+    return None
+
+
+def _cell(value):
+    return str(value or "").replace("|", "/").replace("\n", " ").strip()
+
+
+def prescreen_company(row):
+    # Returns a response in the prompt's 9-column markdown format when the company is
+    # already in Utrecht Region or the Netherlands, otherwise None.
+    company = company_record(row)
+    result = check_utrecht_region(company) or check_netherlands(company)
+    if result is None:
+        return None
+    explanation, field = result
+    source = f"Input data: {field} = {_cell(company.get(field))} (local pre-screen)"
+    return "| " + " | ".join([
+        _cell(company.company_summary),
+        guess_sector(company),
+        "",
+        "0",
+        explanation,
+        "",
+        "",
+        "",
+        source
+    ]) + " |"
@@ -0,0 +1,161 @@
+import asyncio
+import re
+import threading
+import time
+
+
+# Rough size of the single markdown row the prompt asks for; counted against the
+# TPM budget up front because OpenAI reserves max completion tokens the same way.
+EXPECTED_COMPLETION_TOKENS = 400
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def estimate_tokens(messages, completion_tokens=EXPECTED_COMPLETION_TOKENS):
+    # ~4 characters per token is close enough for the English ROM_FDI prompt and
+    # is reconciled against the real usage once the response comes back.
+    chars = sum(len(message.get("content") or "") for message in messages)
+    return chars // 4 + completion_tokens
+
+
+def parse_reset_duration(value):
+    # Rate limit headers use durations such as "20ms", "1s" or "6m0s"
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.configured = float(per_minute)
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    @property
+    def rate(self):
+        return self.capacity / 60.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        # Take the tokens right away (the balance may go negative) and return how long
+        # the caller has to wait until the debt is paid back. Reserving instead of
+        # polling keeps waiting requests in FIFO order.
+        self._refill(now)
+        amount = min(float(amount), self.capacity)
+        self.tokens -= amount
+        wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def give_back(self, amount, now):
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def sync(self, limit, remaining, reset_seconds, now):
+        # The server's limit can only tighten the configured --rpm/--tpm, never raise it
+        if limit:
+            self.capacity = min(self.configured, float(limit))
+        if remaining is None:
+            return
+        self._refill(now)
+        # Only ever lower the local balance: the server has seen requests we have not
+        # reconciled yet, but never the ones we have reserved and not yet sent.
+        self.tokens = min(self.tokens, float(remaining))
+        if remaining <= 0 and reset_seconds:
+            self.blocked_until = max(self.blocked_until, now + reset_seconds)
+
+    def block(self, seconds, now):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class RateLimiter:
+    def __init__(self, tokens_per_minute, requests_per_minute):
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens):
+        with self._lock:
+            now = time.monotonic()
+            return max(self.request_bucket.reserve(1, now), self.token_bucket.reserve(tokens, now))
+
+    async def acquire(self, tokens):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self, tokens):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    def reconcile(self, estimated_tokens, actual_tokens):
+        # Return what we over-reserved, or take the difference if we under-estimated
+        if actual_tokens is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            difference = estimated_tokens - actual_tokens
+            if difference > 0:
+                self.token_bucket.give_back(difference, now)
+            elif difference < 0:
+                self.token_bucket.reserve(-difference, now)
+
+    def update_from_headers(self, headers):
+        if not headers:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.request_bucket.sync(
+                _int_header(headers, 'x-ratelimit-limit-requests'),
+                _int_header(headers, 'x-ratelimit-remaining-requests'),
+                parse_reset_duration(headers.get('x-ratelimit-reset-requests')),
+                now
+            )
+            self.token_bucket.sync(
+                _int_header(headers, 'x-ratelimit-limit-tokens'),
+                _int_header(headers, 'x-ratelimit-remaining-tokens'),
+                parse_reset_duration(headers.get('x-ratelimit-reset-tokens')),
+                now
+            )
+
+    def backoff(self, headers, default_seconds=1.0):
+        # Called on a 429: pause every caller until the server says the window resets.
+        # retry-after-ms is the precise form of retry-after, which is rounded to seconds.
+        headers = headers or {}
+        retry_after = parse_reset_duration(headers.get('retry-after'))
+        retry_after_ms = parse_reset_duration(headers.get('retry-after-ms'))
+        if retry_after_ms:
+            retry_after = retry_after_ms / 1000
+        delays = [retry_after] + [
+            parse_reset_duration(headers.get(name))
+            for name in ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens')
+        ]
+        delay = max([d for d in delays if d] or [default_seconds])
+        with self._lock:
+            now = time.monotonic()
+            self.request_bucket.block(delay, now)
+            self.token_bucket.block(delay, now)
+        return delay
+
+
+def _int_header(headers, name):
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
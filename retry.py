@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+import openai
+
+
+# Transient API failures (timeouts, dropped connections, 429 and 5xx) are retried
+# with jittered exponential backoff. A circuit breaker shared by every request opens
+# after a run of consecutive failures and holds all calls until a single probe gets
+# through, so a sustained outage pauses the pipeline instead of failing every row.
+# Rows that still fail are appended to a dead-letter file for --retry-failed.
+
+MAX_RETRIES = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+PROBE_POLL = 0.5
+
+
+def default_dead_letter_path(output_file):
+    return os.path.splitext(output_file)[0] + ".failed.jsonl"
+
+
+def is_transient(error):
+    # Worth another attempt: the same request may well succeed a moment later
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and (error.status_code == 408 or error.status_code >= 500)
+
+
+def describe_error(error):
+    if isinstance(error, openai.APITimeoutError):
+        return "timeout"
+    if isinstance(error, openai.APIStatusError):
+        return f"HTTP {error.status_code}"
+    return type(error).__name__
+
+
+def error_message(error):
+    # "HTTP 503: The server is overloaded" instead of the SDK's full error repr
+    body = getattr(error, "body", None)
+    if isinstance(error, openai.APIStatusError) and isinstance(body, dict) and body.get("message"):
+        return f"{describe_error(error)}: {body['message']}"
+    return f"{describe_error(error)}: {error}"
+
+
+def backoff_delay(attempt, base=BASE_DELAY, cap=MAX_DELAY):
+    # "Full jitter": anywhere between 0 and the exponential bound, so requests that
+    # failed together do not all come back at the same moment
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        # Ticket of the probe request in flight while half-open, else None
+        self.probing = None
+        self.trips = 0
+        self._tickets = 0
+        self._lock = threading.Lock()
+
+    def _delay(self):
+        # (seconds the caller has to hold off, probe ticket). Once the cooldown is over
+        # the breaker is half-open: one caller gets a ticket and sends a probe, the
+        # others wait for its outcome.
+        with self._lock:
+            if self.failures < self.threshold:
+                return 0.0, None
+            now = time.monotonic()
+            if now < self.open_until:
+                return self.open_until - now, None
+            if self.probing is None:
+                self._tickets += 1
+                self.probing = self._tickets
+                return 0.0, self.probing
+            return PROBE_POLL, None
+
+    async def wait(self):
+        # Returns the probe ticket when this caller is the half-open probe, else None;
+        # pass it to release() once the attempt is over
+        delay, ticket = self._delay()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay, ticket = self._delay()
+        return ticket
+
+    def wait_blocking(self):
+        delay, ticket = self._delay()
+        while delay > 0:
+            time.sleep(delay)
+            delay, ticket = self._delay()
+        return ticket
+
+    def release(self, ticket):
+        # Ends a probe that got no verdict (cancelled, or failed in our own code), so
+        # the next caller probes instead of everyone polling forever
+        if ticket is None:
+            return
+        with self._lock:
+            if self.probing == ticket:
+                self.probing = None
+
+    def record_success(self):
+        with self._lock:
+            closed = self.failures >= self.threshold
+            self.failures = 0
+            self.probing = None
+        if closed:
+            print("🔌 API reachable again, circuit breaker closed")
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            reopened = self.probing is not None
+            self.probing = None
+            if self.failures < self.threshold or (time.monotonic() < self.open_until and not reopened):
+                return
+            self.open_until = time.monotonic() + self.cooldown
+            self.trips += 1
+            failures = self.failures
+        print(f"🔌 {failures} API failures in a row, circuit breaker open: pausing all requests for "
+              f"{self.cooldown:.0f}s")
+
+
+class DeadLetterFile:
+    # Append-only JSONL of rows whose analysis failed after every retry. A row retried
+    # successfully later gets a "recovered" record, so the latest record per row tells
+    # whether it still needs --retry-failed.
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.failing = load_dead_letters(path) if resume else {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not resume and os.path.exists(path):
+            os.remove(path)
+        self._file = None
+        self.failed = 0
+        self.recovered = 0
+
+    def _append(self, record):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def failed_row(self, idx, key, firm, error):
+        self._append({"idx": idx, "key": key, "firm": firm, "status": "failed", "error": error,
+                      "at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+        self.failing[idx] = key
+        self.failed += 1
+
+    def succeeded_row(self, idx, key):
+        if idx in self.failing:
+            self._append({"idx": idx, "key": key, "status": "recovered"})
+            del self.failing[idx]
+            self.recovered += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_dead_letters(path):
+    # {idx: row key} of the rows whose latest record is a failure
+    failing = {}
+    if not os.path.exists(path):
+        return failing
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "failed":
+                failing[record["idx"]] = record["key"]
+            else:
+                failing.pop(record.get("idx"), None)
+    return failing
@@ -0,0 +1,100 @@
+import os
+
+from metrics import STAGES, TOKEN_FIELDS, estimate_cost
+from ranking import MODEL
+
+
+# Tiered model routing: every company first gets the cheap MODEL (or a local rule),
+# and only answers that failed to parse or whose score lands in the uncertainty band
+# are sent again, with the full single-company prompt, to a stronger model. The
+# routing decision and the per-tier latency and cost are kept in the row's usage.
+
+ESCALATION_MODEL = os.getenv("OPENAI_ESCALATION_MODEL", "gpt-4o")
+DEFAULT_BAND = (40, 70)
+# Usage fields added up over the tiers; a tier without a value counts as 0
+SUMMED_FIELDS = TOKEN_FIELDS + ("total_tokens",) + STAGES
+
+
+def parse_band(value):
+    # "40-70" -> (40.0, 70.0)
+    low, _, high = value.partition("-")
+    low, high = float(low), float(high)
+    if low > high:
+        raise ValueError(f"empty uncertainty band: {value}")
+    return low, high
+
+
+def _format_band(band):
+    return f"{band[0]:g}-{band[1]:g}"
+
+
+class TieredRouter:
+    def __init__(self, parse, model=ESCALATION_MODEL, band=DEFAULT_BAND):
+        # parse(content) -> (fields, method), fields[1] being the GPT Score
+        self.parse = parse
+        self.model = model
+        self.band = band
+
+    def _score(self, content):
+        if content == "API_ERROR":
+            return None, "error"
+        fields, method = self.parse(content)
+        try:
+            return float(fields[1]), method
+        except (TypeError, ValueError):
+            return None, method
+
+    def escalation_reason(self, content):
+        # Why the first-pass answer needs the stronger model, or None to keep it.
+        # Failed API calls are not escalated; the retry logic already gave up on them.
+        score, method = self._score(content)
+        if method == "error":
+            return None
+        if score is None or method == "fallback":
+            return "unparsed response"
+        low, high = self.band
+        if low <= score <= high:
+            return f"score {score:g} in uncertainty band {_format_band(self.band)}"
+        return None
+
+    def _tier(self, content, usage):
+        score, _ = self._score(content)
+        model = usage.get("model", MODEL)
+        cost = estimate_cost(usage, model)
+        return {
+            "model": model,
+            "source": usage.get("source", "api"),
+            "prompt": usage.get("prompt"),
+            "stream": usage.get("stream"),
+            "score": f"{score:g}" if score is not None else "N/A",
+            "api_seconds": round(usage.get("api_seconds") or 0.0, 4),
+            "prompt_tokens": usage.get("prompt_tokens") or 0,
+            "completion_tokens": usage.get("completion_tokens") or 0,
+            "cost_usd": round(cost, 6) if cost is not None else None
+        }
+
+    def _route(self, tiers, reason):
+        steps = " → ".join(f"{tier['model']} {tier['score']}" for tier in tiers)
+        seconds = " + ".join(f"{tier['api_seconds']:.2f}s" for tier in tiers)
+        costs = " + ".join(f"${tier['cost_usd']:.4f}" if tier["cost_usd"] is not None else "$?" for tier in tiers)
+        return f"{steps} ({reason}); {seconds}; {costs}"
+
+    def kept(self, content, usage):
+        # Usage of a first-pass answer that stays as it is
+        tier = self._tier(content, usage)
+        return dict(usage, tiers=[tier], route=self._route([tier], "kept"))
+
+    def escalated(self, first_content, first_usage, content, usage, reason):
+        # The stronger model's answer replaces the first pass unless its call failed;
+        # tokens, time and cost of both tiers are added up
+        tiers = [self._tier(first_content, first_usage), self._tier(content, usage)]
+        if content == "API_ERROR":
+            content, reason = first_content, reason + ", escalation failed"
+        combined = dict(usage)
+        for field in SUMMED_FIELDS:
+            if field in first_usage or field in usage:
+                combined[field] = (first_usage.get(field) or 0) + (usage.get(field) or 0)
+        combined["source"] = usage.get("source", "api")
+        combined["tiers"] = tiers
+        combined["route"] = self._route(tiers, reason)
+        return content, combined
@@ -0,0 +1,187 @@
+import functools
+import re
+from collections import namedtuple
+from collections.abc import Mapping
+
+
+# Input column schema: the Dealroom/Achilles export and our own output layout name the
+# same columns differently ("Firm name" / "Company Name", "Company Summary" / "Short
+# description", "LinkedIn URL" / "LinkedIn"). The aliases are resolved once per header
+# into a compiled schema. iter_input_rows reads every row into a compact InputRow that
+# carries its company fields as a tuple-backed record, built once in the read stage,
+# so no field silently goes missing from the prompt.
+
+# (record attribute, canonical column, aliases); the canonical names are the export's,
+# the aliases are the exact headers of our output layout ("Lay-out excel file")
+COMPANY_FIELDS = [
+    ("firm_name", "Firm name", ("Company Name",)),
+    ("company_website", "Company Website", ()),
+    ("booth_nr", "Booth nr", ("Booth number",)),
+    ("company_summary", "Company Summary", ("Short description",)),
+    ("industries", "All Industries", ("Industries",)),
+    ("revenue", "Revenue", ("Revenue (EUR)",)),
+    ("revenue_growth", "Revenue growth", ()),
+    ("employees", "Employees", ("Employees latest number",)),
+    ("employee_growth", "Employee growth % (last 12 months)", ()),
+    ("year_founded", "Year Founded", ("Launch year",)),
+    ("ownership_status", "Ownership Status", ("Company status",)),
+    ("total_funding", "Total funding (EUR M)", ()),
+    ("last_funding_date", "Last funding date", ()),
+    ("last_round", "Last round", ()),
+    ("last_funding_amount", "Last funding amount", ()),
+    ("hq_country", "HQ Country", ()),
+    ("hq_city", "HQ City", ()),
+    ("other_office_locations", "Other office locations", ()),
+    ("linkedin_url", "LinkedIn URL", ("LinkedIn",)),
+    ("number_of_patents", "Number of patents", ()),
+    ("in_achilles", "In Achilles", ()),
+    ("in_nl", "In NL?", ()),
+    ("provinces_and_employees", "Provinces and Employees", ()),
+    ("last_projects", "Last projects", ()),
+    ("project_teams", "Project Teams", ()),
+]
+ATTRIBUTES = {column: attribute for attribute, column, _ in COMPANY_FIELDS}
+
+# Columns the analysis adds to the output, in output order
+GPT_FIELDS = [
+    "Analyzed Sector",
+    "GPT Score",
+    "GPT Score Explanation",
+    "GPT Dutch Ecosystem Fit & Chain Partners",
+    "Potential connections and partnerships in Utrecht Region",
+    "GPT Source"
+]
+
+# "Revenue (EUR) (2016,2017,...)": the list of years is not part of the column's name
+_YEARS = re.compile(r"\(\s*\d{4}(?:\s*,\s*\d{4})*\s*\)")
+_PUNCTUATION = re.compile(r"[^a-z0-9%]+")
+
+
+def normalize_column(name):
+    # "  HQ country " -> "hq country", "Revenue (EUR) (2016,2017)" -> "revenue eur"
+    name = _YEARS.sub(" ", str(name or "").lower())
+    return _PUNCTUATION.sub(" ", name).strip()
+
+
+class CompanyRecord(namedtuple("CompanyRecord", [attribute for attribute, _, _ in COMPANY_FIELDS])):
+    # Tuple-backed with empty __slots__: no per-row dict, fields read by position
+    __slots__ = ()
+
+    def get(self, column, default=""):
+        # Value by canonical column name, e.g. record.get("HQ Country")
+        attribute = ATTRIBUTES.get(column)
+        return getattr(self, attribute) if attribute is not None else default
+
+
+class Schema:
+    def __init__(self, headers):
+        self.headers = list(headers)
+        normalized = {}
+        for header in self.headers:
+            normalized.setdefault(normalize_column(header), header)
+        # Canonical names first, so an export with both "Firm name" and "Company Name"
+        # reads the canonical one
+        self.columns = {}
+        for _, column, aliases in COMPANY_FIELDS:
+            for name in (column,) + aliases:
+                if normalize_column(name) in normalized:
+                    self.columns[column] = normalized[normalize_column(name)]
+                    break
+        # Header -> position in a csv row; a repeated header reads its last column,
+        # like csv.DictReader
+        self.index = {header: position for position, header in enumerate(self.headers)}
+        self._positions = tuple(self.index.get(self.columns.get(column)) for _, column, _ in COMPANY_FIELDS)
+
+    def column(self, canonical):
+        # Header that holds a canonical column in this file, or None
+        return self.columns.get(canonical)
+
+    @property
+    def missing(self):
+        return [column for _, column, _ in COMPANY_FIELDS if column not in self.columns]
+
+    @property
+    def aliased(self):
+        # {canonical: header} of the columns found under another name
+        return {column: header for column, header in self.columns.items()
+                if normalize_column(header) != normalize_column(column)}
+
+    def record(self, row):
+        # Company fields of a mapping with this schema's headers
+        return CompanyRecord._make([(row.get(self.headers[position]) or "") if position is not None else ""
+                                    for position in self._positions])
+
+    def record_from_values(self, values):
+        # Company fields of a csv row (a list of cells), read by position
+        count = len(values)
+        return CompanyRecord._make([(values[position] or "") if position is not None and position < count else ""
+                                    for position in self._positions])
+
+
+class InputRow(Mapping):
+    # One input row as its list of cells plus the file's shared schema, instead of a
+    # dict with its own copy of every header. Reads like the csv.DictReader dict it
+    # replaces (missing trailing cells are None); company holds the resolved fields.
+    __slots__ = ("schema", "values", "company")
+
+    def __init__(self, schema, values):
+        self.schema = schema
+        self.values = values
+        self.company = schema.record_from_values(values)
+
+    def __getitem__(self, header):
+        position = self.schema.index[header]
+        return self.values[position] if position < len(self.values) else None
+
+    def get(self, header, default=None):
+        position = self.schema.index.get(header)
+        if position is None:
+            return default
+        return self.values[position] if position < len(self.values) else None
+
+    def __iter__(self):
+        return iter(self.schema.index)
+
+    def __len__(self):
+        return len(self.schema.index)
+
+    def __contains__(self, header):
+        return header in self.schema.index
+
+
+@functools.lru_cache(maxsize=64)
+def _compiled(headers):
+    return Schema(headers)
+
+
+def compile_schema(headers):
+    # One compiled schema per distinct header, shared by every row of a file
+    return _compiled(tuple(headers))
+
+
+def compact_row(row):
+    # InputRow of a plain dict, e.g. a row posted to the analysis service
+    if isinstance(row, InputRow):
+        return row
+    return InputRow(compile_schema(row.keys()), list(row.values()))
+
+
+def company_record(row):
+    # Company fields of an input or output row, whatever the file called its columns.
+    # Input rows carry theirs; plain dicts (journal and output rows) are resolved here.
+    if isinstance(row, InputRow):
+        return row.company
+    if isinstance(row, CompanyRecord):
+        return row
+    return compile_schema(row.keys()).record(row)
+
+
+def describe_schema(schema):
+    # Printable lines about aliased and missing columns of an input file
+    lines = []
+    if schema.aliased:
+        lines.append("🗂️ Columns read under another name: " + ", ".join(
+            f"{column} = {header}" for column, header in schema.aliased.items()))
+    if schema.missing:
+        lines.append("⚠️ Input has no column for: " + ", ".join(schema.missing) + " (left empty in the prompt)")
+    return lines
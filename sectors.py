@@ -0,0 +1,191 @@
+import argparse
+import functools
+import math
+import re
+from collections import Counter
+
+from pipeline import iter_input_rows
+from prompts import (ROM_FDI_GENERIC_SIGNALS, ROM_FDI_INSTRUCTIONS, ROM_FDI_SCORING_AND_OUTPUT,
+                     ROM_FDI_SECTOR_ASSIGNMENT, ROM_FDI_SECTOR_SIGNALS, ROM_FDI_SECTOR_SIGNALS_HEADER,
+                     ROM_FDI_SLIM_SECTOR_ASSIGNMENT, ROM_FDI_SYSTEM_PROMPT)
+from rate_limit import estimate_tokens
+from schema import company_record
+from structured import SECTORS
+
+
+# Local sector pre-classification: a TF-IDF model trained on the prompt's own SECTOR
+# MAPPING RULES and examples predicts the Analyzed Sector from "All Industries" and
+# "Company Summary". A confident prediction gets a slim system prompt with only the
+# Generic Signals and that sector's block instead of every sector's rules and examples.
+# The same model labels the rows that never reach the API (pre-screened, triaged), so
+# every local sector guess gives one answer.
+
+DEFAULT_MIN_CONFIDENCE = 0.6
+
+# Extra vocabulary per sector on top of the prompt's mapping rules
+SECTOR_KEYWORDS = {
+    "Life Science & Health": [
+        "medicine", "healthcare", "health", "biotechnology", "biotech", "pharmaceutical", "pharma",
+        "medical", "regenerative", "life science", "clinical", "drug", "therapeutics", "diagnostics",
+        "surgery", "oncology", "medtech", "one health"
+    ],
+    "Energy and Mobility": [
+        "energy", "renewable", "solar", "wind", "hydrogen", "battery", "electric vehicle", "ev charging",
+        "transportation", "mobility", "automotive", "clean tech", "climate", "carbon capture", "smart grid",
+        "charging"
+    ],
+    "IT and Cyber": [
+        "information technology", "software", "cybersecurity", "security", "cloud", "data", "analytics",
+        "artificial intelligence", "ai", "machine learning", "iot", "internet of things", "saas",
+        "telecommunications", "broadcasting", "media technology", "gaming", "virtual reality",
+        "augmented reality", "blockchain", "quantum", "5g", "platform", "digital", "media", "streaming"
+    ],
+    "Fintech": [
+        "fintech", "financial", "banking", "payments", "insurtech", "insurance", "wealth", "lending",
+        "cryptocurrency", "crypto"
+    ],
+    "Education": [
+        "education", "edtech", "learning", "training", "e-learning", "skills"
+    ]
+}
+
+_MAPPING_PATTERN = re.compile(r"\*\*'([^']+)'\*\* - If .*?closely related to: (.+)")
+_EXAMPLE_PATTERN = re.compile(r"industries \"([^\"]+)\" → '([^']+)'")
+_KEYWORD_EXAMPLE_PATTERN = re.compile(r"Companies with \"([^\"]+)\"(?: or \"([^\"]+)\")? → '([^']+)'")
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"a", "an", "and", "as", "for", "in", "of", "on", "or", "the", "to", "with"}
+
+
+def _sector_name(label):
+    # "Life Science & Health (with a focus on Regenerative Medicine)" -> "Life Science & Health"
+    return next((sector for sector in SECTORS if label.startswith(sector)), None)
+
+
+def training_terms(assignment=ROM_FDI_SECTOR_ASSIGNMENT):
+    # Sector -> text of every term the prompt maps to it
+    terms = {sector: [] for sector in SECTORS}
+    for line in assignment.splitlines():
+        for pattern in (_MAPPING_PATTERN, _EXAMPLE_PATTERN):
+            match = pattern.search(line)
+            if match:
+                label, text = (match.group(1), match.group(2)) if pattern is _MAPPING_PATTERN \
+                    else (match.group(2), match.group(1))
+                sector = _sector_name(label)
+                if sector:
+                    terms[sector].append(text)
+        match = _KEYWORD_EXAMPLE_PATTERN.search(line)
+        if match and _sector_name(match.group(3)):
+            terms[_sector_name(match.group(3))].extend(filter(None, match.group(1, 2)))
+    for sector, keywords in SECTOR_KEYWORDS.items():
+        terms[sector].extend(keywords)
+    return {sector: " ".join(texts) for sector, texts in terms.items() if texts}
+
+
+def _features(text):
+    # Unigrams and bigrams: "Medical Devices" -> medical, devices, "medical devices"
+    tokens = [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in _STOPWORDS]
+    return Counter(tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])])
+
+
+class SectorClassifier:
+    def __init__(self, terms=None):
+        documents = {sector: _features(text) for sector, text in (terms or training_terms()).items()}
+        document_count = Counter(feature for features in documents.values() for feature in features)
+        self.idf = {feature: math.log((1 + len(documents)) / (1 + count)) + 1
+                    for feature, count in document_count.items()}
+        # L2-normalized TF-IDF vector per sector
+        self.weights = {}
+        for sector, features in documents.items():
+            vector = {feature: count * self.idf[feature] for feature, count in features.items()}
+            norm = math.sqrt(sum(value * value for value in vector.values()))
+            self.weights[sector] = {feature: value / norm for feature, value in vector.items()}
+
+    def scores(self, row):
+        # The industries are the more specific column and count twice
+        company = company_record(row)
+        features = _features(f"{company.industries} {company.industries} {company.company_summary}")
+        query = {feature: count * self.idf[feature] for feature, count in features.items() if feature in self.idf}
+        return {sector: sum(value * weights.get(feature, 0.0) for feature, value in query.items())
+                for sector, weights in self.weights.items()}
+
+    def classify(self, row):
+        # (sector, confidence): confidence is the winning sector's share of all
+        # similarity, 0.0 when nothing in the row matches the sector vocabulary
+        scores = self.scores(row)
+        total = sum(scores.values())
+        if total <= 0:
+            return "Generic", 0.0
+        sector = max(scores, key=scores.get)
+        return sector, scores[sector] / total
+
+
+@functools.lru_cache(maxsize=1)
+def default_classifier():
+    # Trained once per process on the prompt's rules and SECTOR_KEYWORDS
+    return SectorClassifier()
+
+
+def guess_sector(row):
+    # Sector of a row that is not sent to the API: the best matching sector, and like
+    # the prompt's CRITICAL FALLBACK RULE 'Generic' when nothing matches or it is a tie
+    scores = default_classifier().scores(row)
+    ranked = sorted(scores.values(), reverse=True)
+    if ranked[0] <= 0 or ranked[0] == ranked[1]:
+        return "Generic"
+    return max(scores, key=scores.get)
+
+
+_slim_prompts = {}
+
+
+def slim_system_prompt(sector):
+    # Static per sector, so each variant still benefits from prompt-prefix caching
+    if sector not in _slim_prompts:
+        block = ROM_FDI_SECTOR_SIGNALS.get(sector)
+        sector_signals = ROM_FDI_SECTOR_SIGNALS_HEADER + block if block else ""
+        _slim_prompts[sector] = (ROM_FDI_INSTRUCTIONS + ROM_FDI_SLIM_SECTOR_ASSIGNMENT.format(sector=sector)
+                                 + ROM_FDI_GENERIC_SIGNALS + sector_signals + ROM_FDI_SCORING_AND_OUTPUT)
+    return _slim_prompts[sector]
+
+
+def _prompt_tokens(system_prompt):
+    return estimate_tokens([{"content": system_prompt}], 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local sector pre-classification of an input CSV")
+    parser.add_argument("--input", default="Project/IBC_2025_Complete -Dealroom and Achilles data.csv")
+    parser.add_argument("--min-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE)
+    parser.add_argument("--show", type=int, default=0, help="Print the prediction for the first N companies")
+    args = parser.parse_args(argv)
+
+    classifier = default_classifier()
+    predicted, confident, rows = Counter(), 0, 0
+    slim_tokens = 0
+    full_tokens = _prompt_tokens(ROM_FDI_SYSTEM_PROMPT)
+    for idx, row in iter_input_rows(args.input):
+        sector, confidence = classifier.classify(row)
+        rows += 1
+        predicted[sector] += 1
+        if confidence >= args.min_confidence:
+            confident += 1
+            slim_tokens += _prompt_tokens(slim_system_prompt(sector))
+        else:
+            slim_tokens += full_tokens
+        if idx <= args.show:
+            company = company_record(row)
+            print(f"{idx:>6}  {sector:<22} {confidence:4.0%}  {company.firm_name}  ({company.industries[:60]})")
+
+    if not rows:
+        print("No data found.")
+        return
+    print(f"🏷️ Classified {rows} companies; {confident} ({confident / rows:.0%}) at or above "
+          f"{args.min_confidence:.0%} confidence get a slim prompt")
+    for sector, count in predicted.most_common():
+        print(f"  {sector}: {count}")
+    print(f"✂️ Static prompt: {full_tokens} tokens in full, {slim_tokens / rows:.0f} on average with slim prompts "
+          f"({1 - slim_tokens / (rows * full_tokens):.0%} fewer)")
+
+
+if __name__ == "__main__":
+    main()
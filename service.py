@@ -0,0 +1,508 @@
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import signal
+import sqlite3
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from cache import DEFAULT_CACHE_PATH
+from clients import DEFAULT_TIMEOUT, configure_clients
+from main import build_output_headers, failure_fields, fill_gpt_fields, parse_analysis
+from prescreen import prescreen_company
+from ranking import (DEFAULT_RPM, DEFAULT_TPM, analyze_company, configure_rate_limits, configure_response_cache,
+                     empty_usage)
+from schema import compact_row, company_record
+
+
+# Long-running analysis service: fair lists (CSV uploads) and single company rows are
+# queued as jobs in a SQLite table, and a pool of worker threads analyzes their rows
+# with the same prompt, API call and parse path as main.py. Every row is a task whose
+# status lives in the database, so a restarted service picks up where it stopped:
+# tasks that were running are queued again, finished ones are never redone, and the
+# response cache answers any request that completed just before the restart.
+
+DEFAULT_QUEUE_PATH = "Project/service_jobs.sqlite"
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 4
+MAX_TASK_ATTEMPTS = 3
+TASK_RETRY_DELAY = 60.0
+POLL_INTERVAL = 0.5
+STATUSES = ("queued", "running", "done", "failed")
+MAX_JOBS_LISTED = 500
+
+
+class JobQueue:
+    def __init__(self, path=DEFAULT_QUEUE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._last_job = None
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                row TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                not_before REAL NOT NULL DEFAULT 0,
+                result TEXT,
+                usage TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, idx)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_digest ON jobs (digest)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, job_id)")
+        self._conn.commit()
+
+    def recover(self):
+        # Tasks a previous process was working on when it stopped go back in the queue
+        with self._lock:
+            requeued = self._conn.execute(
+                "UPDATE tasks SET status = 'queued', updated_at = ? WHERE status = 'running'", (time.time(),)
+            ).rowcount
+            self._conn.commit()
+        return requeued
+
+    def add_job(self, name, headers, rows, digest, force=False):
+        # Returns (job, created). The job and all its tasks are one transaction, so an
+        # upload is either queued completely or not at all. The same upload twice is
+        # the same job unless force is set.
+        with self._lock:
+            if not force:
+                row = self._conn.execute("SELECT id FROM jobs WHERE digest = ? ORDER BY created_at DESC LIMIT 1",
+                                         (digest,)).fetchone()
+                if row is not None:
+                    return self._job(row[0]), False
+            job_id = uuid.uuid4().hex[:12]
+            now = time.time()
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO jobs (id, name, digest, headers, total, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, name, digest, json.dumps(build_output_headers(headers)), len(rows), now)
+                )
+                self._conn.executemany(
+                    "INSERT INTO tasks (job_id, idx, row, updated_at) VALUES (?, ?, ?, ?)",
+                    ((job_id, idx, json.dumps(row, ensure_ascii=False), now) for idx, row in enumerate(rows, 1))
+                )
+            return self._job(job_id), True
+
+    def claim(self):
+        # Next queued task, marked running under the same lock. Jobs take turns, so a
+        # single company row does not wait behind a whole fair list; within a job the
+        # rows go in input order.
+        with self._lock:
+            now = time.time()
+            job_ids = [job_id for job_id, in self._conn.execute("SELECT id FROM jobs ORDER BY created_at, id")]
+            if self._last_job in job_ids:
+                turn = job_ids.index(self._last_job) + 1
+                job_ids = job_ids[turn:] + job_ids[:turn]
+            for job_id in job_ids:
+                row = self._conn.execute(
+                    "SELECT idx, row, attempts FROM tasks WHERE status = 'queued' AND job_id = ? AND not_before <= ? "
+                    "ORDER BY rowid LIMIT 1",
+                    (job_id, now)
+                ).fetchone()
+                if row is not None:
+                    break
+            else:
+                return None
+            idx, data, attempts = row
+            self._conn.execute(
+                "UPDATE tasks SET status = 'running', attempts = attempts + 1, updated_at = ? "
+                "WHERE job_id = ? AND idx = ?",
+                (now, job_id, idx)
+            )
+            self._conn.commit()
+            self._last_job = job_id
+            headers = self._conn.execute("SELECT headers FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        return {"job_id": job_id, "idx": idx, "row": json.loads(data), "attempts": attempts + 1,
+                "headers": json.loads(headers)}
+
+    def finish(self, task, status, result, usage, error=None):
+        # The status check keeps a row that was already finished from being overwritten
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, usage = ?, error = ?, updated_at = ? "
+                "WHERE job_id = ? AND idx = ? AND status = 'running'",
+                (status, json.dumps(result, ensure_ascii=False), json.dumps(usage), error, time.time(),
+                 task["job_id"], task["idx"])
+            )
+            self._conn.commit()
+
+    def retry_later(self, task, error, delay=TASK_RETRY_DELAY):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET status = 'queued', not_before = ?, error = ?, updated_at = ? "
+                "WHERE job_id = ? AND idx = ? AND status = 'running'",
+                (time.time() + delay, error, time.time(), task["job_id"], task["idx"])
+            )
+            self._conn.commit()
+
+    def retry_failed(self, job_id):
+        with self._lock:
+            requeued = self._conn.execute(
+                "UPDATE tasks SET status = 'queued', attempts = 0, not_before = 0, updated_at = ? "
+                "WHERE job_id = ? AND status = 'failed'",
+                (time.time(), job_id)
+            ).rowcount
+            self._conn.commit()
+        return requeued
+
+    def _job(self, job_id):
+        row = self._conn.execute("SELECT id, name, total, created_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        counts = dict(self._conn.execute(
+            "SELECT status, COUNT(*) FROM tasks WHERE job_id = ? GROUP BY status", (job_id,)
+        ).fetchall())
+        prompt_tokens, completion_tokens, last_update = self._conn.execute(
+            "SELECT COALESCE(SUM(json_extract(usage, '$.prompt_tokens')), 0), "
+            "COALESCE(SUM(json_extract(usage, '$.completion_tokens')), 0), MAX(updated_at) "
+            "FROM tasks WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        job_id, name, total, created_at = row
+        progress = {status: counts.get(status, 0) for status in STATUSES}
+        finished = progress["done"] + progress["failed"]
+        return {
+            "id": job_id,
+            "name": name,
+            "status": "finished" if finished == total else "running" if finished or progress["running"] else "queued",
+            "total": total,
+            "progress": progress,
+            "percent": round(100.0 * finished / total, 1) if total else 100.0,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "created_at": created_at,
+            "finished_at": last_update if finished == total else None
+        }
+
+    def job(self, job_id):
+        with self._lock:
+            return self._job(job_id)
+
+    def jobs(self, limit=20):
+        with self._lock:
+            ids = self._conn.execute("SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+            return [self._job(job_id) for job_id, in ids]
+
+    def results(self, job_id):
+        # (headers, finished rows in input order)
+        with self._lock:
+            headers = self._conn.execute("SELECT headers FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if headers is None:
+                return None, []
+            rows = self._conn.execute(
+                "SELECT result FROM tasks WHERE job_id = ? AND status IN ('done', 'failed') ORDER BY idx", (job_id,)
+            ).fetchall()
+        return json.loads(headers[0]), [json.loads(result) for result, in rows]
+
+    def stats(self):
+        with self._lock:
+            jobs = self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+        return {"jobs": jobs, "tasks": {status: counts.get(status, 0) for status in STATUSES}}
+
+    def prune(self, max_age_days):
+        # Removes finished jobs older than max_age_days with their tasks
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock, self._conn:
+            ids = [job_id for job_id, in self._conn.execute(
+                "SELECT id FROM jobs WHERE created_at < ? AND id NOT IN "
+                "(SELECT job_id FROM tasks WHERE status IN ('queued', 'running'))", (cutoff,)
+            ).fetchall()]
+            self._conn.executemany("DELETE FROM tasks WHERE job_id = ?", ((job_id,) for job_id in ids))
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", ((job_id,) for job_id in ids))
+        return len(ids)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tasks")
+            return self._conn.execute("DELETE FROM jobs").rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class WorkerPool:
+    def __init__(self, queue, workers=DEFAULT_WORKERS, prescreen=True):
+        self.queue = queue
+        self.workers = workers
+        self.prescreen = prescreen
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"analysis-worker-{number + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        # Workers finish the row they are on; rows still running at exit are requeued
+        # by recover() on the next start
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            task = self.queue.claim()
+            if task is None:
+                self._stop.wait(POLL_INTERVAL)
+                continue
+            try:
+                self.process(task)
+            except Exception as e:
+                print(f"❌ Failed to process row {task['idx']} of job {task['job_id']}: {e}")
+                self._failed(task, dict(empty_usage("error"), error=str(e)))
+
+    def _failed(self, task, usage):
+        # Queued again a little later, until the row has had MAX_TASK_ATTEMPTS tries
+        error = usage.get("error", "API error")
+        if task["attempts"] < MAX_TASK_ATTEMPTS:
+            print(f"🔁 Row {task['idx']} of job {task['job_id']} failed ({error}), queued again")
+            self.queue.retry_later(task, error)
+        else:
+            result = fill_gpt_fields(task["row"], failure_fields(usage), task["headers"])
+            self.queue.finish(task, "failed", result, usage, error)
+
+    def process(self, task):
+        # Same order as main.py: local pre-screen, then the API call and the parse path
+        row, headers = compact_row(task["row"]), task["headers"]
+        markdown_row = prescreen_company(row) if self.prescreen else None
+        if markdown_row is not None:
+            usage = empty_usage("prescreen")
+        else:
+            markdown_row, usage = analyze_company(row)
+        if markdown_row == "API_ERROR":
+            return self._failed(task, usage)
+        fields, parse_method = parse_analysis(markdown_row)
+        usage["parse"] = parse_method
+        self.queue.finish(task, "done", fill_gpt_fields(row, fields, headers), usage)
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_csv_upload(data):
+    # (headers, rows) of an uploaded CSV export
+    reader = csv.DictReader(io.StringIO(data.decode("utf-8-sig"), newline=""))
+    rows = list(reader)
+    return reader.fieldnames or [], rows
+
+
+def parse_json_rows(payload):
+    # {"rows": [...]} or a single company row; headers in order of first appearance
+    rows = payload.get("rows") if isinstance(payload, dict) and "rows" in payload else [payload]
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("expected a company row object or {\"rows\": [...]}")
+    headers = list(dict.fromkeys(key for row in rows for key in row))
+    return headers, [{key: "" if row.get(key) is None else str(row.get(key)) for key in headers} for row in rows]
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    queue = None
+    pool = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, content_type="application/json"):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message):
+        self._send(status, {"error": message})
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = parse_qs(url.query)
+        if parts == ["health"]:
+            return self._send(200, dict(self.queue.stats(), workers=self.pool.workers))
+        if parts == ["jobs"]:
+            try:
+                limit = int(query.get("limit", ["20"])[0])
+            except ValueError:
+                return self._error(400, "limit must be a whole number")
+            return self._send(200, {"jobs": self.queue.jobs(min(max(limit, 0), MAX_JOBS_LISTED))})
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self.queue.job(parts[1])
+            return self._send(200, job) if job is not None else self._error(404, f"No such job: {parts[1]}")
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "results":
+            headers, rows = self.queue.results(parts[1])
+            if headers is None:
+                return self._error(404, f"No such job: {parts[1]}")
+            if query.get("format", ["csv"])[0] == "json":
+                return self._send(200, {"job": self.queue.job(parts[1]), "rows": rows})
+            out = io.StringIO()
+            writer = csv.DictWriter(out, fieldnames=headers, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+            return self._send(200, out.getvalue().encode("utf-8-sig"), "text/csv; charset=utf-8")
+        self._error(404, f"Unknown path {url.path}")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = parse_qs(url.query)
+        body = self._body()
+        try:
+            if parts in (["jobs"], ["companies"]):
+                if parts == ["companies"] or "json" in (self.headers.get("Content-Type") or ""):
+                    headers, rows = parse_json_rows(json.loads(body))
+                else:
+                    headers, rows = parse_csv_upload(body)
+                if not rows:
+                    return self._error(400, "No company rows in the request")
+                name = query.get("name", [company_record(rows[0]).firm_name if parts == ["companies"] else "upload"])[0]
+                force = query.get("force", ["0"])[0] in ("1", "true", "yes")
+                job, created = self.queue.add_job(name, headers, rows, _digest(body), force)
+                if created:
+                    print(f"📥 Queued job {job['id']} ({name}): {job['total']} companies")
+                return self._send(201 if created else 200, dict(job, duplicate=not created))
+            if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "retry":
+                if self.queue.job(parts[1]) is None:
+                    return self._error(404, f"No such job: {parts[1]}")
+                return self._send(200, {"requeued": self.queue.retry_failed(parts[1]), "job": self.queue.job(parts[1])})
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            return self._error(400, str(e))
+        self._error(404, f"Unknown path {url.path}")
+
+
+def make_server(queue, pool, port=DEFAULT_PORT, host="127.0.0.1"):
+    handler_class = type("BoundServiceHandler", (ServiceHandler,), {"queue": queue, "pool": pool})
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    return server
+
+
+def _format_time(timestamp):
+    if timestamp is None:
+        return "-"
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+
+def _interrupt(signum, frame):
+    # SIGTERM (e.g. from systemd) stops the service the same way as Ctrl+C
+    raise KeyboardInterrupt
+
+
+def serve(args):
+    configure_rate_limits(args.tpm, args.rpm)
+    configure_clients(args.timeout, max_connections=args.workers)
+    configure_response_cache(None if args.no_cache else args.cache)
+    queue = JobQueue(args.path)
+    pool = WorkerPool(queue, args.workers, prescreen=not args.no_prescreen)
+    # Bound before recover(), so a second service started by mistake fails here instead
+    # of requeueing the rows the first one is working on
+    server = make_server(queue, pool, args.port, args.host)
+    requeued = queue.recover()
+    if requeued:
+        print(f"♻️ Requeued {requeued} rows that were in progress when the service last stopped")
+    signal.signal(signal.SIGTERM, _interrupt)
+    pool.start()
+    print(f"🛰️ Analysis service on http://{args.host}:{args.port} with {args.workers} workers (jobs in {args.path})")
+    print(f"   curl --data-binary @fair.csv -H 'Content-Type: text/csv' 'http://{args.host}:{args.port}/jobs?name=fair'")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("🛑 Stopping workers after their current row...")
+        pool.stop()
+        queue.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analysis service with a persistent job queue")
+    parser.add_argument("--path", default=DEFAULT_QUEUE_PATH, help="Job queue database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="Run the HTTP service and its worker pool")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                              help="Companies analyzed at once")
+    serve_parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    serve_parser.add_argument("--tpm", type=int, default=DEFAULT_TPM)
+    serve_parser.add_argument("--rpm", type=int, default=DEFAULT_RPM)
+    serve_parser.add_argument("--cache", default=DEFAULT_CACHE_PATH)
+    serve_parser.add_argument("--no-cache", action="store_true")
+    serve_parser.add_argument("--no-prescreen", action="store_true")
+    commands.add_parser("stats", help="Show the number of jobs and rows per status")
+    list_parser = commands.add_parser("list", help="Show the most recent jobs and their progress")
+    list_parser.add_argument("--limit", type=int, default=20)
+    prune_parser = commands.add_parser("prune", help="Remove finished jobs")
+    prune_parser.add_argument("--max-age-days", type=float, default=30.0)
+    commands.add_parser("clear", help="Remove all jobs")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        return serve(args)
+    if not os.path.exists(args.path):
+        print(f"No job queue found at {args.path}")
+        return
+
+    queue = JobQueue(args.path)
+    try:
+        if args.command == "stats":
+            stats = queue.stats()
+            print(f"🛰️ Job queue: {args.path}")
+            print(f"Jobs: {stats['jobs']}")
+            for status, count in stats["tasks"].items():
+                print(f"  {status}: {count}")
+        elif args.command == "list":
+            for job in queue.jobs(args.limit):
+                progress = job["progress"]
+                print(f"{job['id']}  {job['name']}  {job['status']}  {job['percent']}%  "
+                      f"{progress['done']} done, {progress['failed']} failed of {job['total']}  "
+                      f"created {_format_time(job['created_at'])}")
+        elif args.command == "prune":
+            print(f"🧹 Removed {queue.prune(args.max_age_days)} jobs")
+        elif args.command == "clear":
+            print(f"🧹 Removed {queue.clear()} jobs")
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
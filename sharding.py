@@ -0,0 +1,146 @@
+import csv
+import hashlib
+import heapq
+import os
+
+from batching import company_key
+from journal import default_journal_path, iter_journal_in_order, row_key
+from pipeline import iter_input_rows
+
+
+# Shard mode: rows are split over N processes or machines by a stable hash of the
+# company key (website domain, else firm name), so every shard can run with its own
+# API key and rate limits, and duplicates of one company always land in the same
+# shard. Each shard writes its own output, journal, metrics and dead-letter file;
+# --merge-shards rebuilds one output.csv in input order from the shard journals.
+
+MAX_REPORTED = 10
+
+
+def parse_shard(value):
+    # "2/4" -> (2, 4): the second of four shards
+    index, _, count = value.partition("/")
+    index, count = int(index), int(count)
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard must be I/N with 1 <= I <= N: {value}")
+    return index, count
+
+
+def shard_of(row, count):
+    # 1-based shard of a row; the same company key gives the same shard on every machine
+    digest = hashlib.sha1(company_key(row).encode("utf-8")).hexdigest()
+    return int(digest[:12], 16) % count + 1
+
+
+def shard_output_path(output_file, index, count):
+    # "Project/output.csv" -> "Project/output.shard-2-of-4.csv"
+    base, extension = os.path.splitext(output_file)
+    return f"{base}.shard-{index}-of-{count}{extension or '.csv'}"
+
+
+def shard_journal_paths(output_file, count):
+    return [default_journal_path(shard_output_path(output_file, index, count)) for index in range(1, count + 1)]
+
+
+def _tagged(records, shard):
+    for record in records:
+        yield record["idx"], shard, record
+
+
+def _report(problems, title, items):
+    if items:
+        shown = ", ".join(str(item) for item in items[:MAX_REPORTED])
+        more = f" and {len(items) - MAX_REPORTED} more" if len(items) > MAX_REPORTED else ""
+        problems.append(f"{len(items)} {title}: {shown}{more}")
+
+
+def merge_shards(input_file, output_file, count, headers, journals=None, route_field=None, on_row=None):
+    # Streams the input and all shard journals side by side: the journals are each
+    # merged into row order and heapq.merge interleaves the shards, so every input row
+    # is checked against exactly one record without loading any file into memory.
+    # The output is only swapped in when every row is present once, comes from its
+    # own shard and was analyzed from the same input row. Returns the problems found.
+    journals = journals or shard_journal_paths(output_file, count)
+    missing_journals = [path for path in journals if not os.path.exists(path)]
+    if missing_journals:
+        return [f"shard journal not found: {path}" for path in missing_journals]
+
+    merged = heapq.merge(*(_tagged(iter_journal_in_order(path), shard)
+                           for shard, path in enumerate(journals, 1)), key=lambda item: item[0])
+    upcoming = next(merged, None)
+    missing, duplicate, misplaced, stale, layout, extra = [], [], [], [], [], []
+    per_shard = [0] * len(journals)
+    failed = [0] * len(journals)
+    written = 0
+    layout_checked = False
+
+    tmp_file = output_file + ".tmp"
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(tmp_file, "w", newline="", encoding="utf-8-sig") as out_csv:
+        writer = None
+        for idx, row in iter_input_rows(input_file):
+            while upcoming is not None and upcoming[0] < idx:
+                extra.append(upcoming[0])
+                upcoming = next(merged, None)
+            found = []
+            while upcoming is not None and upcoming[0] == idx:
+                found.append(upcoming[1:])
+                upcoming = next(merged, None)
+            if not found:
+                missing.append(f"row {idx} (shard {shard_of(row, count)})")
+                continue
+            if len(found) > 1:
+                duplicate.append(f"row {idx} (shards {', '.join(str(shard) for shard, _ in found)})")
+                continue
+            shard, record = found[0]
+            if shard != shard_of(row, count):
+                misplaced.append(f"row {idx} (in shard {shard}, belongs to {shard_of(row, count)})")
+                continue
+            if record["key"] != row_key(row):
+                stale.append(f"row {idx} (shard {shard})")
+                continue
+
+            if not layout_checked:
+                # Shards run with --escalate carry the extra route column
+                if route_field is not None and route_field in record["row"] and route_field not in headers:
+                    headers = headers + [route_field]
+                writer = csv.DictWriter(out_csv, fieldnames=headers, extrasaction="ignore")
+                writer.writeheader()
+                layout_checked = True
+            if list(record["row"]) != headers:
+                layout.append(f"row {idx} (shard {shard})")
+                continue
+            writer.writerow(record["row"])
+            if on_row is not None:
+                on_row(idx, record["row"])
+            written += 1
+            per_shard[shard - 1] += 1
+            if record.get("failed"):
+                failed[shard - 1] += 1
+        while upcoming is not None:
+            extra.append(upcoming[0])
+            upcoming = next(merged, None)
+        if writer is None:
+            csv.DictWriter(out_csv, fieldnames=headers).writeheader()
+        out_csv.flush()
+        os.fsync(out_csv.fileno())
+
+    problems = []
+    _report(problems, "rows missing from every shard", missing)
+    _report(problems, "rows found in more than one shard", duplicate)
+    _report(problems, "rows in the wrong shard (was the same --shard N used everywhere?)", misplaced)
+    _report(problems, "rows whose input changed since their shard ran", stale)
+    _report(problems, "rows with a different column layout", layout)
+    _report(problems, "journal rows beyond the end of the input", extra)
+    if problems:
+        os.remove(tmp_file)
+        return problems
+
+    os.replace(tmp_file, output_file)
+    print(f"🧩 Merged {written} rows from {len(journals)} shards into {output_file}")
+    for shard, path in enumerate(journals, 1):
+        note = f", {failed[shard - 1]} failed (rerun that shard with --retry-failed)" if failed[shard - 1] else ""
+        print(f"   shard {shard}/{count}: {per_shard[shard - 1]} rows from {path}{note}")
+    return problems
@@ -0,0 +1,191 @@
+import argparse
+import csv
+import datetime
+import heapq
+import os
+import re
+
+from pipeline import iter_input_rows
+from schema import ATTRIBUTES, company_record
+
+
+# Ranked shortlist of the analyzed companies: the K best per "Analyzed Sector" and
+# overall, kept in bounded min-heaps while rows finish, so the full output is never
+# sorted. Equal GPT Scores are ordered by the configured tie-breakers, then by input
+# order. The shortlist is a small CSV next to output.csv.
+
+DEFAULT_K = 10
+SCORE_FIELD = "GPT Score"
+SECTOR_FIELD = "Analyzed Sector"
+OVERALL = "Overall"
+UNCLASSIFIED = "Unclassified"
+YES_VALUES = {"yes", "y", "true", "1", "ja"}
+
+# Input and output columns copied into the shortlist; input columns are found under
+# whatever name the output file gave them
+SHORTLIST_COLUMNS = [
+    "Firm name", "Company Website", SECTOR_FIELD, SCORE_FIELD, "Last funding date",
+    "Employee growth % (last 12 months)", "In Achilles", "HQ Country", "GPT Score Explanation"
+]
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_ISO_DATE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+_YEAR = re.compile(r"(?:19|20)\d{2}")
+
+
+def default_shortlist_path(output_file):
+    return os.path.splitext(output_file)[0] + ".shortlist.csv"
+
+
+def _number(text):
+    # First number in the cell: "1,250" -> 1250.0, "-4.5%" -> -4.5, "" -> None
+    match = _NUMBER.search((text or "").replace(",", ""))
+    return float(match.group()) if match else None
+
+
+def _funding_recency(company, today):
+    # Minus the years since the last funding round, so a more recent round ranks higher
+    text = company.last_funding_date
+    match = _ISO_DATE.search(text)
+    if match:
+        try:
+            return -(today - datetime.date(*map(int, match.groups()))).days / 365.25
+        except ValueError:
+            pass
+    match = _YEAR.search(text)
+    if match:
+        return -(today.year + today.timetuple().tm_yday / 365.25 - (int(match.group()) + 0.5))
+    return None
+
+
+def _employee_growth(company, today):
+    return _number(company.employee_growth)
+
+
+def _in_achilles(company, today):
+    return 1.0 if company.in_achilles.strip().lower() in YES_VALUES else 0.0
+
+
+# Tie-breaker name -> value of a row; higher ranks first, a missing value ranks last
+TIE_BREAKERS = {
+    "funding": _funding_recency,
+    "growth": _employee_growth,
+    "achilles": _in_achilles,
+}
+DEFAULT_TIE_BREAKERS = ("funding", "growth", "achilles")
+
+
+def parse_tie_breakers(value):
+    # "growth,funding" -> ("growth", "funding")
+    names = tuple(name.strip().lower() for name in value.split(",") if name.strip())
+    unknown = [name for name in names if name not in TIE_BREAKERS]
+    if unknown:
+        raise ValueError(f"unknown tie-breaker {', '.join(unknown)}; choose from {', '.join(TIE_BREAKERS)}")
+    return names
+
+
+class Shortlist:
+    def __init__(self, k=DEFAULT_K, tie_breakers=DEFAULT_TIE_BREAKERS, today=None):
+        self.k = k
+        self.tie_breakers = [TIE_BREAKERS[name] for name in tie_breakers]
+        self.today = today or datetime.date.today()
+        # List name -> min-heap of (rank key, row number, columns); the root is the weakest entry kept
+        self.heaps = {}
+        self.ranked = 0
+        self.changed = False
+
+    def _key(self, idx, company, score):
+        values = [score]
+        for tie_breaker in self.tie_breakers:
+            value = tie_breaker(company, self.today)
+            values.append(float("-inf") if value is None else value)
+        # The earlier input row wins a full tie; idx also keeps keys unique
+        values.append(-idx)
+        return tuple(values)
+
+    def _push(self, name, entry):
+        heap = self.heaps.setdefault(name, [])
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif entry[0] > heap[0][0]:
+            heapq.heapreplace(heap, entry)
+        else:
+            return False
+        return True
+
+    def add(self, idx, row, company=None):
+        # Offers one finished output row to its sector list and the overall list; company
+        # is the input row's record when the caller has it. Rows without a numeric GPT
+        # Score (failed, triaged) are not ranked.
+        if self.k <= 0:
+            return False
+        score = _number(row.get(SCORE_FIELD, ""))
+        if score is None:
+            return False
+        self.ranked += 1
+        company = company or company_record(row)
+        columns = {column: company.get(column) if column in ATTRIBUTES else row.get(column, "")
+                   for column in SHORTLIST_COLUMNS}
+        entry = (self._key(idx, company, score), idx, columns)
+        sector = (row.get(SECTOR_FIELD, "") or "").strip() or UNCLASSIFIED
+        kept = self._push(sector, entry)
+        kept = self._push(OVERALL, entry) or kept
+        self.changed = self.changed or kept
+        return kept
+
+    def lists(self):
+        # (list name, entries best first): overall first, then the sectors by name
+        names = sorted(self.heaps, key=lambda name: (name != OVERALL, name.lower()))
+        return [(name, sorted(self.heaps[name], reverse=True)) for name in names]
+
+    def write(self, path):
+        # Rewritten whole, through a temp file, so readers never see a half-written list
+        # Columns that are empty for every listed company are left out
+        present = set()
+        for heap in self.heaps.values():
+            for _, _, entry_columns in heap:
+                present.update(column for column, value in entry_columns.items() if value)
+        columns = [column for column in SHORTLIST_COLUMNS if column in present]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_file = path + ".tmp"
+        with open(tmp_file, "w", newline="", encoding="utf-8-sig") as out_csv:
+            writer = csv.DictWriter(out_csv, fieldnames=["List", "Rank", "Row"] + columns, extrasaction="ignore")
+            writer.writeheader()
+            for name, entries in self.lists():
+                for rank, (_, idx, entry_columns) in enumerate(entries, 1):
+                    writer.writerow({"List": name, "Rank": rank, "Row": idx, **entry_columns})
+        os.replace(tmp_file, path)
+        self.changed = False
+
+    def print_summary(self, path):
+        sectors = sum(1 for name in self.heaps if name != OVERALL)
+        print(f"🏅 Shortlist: top {self.k} overall and in {sectors} sectors from {self.ranked} scored "
+              f"companies, saved to {path}")
+        if not self.heaps:
+            return
+        for _, idx, columns in self.lists()[0][1][:3]:
+            print(f"   {columns.get(SCORE_FIELD, '')}  {columns.get('Firm name', '')}  "
+                  f"({columns.get(SECTOR_FIELD, '')}, row {idx})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ranked shortlist of an enriched output CSV")
+    parser.add_argument("output", nargs="?", default="Project/output.csv", help="Enriched output CSV")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="Companies per list")
+    parser.add_argument("--tie-breakers", type=parse_tie_breakers, default=DEFAULT_TIE_BREAKERS,
+                        help=f"Order of tie-breakers for equal scores (default: {','.join(DEFAULT_TIE_BREAKERS)})")
+    parser.add_argument("--shortlist", help="Shortlist CSV (default: <output>.shortlist.csv)")
+    args = parser.parse_args(argv)
+
+    shortlist = Shortlist(args.k, args.tie_breakers)
+    for idx, row in iter_input_rows(args.output):
+        shortlist.add(idx, row)
+    path = args.shortlist or default_shortlist_path(args.output)
+    shortlist.write(path)
+    shortlist.print_summary(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import threading
+import time
+
+from rate_limit import EXPECTED_COMPLETION_TOKENS
+
+
+# Streamed chat completions: the answer is read chunk by chunk and the stream is
+# closed as soon as the first complete 9-column data row of the markdown table has
+# arrived, so prose the model adds after the row is neither waited for nor generated.
+# max_tokens caps runaway answers at a multiple of the expected row length.
+
+ROW_COLUMNS = 9
+DEFAULT_MAX_TOKENS = 2 * EXPECTED_COMPLETION_TOKENS
+PROGRESS_INTERVAL = 5.0
+
+
+def is_data_row(line):
+    # A finished table row with the prompt's 9 columns. The header and separator
+    # lines models sometimes repeat do not count: their GPT Score cell has no number.
+    # A row whose cell wraps onto the next line never matches and is read to the end.
+    line = line.strip()
+    if len(line) < 2 or not (line.startswith("|") and line.endswith("|")):
+        return False
+    cells = [cell.strip() for cell in line.strip("|").split("|")]
+    if len(cells) < ROW_COLUMNS:
+        return False
+    score = cells[3]
+    return score.upper() == "N/A" or any(char.isdigit() for char in score)
+
+
+class StreamedAnswer:
+    # Text of one streamed answer, checked line by line for the table row
+    def __init__(self):
+        self.text = ""
+        self.chunks = 0
+        self.usage = None
+        self.finish_reason = None
+        self.outcome = None
+        self._line_start = 0
+
+    def feed(self, delta):
+        # True once a data row is complete; text then ends with that row
+        self.text += delta
+        while True:
+            end = self.text.find("\n", self._line_start)
+            if end < 0:
+                return False
+            line = self.text[self._line_start:end]
+            self._line_start = end + 1
+            if is_data_row(line):
+                self.text = self.text[:end]
+                self.outcome = "cut off"
+                return True
+
+    def consume(self, chunk):
+        # One ChatCompletionChunk; the usage chunk at the end has no choices
+        if getattr(chunk, "usage", None) is not None:
+            self.usage = chunk.usage
+        for choice in chunk.choices or ():
+            if choice.finish_reason:
+                self.finish_reason = choice.finish_reason
+            delta = choice.delta.content if choice.delta is not None else None
+            if delta:
+                self.chunks += 1
+                if self.feed(delta):
+                    return True
+        return False
+
+    def finish(self):
+        # The stream ended by itself: either the model stopped or max_tokens cut it
+        self.outcome = "max tokens" if self.finish_reason == "length" else "complete"
+
+    def has_row(self):
+        return self.outcome == "cut off" or any(is_data_row(line) for line in self.text.splitlines())
+
+
+class StreamProgress:
+    # Tokens received over all open streams, printed every PROGRESS_INTERVAL seconds.
+    # Streamed chunks carry about one token each, so chunks are counted as tokens.
+    def __init__(self, interval=PROGRESS_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self.started = None
+        self.last_report = 0.0
+        self.open = 0
+        self.tokens = 0
+        self.outcomes = {}
+
+    def opened(self):
+        with self._lock:
+            now = time.perf_counter()
+            if self.started is None:
+                self.started = self.last_report = now
+            self.open += 1
+
+    def received(self, tokens):
+        with self._lock:
+            self.tokens += tokens
+            now = time.perf_counter()
+            if now - self.last_report < self.interval:
+                return
+            self.last_report = now
+            line = self._line(now)
+        print(line)
+
+    def closed(self, outcome):
+        with self._lock:
+            self.open -= 1
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def _line(self, now):
+        elapsed = max(now - self.started, 1e-9)
+        finished = sum(self.outcomes.values())
+        return (f"📡 Streaming: {self.open} in flight, {self.tokens} tokens received "
+                f"({self.tokens / elapsed:.0f} tokens/s), {finished} done, "
+                f"{self.outcomes.get('cut off', 0)} cut off after the table row")
+
+
+def read_stream(stream, progress):
+    # Reads a sync openai Stream until the row is complete and closes it
+    answer = StreamedAnswer()
+    progress.opened()
+    try:
+        for chunk in stream:
+            before = answer.chunks
+            done = answer.consume(chunk)
+            progress.received(answer.chunks - before)
+            if done:
+                break
+        else:
+            answer.finish()
+    finally:
+        stream.close()
+        progress.closed(answer.outcome or "failed")
+    return answer
+
+
+async def read_stream_async(stream, progress):
+    # Same as read_stream for an openai AsyncStream
+    answer = StreamedAnswer()
+    progress.opened()
+    try:
+        async for chunk in stream:
+            before = answer.chunks
+            done = answer.consume(chunk)
+            progress.received(answer.chunks - before)
+            if done:
+                break
+        else:
+            answer.finish()
+    finally:
+        await stream.close()
+        progress.closed(answer.outcome or "failed")
+    return answer
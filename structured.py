@@ -0,0 +1,132 @@
+import json
+
+
+# Structured-output mode: the model answers with a JSON object that follows a strict
+# JSON schema instead of a markdown table row, so parsing is a single validated pass.
+
+SECTORS = [
+    "Life Science & Health",
+    "Energy and Mobility",
+    "IT and Cyber",
+    "Fintech",
+    "Education",
+    "Generic"
+]
+
+# Field name in the JSON answer -> (type, description)
+ANALYSIS_FIELDS = {
+    "short_description": ("string", "The company's description"),
+    "analyzed_sector": ("string", "Analyzed Sector"),
+    "gpt_score": ("integer", "GPT Score, 0-100"),
+    "explanation": ("string", "GPT Score Explanation (max 40 words)"),
+    "ecosystem_fit": ("string", "GPT Dutch Ecosystem Fit & Chain Partners (max 40 words)"),
+    "utrecht_connections": ("string", "Potential connections and partnerships in Utrecht Region"),
+    "sources": ("string", "GPT Source: only sources with specific, dated evidence")
+}
+
+
+def _analysis_properties():
+    properties = {}
+    for name, (kind, description) in ANALYSIS_FIELDS.items():
+        properties[name] = {"type": kind, "description": description}
+    properties["analyzed_sector"]["enum"] = SECTORS
+    properties["gpt_score"]["minimum"] = 0
+    properties["gpt_score"]["maximum"] = 100
+    return properties
+
+
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": _analysis_properties(),
+    "required": list(ANALYSIS_FIELDS),
+    "additionalProperties": False
+}
+
+BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "companies": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"company_key": {"type": "string"}, **_analysis_properties()},
+                "required": ["company_key"] + list(ANALYSIS_FIELDS),
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["companies"],
+    "additionalProperties": False
+}
+
+
+def response_format(batch=False):
+    # Value for the response_format parameter of chat.completions.create
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "fdi_batch_analysis" if batch else "fdi_analysis",
+            "strict": True,
+            "schema": BATCH_SCHEMA if batch else ANALYSIS_SCHEMA
+        }
+    }
+
+
+def validate_analysis(data):
+    # Returns (sector, score, explanation, ecosystem_fit, connections, sources) for a
+    # decoded answer that matches ANALYSIS_SCHEMA, otherwise None
+    if not isinstance(data, dict):
+        return None
+    for name, (kind, _) in ANALYSIS_FIELDS.items():
+        value = data.get(name)
+        if kind == "integer":
+            if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 100:
+                return None
+        elif not isinstance(value, str):
+            return None
+    if data["analyzed_sector"] not in SECTORS:
+        return None
+    return (
+        data["analyzed_sector"],
+        str(data["gpt_score"]),
+        data["explanation"].strip(),
+        data["ecosystem_fit"].strip(),
+        data["utrecht_connections"].strip(),
+        data["sources"].strip()
+    )
+
+
+def parse_structured(content):
+    # One json.loads plus a type check per field; None means "not a structured answer"
+    content = content.strip()
+    if not content.startswith("{"):
+        return None
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return None
+    return validate_analysis(data)
+
+
+def split_structured_batch(content, keys):
+    # Maps every Company Key to its own single-company JSON answer; invalid or missing
+    # companies are left out so the caller can fall back to single calls
+    try:
+        companies = json.loads(content).get("companies")
+    except (ValueError, AttributeError):
+        return {}
+    if not isinstance(companies, list):
+        return {}
+    wanted = {key.strip().lower(): key for key in keys}
+    rows = {}
+    for company in companies:
+        if not isinstance(company, dict):
+            continue
+        key = wanted.get(str(company.get("company_key", "")).strip().lower())
+        if key is None or key in rows:
+            continue
+        analysis = {name: company.get(name) for name in ANALYSIS_FIELDS}
+        if validate_analysis(analysis) is None:
+            continue
+        rows[key] = json.dumps(analysis, ensure_ascii=False)
+    return rows
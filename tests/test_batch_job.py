@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from openai import OpenAI
+
+import local_openai
+from batch_job import custom_id, default_state_path, ingest_batch, load_state, submit_batch, write_batch_requests
+from main import parse_analysis
+
+
+ROWS = [
+    (0, {"Firm name": "Acme", "Company Website": "acme.io", "Company Summary": "Sensors"}),
+    (1, {"Firm name": "Beta", "Company Website": "beta.io", "Company Summary": "Payments"}),
+]
+
+
+class BatchRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        server = local_openai.make_server(os.path.join(self.dir, "store"), port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.client = OpenAI(api_key="test", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1")
+
+    def test_requests_file(self):
+        requests_file = os.path.join(self.dir, "requests.jsonl")
+        self.assertEqual(write_batch_requests(ROWS, requests_file), 2)
+        with open(requests_file, encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f]
+        self.assertEqual([r["custom_id"] for r in requests], [custom_id(idx, row) for idx, row in ROWS])
+        self.assertIn("Acme", requests[0]["body"]["messages"][-1]["content"])
+
+    def test_submit_and_ingest(self):
+        requests_file = os.path.join(self.dir, "requests.jsonl")
+        state_file = default_state_path(os.path.join(self.dir, "out.csv"))
+        write_batch_requests(ROWS, requests_file)
+        batch = submit_batch(self.client, requests_file, state_file, "input.csv")
+        self.assertEqual(load_state(state_file)["batch_id"], batch.id)
+
+        results = []
+        local = lambda idx, row: ("| local |", {"source": "prescreen"}) if idx == 1 else None
+        ingested = ingest_batch(self.client, state_file, ROWS, lambda *result: results.append(result), local)
+        self.assertEqual(ingested, 2)
+        self.assertEqual([r[0] for r in results], [0, 1])
+        self.assertEqual(results[0][3]["source"], "batch_api")
+        self.assertNotEqual(parse_analysis(results[0][2])[0][1], "N/A")
+        self.assertEqual(results[1][2], "| local |")
+
+    def test_changed_rows_are_not_given_old_results(self):
+        requests_file = os.path.join(self.dir, "requests.jsonl")
+        state_file = os.path.join(self.dir, "out.batch.json")
+        write_batch_requests(ROWS, requests_file)
+        submit_batch(self.client, requests_file, state_file, "input.csv")
+        changed = [(0, dict(ROWS[0][1], **{"Company Summary": "Robots"})), ROWS[1]]
+        results = []
+        ingest_batch(self.client, state_file, changed, lambda *result: results.append(result))
+        self.assertEqual([r[0] for r in results], [1])
+
+    def test_ingest_without_submit(self):
+        with self.assertRaises(ValueError):
+            ingest_batch(self.client, os.path.join(self.dir, "none.json"), ROWS, print)
+
+
+if __name__ == "__main__":
+    unittest.main()
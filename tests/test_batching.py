@@ -0,0 +1,59 @@
+import unittest
+
+from batching import assign_company_keys, company_key, format_batch_prompt, split_batch_response, split_usage
+
+
+def _company(name, website=""):
+    return {"Firm name": name, "Company Website": website, "Company Summary": "Sensors"}
+
+
+class CompanyKeyTest(unittest.TestCase):
+    def test_domain_or_firm_name(self):
+        self.assertEqual(company_key(_company("Acme", "https://www.acme.io/about")), "acme.io")
+        self.assertEqual(company_key(_company("Acme Robotics GmbH")), "acme-robotics-gmbh")
+        self.assertEqual(company_key(_company("???")), "company")
+
+    def test_keys_are_unique_within_a_batch(self):
+        rows = [_company("Acme", "acme.io"), _company("Acme EU", "www.acme.io"), _company("Beta")]
+        self.assertEqual(assign_company_keys(rows), ["acme.io", "acme.io#2", "beta"])
+
+    def test_prompt_lists_every_key(self):
+        rows = [_company("Acme", "acme.io"), _company("Beta")]
+        prompt = format_batch_prompt(rows, assign_company_keys(rows))
+        self.assertIn("acme.io", prompt)
+        self.assertIn("beta", prompt)
+
+
+class SplitBatchResponseTest(unittest.TestCase):
+    def test_rows_are_matched_by_key(self):
+        content = "\n".join([
+            "| Company Key | Description | Sector | | Score | Explanation | Fit | Connections | | Source |",
+            "|---|---|---|---|---|---|---|---|---|---|",
+            "| **Beta** | Beta desc | Fintech | | 40 | Weak | Some | None | | |",
+            "| `acme.io` | Acme desc | IT and Cyber | | 80 | Strong | Good | UU | | site |",
+            "| unknown.com | Other | Generic | | 10 | No | No | No | | |",
+        ])
+        rows = split_batch_response(content, ["acme.io", "beta"])
+        self.assertEqual(rows["acme.io"], "| Acme desc | IT and Cyber |  | 80 | Strong | Good | UU |  | site |")
+        self.assertEqual(sorted(rows), ["acme.io", "beta"])
+
+    def test_malformed_and_repeated_rows_are_left_out(self):
+        content = "\n".join([
+            "| acme.io | Acme desc | IT and Cyber | | 80 | Strong | Good | UU | | |",
+            "| acme.io | Again | Generic | | 10 | Later | | | | |",
+            "| beta | Beta desc | Fintech | | high | Weak | Some | None | | |",
+            "| gamma | too | short |",
+        ])
+        rows = split_batch_response(content, ["acme.io", "beta", "gamma"])
+        self.assertEqual(list(rows), ["acme.io"])
+        self.assertIn("Acme desc", rows["acme.io"])
+
+    def test_usage_is_shared_evenly(self):
+        usage = split_usage({"prompt_tokens": 900, "completion_tokens": 300, "total_tokens": 1200, "model": "m"}, 3)
+        self.assertEqual((usage["prompt_tokens"], usage["completion_tokens"], usage["total_tokens"]), (300, 100, 400))
+        self.assertEqual(usage["source"], "batch")
+        self.assertEqual(usage["model"], "m")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import engine
+from entities import EntityIndex, entity_keys, normalize_domain, normalize_linkedin
+from ranking import empty_usage
+
+
+class EntityKeyTest(unittest.TestCase):
+    def test_domains_and_linkedin_pages_are_normalized(self):
+        self.assertEqual(normalize_domain("HTTPS://www.Example.com:443/en/about?x=1"), "example.com")
+        self.assertIsNone(normalize_domain("https://www.linkedin.com/company/acme"))
+        self.assertEqual(normalize_linkedin("https://nl.linkedin.com/company/Acme-BV/about/"), "company/acme-bv")
+        row = {"Firm name": "Acme", "Company Website": "www.acme.io", "LinkedIn URL": "linkedin.com/company/acme"}
+        self.assertEqual(entity_keys(row), ["domain:acme.io", "linkedin:company/acme"])
+
+
+class EntityIndexTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "index.sqlite")
+
+    def test_changed_input_is_not_reused(self):
+        index = EntityIndex(self.path)
+        self.addCleanup(index.close)
+        index.record(["domain:acme.io"], "Acme", "| row |", "gpt-4o-mini", "fair.csv", "v1")
+        # A second key of the same company finds the entry too
+        self.assertEqual(index.lookup(["linkedin:company/acme", "domain:acme.io"], "v1"), "| row |")
+        self.assertIsNone(index.lookup(["domain:acme.io"], "v2"))
+        self.assertIsNone(index.lookup(["domain:other.io"], "v1"))
+
+    def test_index_without_fingerprints_is_migrated(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE entities (id INTEGER PRIMARY KEY, firm_name TEXT NOT NULL, response TEXT NOT NULL, "
+                     "model TEXT NOT NULL, fair TEXT NOT NULL, analyzed_at REAL NOT NULL, "
+                     "hits INTEGER NOT NULL DEFAULT 0)")
+        conn.execute("INSERT INTO entities VALUES (1, 'Acme', '| old |', 'gpt-4o-mini', 'fair.csv', 1e10, 0)")
+        conn.execute("CREATE TABLE entity_keys (key TEXT PRIMARY KEY, entity_id INTEGER NOT NULL)")
+        conn.execute("INSERT INTO entity_keys VALUES ('domain:acme.io', 1)")
+        conn.commit()
+        conn.close()
+        index = EntityIndex(self.path)
+        self.addCleanup(index.close)
+        self.assertIsNone(index.lookup(["domain:acme.io"], "v1"))
+
+
+class DuplicateFoldingTest(unittest.TestCase):
+    def test_duplicates_share_the_first_analysis(self):
+        calls = []
+
+        async def analyze(row, client, **options):
+            calls.append(row["Firm name"])
+            return f"| {row['Firm name']} |", dict(empty_usage("api"), prompt_tokens=10)
+
+        async def close():
+            pass
+
+        rows = [(1, {"Firm name": "Acme", "Company Website": "acme.io"}),
+                (2, {"Firm name": "Beta", "Company Website": "beta.io"}),
+                (3, {"Firm name": "Acme B.V.", "Company Website": "https://www.acme.io/nl"})]
+        results = []
+        with mock.patch.object(engine, "analyze_company_async", analyze), \
+                mock.patch.object(engine, "get_async_client", lambda: None), \
+                mock.patch.object(engine, "close_async_client", close):
+            engine.run_analyses(iter(rows), 2, lambda idx, row, content, usage: results.append(
+                (idx, content, usage["source"])), entity_keys=entity_keys)
+        self.assertEqual(calls, ["Acme", "Beta"])
+        self.assertEqual(results, [(1, "| Acme |", "api"), (2, "| Beta |", "api"), (3, "| Acme |", "duplicate")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import csv
+import datetime
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from features import SIGNAL_NAMES, describe_signals, score_input, triage_mask
+
+
+TODAY = datetime.date(2025, 6, 1)
+
+
+class ScoreInputTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "input.csv")
+
+    def _write(self, header, rows):
+        with open(self.path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    def test_signals_and_prescore(self):
+        self._write(
+            ["Firm name", "Employees", "Year Founded", "Last funding date", "Last round",
+             "Revenue growth", "Number of patents", "In Achilles", "Employee growth % (last 12 months)"],
+            [
+                ["Acme", "1,250", "2015", "2024-09-01", "Series B", ";;0.1;0.2;;", "3", "Yes", "5%"],
+                ["Beta", "11-50", "2024", "2019", "Seed", "", "", "no", "-4.5%"],
+                ["Empty", "", "", "", "", "", "", "", ""],
+            ])
+        prescores, bits = score_input(self.path, chunk_size=2, today=TODAY)
+        self.assertEqual(prescores.tolist(), [100.0, 0.0, 0.0])
+        self.assertEqual(describe_signals(bits[1]), "declining headcount")
+        self.assertEqual(describe_signals(bits[2]), "none")
+        self.assertEqual(bin(int(bits[0])).count("1"), len(SIGNAL_NAMES) - 1)
+
+    def test_aliased_feature_columns(self):
+        self._write(["Company", "Launch year", "Employees"], [["Acme", "2010", "20"]])
+        prescores, _ = score_input(self.path, today=TODAY)
+        self.assertEqual(prescores.tolist(), [35.0])
+
+    def test_header_only(self):
+        self._write(["Firm name", "Employees"], [])
+        prescores, bits = score_input(self.path, today=TODAY)
+        self.assertEqual((len(prescores), len(bits)), (0, 0))
+
+
+class TriageMaskTest(unittest.TestCase):
+    def test_top_k_and_minimum(self):
+        prescores = np.array([20, 70, 70, 0, 45], dtype=np.float32)
+        self.assertEqual(triage_mask(prescores).tolist(), [True] * 5)
+        # Ties go to the earlier row
+        self.assertEqual(np.flatnonzero(triage_mask(prescores, top_k=2)).tolist(), [1, 2])
+        self.assertEqual(np.flatnonzero(triage_mask(prescores, top_k=1)).tolist(), [1])
+        self.assertEqual(np.flatnonzero(triage_mask(prescores, min_prescore=40)).tolist(), [1, 2, 4])
+        self.assertEqual(np.flatnonzero(triage_mask(prescores, top_k=2, min_prescore=71)).tolist(), [])
+        self.assertEqual(triage_mask(prescores, top_k=0).sum(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
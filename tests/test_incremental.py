@@ -0,0 +1,61 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from incremental import PreviousResults, carried_response, input_fingerprint, parse_carried
+from schema import GPT_FIELDS
+
+
+def _company(name, summary, **columns):
+    return dict({"Firm name": name, "Company Website": f"https://{name.lower()}.io",
+                 "Company Summary": summary, "HQ Country": "Germany"}, **columns)
+
+
+class InputFingerprintTest(unittest.TestCase):
+    def test_only_prompt_input_counts(self):
+        row = _company("Acme", "Sensors")
+        self.assertEqual(input_fingerprint(row), input_fingerprint(dict(row, **{"GPT Score": "80"})))
+        self.assertNotEqual(input_fingerprint(row), input_fingerprint(_company("Acme", "Sensors and drones")))
+        # The output layout's column names give the same fingerprint
+        aliased = {"Company Name": "Acme", "Company Website": "https://acme.io", "Short description": "Sensors",
+                   "HQ country": "Germany"}
+        self.assertEqual(input_fingerprint(row), input_fingerprint(aliased))
+
+
+class PreviousResultsTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "output.csv")
+        rows = [dict(_company("Acme", "Sensors"), **{"Analyzed Sector": "IT and Cyber", "GPT Score": "80"}),
+                dict(_company("Beta", "Payments"), **{"Analyzed Sector": "Fintech", "GPT Score": "55"}),
+                dict(_company("Gamma", "Batteries"), **{"GPT Score": "N/A"})]
+        headers = list(rows[0])
+        with open(self.path, "w", newline="", encoding="utf-8-sig") as file:
+            writer = csv.DictWriter(file, fieldnames=headers, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def test_classify_and_count_api_work(self):
+        previous = PreviousResults(self.path, GPT_FIELDS)
+        self.assertEqual(len(previous), 2)
+        content, usage = previous.analysis(_company("Acme", "Sensors"))
+        self.assertEqual(usage["source"], "previous")
+        self.assertEqual(parse_carried(content)[:2], ("IT and Cyber", "80"))
+        self.assertIsNone(previous.analysis(_company("Beta", "Payments and lending")))
+        self.assertIsNone(previous.analysis(_company("Gamma", "Batteries")))
+        self.assertIsNone(previous.analysis(_company("Delta", "Drones")))
+        self.assertEqual(previous.counts, {"reused": 1, "changed": 2, "added": 1})
+        # Only rows that reached the API count as analyzed
+        previous.record_analyzed(_company("Delta", "Drones"))
+        self.assertEqual(previous.analyzed, {"changed": 0, "added": 1})
+
+    def test_carried_response_round_trip(self):
+        fields = ["Fintech", "55", "Why", "", "", "Input data"]
+        self.assertEqual(parse_carried(carried_response(fields)), tuple(fields))
+        self.assertIsNone(parse_carried("| Acme | Fintech |"))
+
+
+if __name__ == "__main__":
+    unittest.main()
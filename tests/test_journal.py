@@ -0,0 +1,72 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from journal import (CheckpointJournal, build_output_from_journal, iter_journal_in_order, journal_keys, read_journal,
+                     row_key)
+from pipeline import iter_input_rows
+
+
+def _record(idx, score, failed=False):
+    record = {"idx": idx, "key": f"key-{idx}", "row": {"Firm name": f"Company {idx}", "GPT Score": score}}
+    if failed:
+        record["failed"] = True
+    return record
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = os.path.join(directory.name, "output.journal.jsonl")
+
+    def test_torn_last_line_is_skipped_and_terminated(self):
+        with CheckpointJournal(self.path) as journal:
+            journal.append(_record(1, "80"))
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write('{"idx": 2, "key": "key-2", "ro')
+        self.assertEqual([record["idx"] for record in read_journal(self.path)], [1])
+        with CheckpointJournal(self.path, resume=True) as journal:
+            journal.append(_record(3, "70"))
+        self.assertEqual([record["idx"] for record in read_journal(self.path)], [1, 3])
+
+    def test_without_resume_the_journal_starts_over(self):
+        with CheckpointJournal(self.path) as journal:
+            journal.append(_record(1, "80"))
+        with CheckpointJournal(self.path) as journal:
+            journal.append(_record(2, "60"))
+        self.assertEqual(list(journal_keys(self.path)), [2])
+
+    def test_resumed_runs_rebuild_in_input_order(self):
+        # First run: rows 1, 2 (failed) and 4; the resumed run redoes row 2 and adds row 3
+        with CheckpointJournal(self.path) as journal:
+            for record in (_record(1, "80"), _record(2, "N/A", failed=True), _record(4, "40")):
+                journal.append(record)
+        self.assertEqual(journal_keys(self.path), {1: "key-1", 4: "key-4"})
+        with CheckpointJournal(self.path, resume=True) as journal:
+            journal.append(_record(2, "55"))
+            journal.append(_record(3, "65"))
+        self.assertEqual([(record["idx"], record["row"]["GPT Score"]) for record in iter_journal_in_order(self.path)],
+                         [(1, "80"), (2, "55"), (3, "65"), (4, "40")])
+
+        output = os.path.join(self.directory, "output.csv")
+        seen = []
+        written = build_output_from_journal(self.path, output, ["Firm name", "GPT Score"],
+                                            on_row=lambda idx, row: seen.append(idx))
+        self.assertEqual((written, seen), (4, [1, 2, 3, 4]))
+        with open(output, newline="", encoding="utf-8-sig") as file:
+            self.assertEqual([row["GPT Score"] for row in csv.DictReader(file)], ["80", "55", "65", "40"])
+
+    def test_row_key_is_the_same_for_compact_and_plain_rows(self):
+        path = os.path.join(self.directory, "input.csv")
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            file.write("Firm name,HQ Country\nAcme,Germany\n")
+        (_, row), = iter_input_rows(path)
+        self.assertEqual(row_key(row), row_key({"Firm name": "Acme", "HQ Country": "Germany"}))
+        self.assertNotEqual(row_key(row), row_key({"Firm name": "Acme", "HQ Country": "France"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import contextlib
+import io
+import unittest
+
+from metrics import RunMetrics, estimate_cost, percentile
+from ranking import empty_usage
+
+
+def _usage(model, uncached, completion, **extra):
+    return dict(empty_usage("api"), model=model, prompt_tokens=uncached, uncached_tokens=uncached,
+                completion_tokens=completion, **extra)
+
+
+class CostTest(unittest.TestCase):
+    def test_cost_follows_the_model_and_the_batch_discount(self):
+        self.assertAlmostEqual(estimate_cost(_usage("gpt-4o-mini", 1_000_000, 0), "gpt-4o"), 0.15)
+        self.assertAlmostEqual(estimate_cost(dict(_usage("gpt-4o", 0, 1_000_000), source="batch_api"), "gpt-4o"), 5.0)
+        self.assertIsNone(estimate_cost(_usage("unknown-model", 10, 10), "unknown-model"))
+
+    def test_escalated_rows_are_split_per_model(self):
+        metrics = RunMetrics(None, "gpt-4o-mini")
+        metrics.record(1, {"Firm name": "Acme"}, _usage("gpt-4o-mini", 1_000_000, 0), "table", 1.0)
+        tiers = [{"model": "gpt-4o-mini", "api_seconds": 1.0, "cost_usd": 0.15},
+                 {"model": "gpt-4o", "api_seconds": 2.0, "cost_usd": 2.5}]
+        metrics.record(2, {"Firm name": "Beta"}, _usage("gpt-4o", 2_000_000, 0, tiers=tiers), "table", 3.0)
+        summary = metrics.summary()
+        self.assertEqual(summary["cost_usd"], 2.8)
+        self.assertEqual(summary["cost_by_model"], {"gpt-4o-mini": 0.3, "gpt-4o": 2.5})
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            metrics.print_summary()
+        self.assertIn("Estimated cost: $2.8000 over 2 models (gpt-4o-mini $0.3000 + gpt-4o $2.5000)", out.getvalue())
+
+
+class PercentileTest(unittest.TestCase):
+    def test_nearest_rank(self):
+        values = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([], 95), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import asyncio
+import time
+import unittest
+
+from prefetch import WebsitePrefetcher, extract_page
+
+
+class PoliteHostTest(unittest.TestCase):
+    def test_cancelled_wait_releases_the_host(self):
+        async def scenario():
+            prefetcher = WebsitePrefetcher(None, host_delay=30.0)
+            prefetcher._start()
+            try:
+                prefetcher._hosts["acme.io"] = [asyncio.Lock(), time.monotonic()]
+
+                async def fetch():
+                    async with prefetcher._polite("acme.io"):
+                        pass
+
+                waiting = asyncio.ensure_future(fetch())
+                await asyncio.sleep(0.05)
+                waiting.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await waiting
+                prefetcher.host_delay = 0.0
+                await asyncio.wait_for(fetch(), 1.0)
+            finally:
+                await prefetcher.aclose()
+
+        asyncio.run(scenario())
+
+
+class ExtractPageTest(unittest.TestCase):
+    def test_title_text_and_links(self):
+        html = ("<html><head><title>Acme</title><meta name='description' content='Sensors'>"
+                "<script>var x = 1;</script></head><body><p>We build sensors in Utrecht.</p>"
+                "<a href='/about'>About</a></body></html>")
+        title, description, text, links = extract_page(html)
+        self.assertEqual((title, description), ("Acme", "Sensors"))
+        self.assertIn("We build sensors in Utrecht.", text)
+        self.assertNotIn("var x", text)
+        self.assertIn(("/about", "About"), links)
+
+
+if __name__ == "__main__":
+    unittest.main()
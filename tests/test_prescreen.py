@@ -0,0 +1,55 @@
+import unittest
+
+from main import parse_analysis
+from prescreen import check_netherlands, check_utrecht_region, dutch_places, prescreen_company
+
+
+def _company(**columns):
+    return dict({"Firm name": "Acme", "Company Summary": "Sensors", "All Industries": "Software",
+                 "HQ Country": "Germany", "HQ City": "Berlin"}, **columns)
+
+
+class UtrechtRegionTest(unittest.TestCase):
+    def test_municipalities(self):
+        self.assertEqual(check_utrecht_region(_company(**{"HQ Country": "Netherlands", "HQ City": "Utrechtse Heuvelrug"})),
+                         ("Already in Utrecht Region: HQ city shows Utrechtse Heuvelrug", "HQ City"))
+        self.assertEqual(check_utrecht_region(_company(**{"Other office locations": "Paris; Zeist"}))[1],
+                         "Other office locations")
+        self.assertEqual(check_utrecht_region(_company(**{"Provinces and Employees": "Utrecht: 12"}))[1],
+                         "Provinces and Employees")
+
+    def test_ambiguous_places_need_the_netherlands(self):
+        # Soest is also a German town
+        self.assertIsNone(check_utrecht_region(_company(**{"HQ City": "Soest"})))
+        self.assertIsNotNone(check_utrecht_region(_company(**{"HQ Country": "Netherlands", "HQ City": "Soest"})))
+
+
+class NetherlandsTest(unittest.TestCase):
+    def test_dutch_signals(self):
+        self.assertEqual(check_netherlands(_company(**{"Firm name": "Acme B.V."}))[1], "Firm name")
+        self.assertEqual(check_netherlands(_company(**{"In NL?": "Yes"}))[1], "In NL?")
+        self.assertEqual(check_netherlands(_company(**{"Other office locations": "Eindhoven"}))[0],
+                         "Already in Netherlands: Other office locations shows Eindhoven")
+        self.assertEqual(check_netherlands(_company(**{"Other office locations": "London, NL"}))[1],
+                         "Other office locations")
+
+    def test_look_alikes_do_not_match(self):
+        self.assertIsNone(check_netherlands(_company(**{"Firm name": "NLP Labs", "Company Summary": "nl domain"})))
+        self.assertIsNone(check_netherlands(_company(**{"Other office locations": "Amsterdam, New York"})))
+        self.assertIsNone(check_netherlands(_company(**{"Provinces and Employees": "0"})))
+
+    def test_website_places(self):
+        self.assertEqual(dutch_places("Offices in Utrecht and Rotterdam"), ["Utrecht"])
+        self.assertEqual(dutch_places("Offices in Rotterdam, the Netherlands"), ["Rotterdam"])
+
+
+class PrescreenResponseTest(unittest.TestCase):
+    def test_local_answer_parses_like_an_api_row(self):
+        fields, method = parse_analysis(prescreen_company(_company(**{"HQ Country": "Netherlands", "HQ City": "Utrecht"})))
+        self.assertEqual(fields[1], "0")
+        self.assertEqual(fields[2], "Already in Utrecht Region: HQ city shows Utrecht")
+        self.assertIsNone(prescreen_company(_company()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+import ranking
+from prompts import ROM_FDI_COMPANY_TEMPLATE, ROM_FDI_PROMPT_TEMPLATE
+
+
+ROW = {"Firm name": "Acme", "Company Website": "acme.io", "Company Summary": "Sensors", "HQ Country": "Germany"}
+
+
+class PromptTemplateTest(unittest.TestCase):
+    def tearDown(self):
+        ranking.configure_website_context(None)
+
+    def test_single_string_template_keeps_its_placeholders(self):
+        prompt = ROM_FDI_PROMPT_TEMPLATE.format(**ranking.prompt_fields(ROW))
+        self.assertIn("Company Name: Acme", prompt)
+        self.assertNotIn("{website_content}", ROM_FDI_PROMPT_TEMPLATE)
+
+    def test_website_content_defaults_to_the_fetched_text(self):
+        self.assertEqual(ranking.format_company(ROM_FDI_COMPANY_TEMPLATE, ROW),
+                         ROM_FDI_COMPANY_TEMPLATE.format(**ranking.prompt_fields(ROW), website_content=""))
+        ranking.configure_website_context(lambda row: "Company website content: sensors made in Utrecht")
+        self.assertIn("sensors made in Utrecht", ranking.format_company_prompt(ROW))
+
+    def test_static_prefix_is_the_same_for_every_company(self):
+        first = ranking.build_messages(ranking.format_company_prompt(ROW))
+        second = ranking.build_messages(ranking.format_company_prompt(dict(ROW, **{"Firm name": "Beta"})))
+        self.assertEqual(first[0], second[0])
+        self.assertNotEqual(first[1], second[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
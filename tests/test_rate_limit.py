@@ -0,0 +1,44 @@
+import unittest
+
+from rate_limit import RateLimiter, TokenBucket, parse_reset_duration
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_reservations_queue_up_in_order(self):
+        bucket = TokenBucket(60)
+        bucket.updated = 0.0
+        bucket.tokens = 1.0
+        self.assertEqual(bucket.reserve(1, 0.0), 0.0)
+        self.assertAlmostEqual(bucket.reserve(1, 0.0), 1.0)
+        self.assertAlmostEqual(bucket.reserve(1, 0.0), 2.0)
+
+    def test_header_limit_never_raises_the_configured_capacity(self):
+        bucket = TokenBucket(600)
+        bucket.sync(10000, None, None, 0.0)
+        self.assertEqual(bucket.capacity, 600.0)
+        bucket.sync(300, None, None, 0.0)
+        self.assertEqual(bucket.capacity, 300.0)
+
+    def test_exhausted_server_window_blocks_until_reset(self):
+        bucket = TokenBucket(600)
+        bucket.updated = 0.0
+        bucket.sync(None, 0, 6.0, 0.0)
+        self.assertGreaterEqual(bucket.reserve(1, 0.0), 6.0)
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_reset_durations(self):
+        self.assertEqual(parse_reset_duration("20ms"), 0.02)
+        self.assertEqual(parse_reset_duration("6m0s"), 360.0)
+        self.assertEqual(parse_reset_duration("1.5"), 1.5)
+        self.assertIsNone(parse_reset_duration(""))
+
+    def test_over_reserved_tokens_are_given_back(self):
+        limiter = RateLimiter(1000, 1000)
+        limiter.reserve(800)
+        limiter.reconcile(800, 100)
+        self.assertGreaterEqual(limiter.token_bucket.tokens, 899)
+
+
+if __name__ == "__main__":
+    unittest.main()
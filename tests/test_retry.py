@@ -0,0 +1,118 @@
+import asyncio
+import concurrent.futures
+import threading
+import unittest
+from unittest import mock
+
+import httpx
+import openai
+
+import ranking
+from rate_limit import RateLimiter
+from retry import CircuitBreaker
+
+
+MESSAGES = [{"role": "system", "content": "system"}, {"role": "user", "content": "Company Name: Acme"}]
+ROW = "| Acme | Generic | | 70 | Fine | | | | Input data |"
+
+
+def _completion():
+    return {
+        "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": ranking.MODEL,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": ROW}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }
+
+
+def _client(statuses):
+    # Answers the chat requests with the given status codes in turn, then 200s
+    statuses = list(statuses)
+    lock = threading.Lock()
+
+    def handle(request):
+        with lock:
+            status = statuses.pop(0) if statuses else 200
+        if status == 200:
+            return httpx.Response(200, json=_completion())
+        headers = {"retry-after": "1", "retry-after-ms": "200"} if status == 429 else {}
+        return httpx.Response(status, headers=headers, json={"error": {"message": f"status {status}"}})
+
+    http_client = httpx.Client(transport=httpx.MockTransport(handle))
+    return openai.OpenAI(api_key="sk-test", base_url="http://stand-in/v1", http_client=http_client)
+
+
+def _async_client(statuses):
+    statuses = list(statuses)
+
+    async def handle(request):
+        status = statuses.pop(0) if statuses else 200
+        if status == 200:
+            return httpx.Response(200, json=_completion())
+        headers = {"retry-after": "1", "retry-after-ms": "200"} if status == 429 else {}
+        return httpx.Response(status, headers=headers, json={"error": {"message": f"status {status}"}})
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    return openai.AsyncOpenAI(api_key="sk-test", base_url="http://stand-in/v1", http_client=http_client)
+
+
+class CircuitBreakerProbeTest(unittest.TestCase):
+    def setUp(self):
+        ranking.configure_rate_limits(10 ** 8, 10 ** 6)
+        ranking.configure_response_cache(None)
+        self.breaker = ranking.configure_retries(3, CircuitBreaker(1, 0.1))
+        patcher = mock.patch.object(ranking, "backoff_delay", lambda attempt: 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(ranking.configure_retries)
+
+    def _complete(self, client):
+        with concurrent.futures.ThreadPoolExecutor(1) as pool:
+            future = pool.submit(ranking.complete_chat, MESSAGES, client, "Acme")
+            return future.result(timeout=10)
+
+    def test_rate_limited_probe_releases_the_breaker(self):
+        # 503 opens the breaker, the half-open probe gets a 429, the retry succeeds
+        client = _client([503, 429])
+        content, usage = self._complete(client)
+        self.assertEqual(content, ROW)
+        self.assertEqual(usage["retries"], 2)
+        # The 429's retry-after-ms was waited out before the retry
+        self.assertGreaterEqual(usage["wait_seconds"], 0.2)
+        self.assertIsNone(self.breaker.probing)
+
+        content, _ = self._complete(client)
+        self.assertEqual(content, ROW)
+
+    def test_async_calls_share_the_retry_decisions(self):
+        client = _async_client([503, 429])
+        content, usage = asyncio.run(ranking.complete_chat_async(MESSAGES, client, "Acme"))
+        self.assertEqual(content, ROW)
+        self.assertEqual(usage["retries"], 2)
+        self.assertGreaterEqual(usage["wait_seconds"], 0.2)
+        self.assertIsNone(self.breaker.probing)
+
+    def test_final_error_is_returned_as_api_error(self):
+        content, usage = self._complete(_client([400]))
+        self.assertEqual(content, "API_ERROR")
+        self.assertEqual((usage["source"], usage["retries"]), ("error", 0))
+        self.assertEqual(self.breaker.failures, 0)
+
+    def test_unanswered_probe_is_released(self):
+        self.breaker.record_failure()
+        self.breaker.open_until = 0.0
+        ticket = self.breaker.wait_blocking()
+        self.assertIsNotNone(ticket)
+        self.breaker.release(ticket)
+        self.assertIsNotNone(self.breaker.wait_blocking())
+
+
+class RateLimitBackoffTest(unittest.TestCase):
+    def test_retry_after_ms_wins_over_rounded_retry_after(self):
+        limiter = RateLimiter(10 ** 6, 10 ** 4)
+        self.assertAlmostEqual(limiter.backoff({"retry-after": "1", "retry-after-ms": "250"}), 0.25)
+        self.assertEqual(limiter.backoff({"retry-after": "2"}), 2.0)
+        self.assertEqual(limiter.backoff({}, default_seconds=0.5), 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+from ranking import empty_usage
+from routing import TieredRouter
+
+
+ROW = "| Acme | Generic | | 55 | Fine | | | | Input data |"
+
+
+def _parse(content):
+    return ("Generic", content.split("|")[4].strip(), "", "", "", ""), "table"
+
+
+class EscalatedUsageTest(unittest.TestCase):
+    def test_missing_tier_values_count_as_zero(self):
+        first = dict(empty_usage("api"), cached_tokens=None, api_seconds=0.5, wait_seconds=0.25, model="gpt-4o-mini")
+        second = dict(empty_usage("api"), prompt_tokens=100, cached_tokens=40, api_seconds=1.5, model="gpt-4o")
+        first["prompt_tokens"] = 50
+        content, usage = TieredRouter(_parse).escalated(ROW, first, ROW, second, "score in band")
+        self.assertEqual(content, ROW)
+        self.assertEqual(usage["prompt_tokens"], 150)
+        self.assertEqual(usage["cached_tokens"], 40)
+        self.assertEqual(usage["api_seconds"], 2.0)
+        self.assertEqual(usage["wait_seconds"], 0.25)
+        self.assertEqual(usage["model"], "gpt-4o")
+        self.assertEqual(len(usage["tiers"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from pipeline import iter_input_rows
+from schema import COMPANY_FIELDS, InputRow, compact_row, compile_schema, company_record, describe_schema, normalize_column
+
+
+class SchemaTest(unittest.TestCase):
+    def test_normalize_column(self):
+        self.assertEqual(normalize_column("  HQ country "), "hq country")
+        self.assertEqual(normalize_column("Revenue (EUR) (2016,2017, 2018)"), "revenue eur")
+        self.assertEqual(normalize_column("Employee growth % (last 12 months)"), "employee growth % last 12 months")
+
+    def test_layout_aliases(self):
+        schema = compile_schema(["Company Name", "Short description", "Launch year", "LinkedIn", "Revenue (EUR) (2020,2021)"])
+        self.assertEqual(schema.column("Firm name"), "Company Name")
+        self.assertEqual(schema.column("Company Summary"), "Short description")
+        self.assertEqual(schema.column("Revenue"), "Revenue (EUR) (2020,2021)")
+        self.assertEqual(schema.aliased["Year Founded"], "Launch year")
+        self.assertIn("HQ Country", schema.missing)
+
+    def test_loose_names_are_not_matched(self):
+        schema = compile_schema(["Name", "URL", "Country"])
+        self.assertIsNone(schema.column("Firm name"))
+        self.assertIsNone(schema.column("Company Website"))
+        self.assertIsNone(schema.column("HQ Country"))
+        self.assertEqual(len(schema.missing), len(COMPANY_FIELDS))
+
+    def test_canonical_name_wins(self):
+        schema = compile_schema(["Company Name", "firm  name"])
+        self.assertEqual(schema.column("Firm name"), "firm  name")
+        self.assertEqual(schema.aliased, {})
+
+    def test_describe_schema(self):
+        lines = describe_schema(compile_schema(["Company Name"] + [column for _, column, _ in COMPANY_FIELDS[1:-1]]))
+        self.assertEqual(lines, ["🗂️ Columns read under another name: Firm name = Company Name",
+                                 "⚠️ Input has no column for: Project Teams (left empty in the prompt)"])
+        self.assertEqual(describe_schema(compile_schema([column for _, column, _ in COMPANY_FIELDS])), [])
+
+
+class InputRowTest(unittest.TestCase):
+    def test_reads_like_a_dict_reader_row(self):
+        row = InputRow(compile_schema(["Company Name", "HQ City", "HQ City", "Notes"]), ["Acme", "Berlin", "Utrecht"])
+        self.assertEqual(row["HQ City"], "Utrecht")
+        self.assertIsNone(row["Notes"])
+        self.assertIsNone(row.get("Notes"))
+        self.assertEqual(row.get("Other", "-"), "-")
+        self.assertEqual(list(row), ["Company Name", "HQ City", "Notes"])
+        self.assertEqual((row.company.firm_name, row.company.hq_city), ("Acme", "Utrecht"))
+
+    def test_dicts_and_records(self):
+        row = {"Company Name": "Acme", "HQ Country": None}
+        self.assertEqual(company_record(row).firm_name, "Acme")
+        self.assertEqual(company_record(row).get("HQ Country"), "")
+        compact = compact_row(row)
+        self.assertIs(compact_row(compact), compact)
+        self.assertIs(company_record(company_record(compact)), compact.company)
+
+    def test_iter_input_rows(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "input.csv")
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            f.write("Company Name,Short description\r\nAcme,Sensors\r\n\r\nBeta\r\n")
+        rows = list(iter_input_rows(path))
+        self.assertEqual([idx for idx, _ in rows], [1, 2])
+        self.assertEqual(rows[0][1].company.company_summary, "Sensors")
+        self.assertEqual(rows[1][1].company.company_summary, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,20 @@
+import unittest
+
+from prescreen import prescreen_company
+from sectors import default_classifier, guess_sector
+
+
+class OneSectorClassifierTest(unittest.TestCase):
+    def test_prescreen_and_slim_prompts_agree(self):
+        row = {"Firm name": "Acme BV", "All Industries": "Software, Solar energy", "Company Summary": "",
+               "HQ Country": "Netherlands", "HQ City": "Utrecht"}
+        sector, _ = default_classifier().classify(row)
+        self.assertEqual(guess_sector(row), sector)
+        self.assertEqual(prescreen_company(row).split("|")[2].strip(), sector)
+
+    def test_no_match_is_generic(self):
+        self.assertEqual(guess_sector({"All Industries": "Bakery", "Company Summary": ""}), "Generic")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import http.client
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from service import JobQueue, make_server, parse_csv_upload, parse_json_rows
+
+
+def _rows(*names):
+    return [{"Firm name": name, "HQ Country": "Germany"} for name in names]
+
+
+class JobQueueTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "jobs.sqlite")
+        self.queue = JobQueue(self.path)
+        self.addCleanup(self.queue.close)
+
+    def test_same_upload_is_one_job_unless_forced(self):
+        job, created = self.queue.add_job("fair", ["Firm name", "HQ Country"], _rows("Acme"), "digest")
+        self.assertTrue(created)
+        again, created = self.queue.add_job("fair", ["Firm name", "HQ Country"], _rows("Acme"), "digest")
+        self.assertEqual((again["id"], created), (job["id"], False))
+        forced, created = self.queue.add_job("fair", ["Firm name", "HQ Country"], _rows("Acme"), "digest", True)
+        self.assertTrue(created)
+        self.assertNotEqual(forced["id"], job["id"])
+
+    def test_jobs_take_turns_and_results_keep_input_order(self):
+        fair, _ = self.queue.add_job("fair", ["Firm name"], _rows("A", "B", "C"), "one")
+        single, _ = self.queue.add_job("single", ["Firm name"], _rows("S"), "two")
+        claimed = [self.queue.claim() for _ in range(4)]
+        self.assertEqual([task["row"]["Firm name"] for task in claimed], ["A", "S", "B", "C"])
+        self.assertIsNone(self.queue.claim())
+        for task in reversed(claimed):
+            self.queue.finish(task, "done", {"Firm name": task["row"]["Firm name"]}, {"prompt_tokens": 5})
+        _, rows = self.queue.results(fair["id"])
+        self.assertEqual([row["Firm name"] for row in rows], ["A", "B", "C"])
+        job = self.queue.job(fair["id"])
+        self.assertEqual((job["status"], job["prompt_tokens"]), ("finished", 15))
+
+    def test_running_rows_are_requeued_after_a_restart(self):
+        self.queue.add_job("fair", ["Firm name"], _rows("A"), "one")
+        task = self.queue.claim()
+        self.queue.close()
+        self.queue = JobQueue(self.path)
+        self.assertEqual(self.queue.recover(), 1)
+        self.assertEqual(self.queue.claim()["idx"], task["idx"])
+
+    def test_failed_rows_can_be_retried(self):
+        job, _ = self.queue.add_job("fair", ["Firm name"], _rows("A"), "one")
+        self.queue.finish(self.queue.claim(), "failed", {"Firm name": "A"}, {}, "API error")
+        self.assertEqual(self.queue.retry_failed(job["id"]), 1)
+        self.assertEqual(self.queue.claim()["attempts"], 1)
+
+
+class UploadParsingTest(unittest.TestCase):
+    def test_csv_and_json_rows(self):
+        headers, rows = parse_csv_upload("\ufeffFirm name,HQ Country\nAcme,Germany\n".encode("utf-8"))
+        self.assertEqual((headers, rows), (["Firm name", "HQ Country"], [{"Firm name": "Acme", "HQ Country": "Germany"}]))
+        headers, rows = parse_json_rows({"rows": [{"Firm name": "Acme", "Employees": 12}, {"Firm name": "Beta"}]})
+        self.assertEqual(headers, ["Firm name", "Employees"])
+        self.assertEqual(rows[1], {"Firm name": "Beta", "Employees": ""})
+        with self.assertRaises(ValueError):
+            parse_json_rows({"rows": "Acme"})
+
+
+class PoolStub:
+    workers = 1
+
+
+class ServiceHandlerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.queue = JobQueue(os.path.join(directory.name, "jobs.sqlite"))
+        self.addCleanup(self.queue.close)
+        self.server = make_server(self.queue, PoolStub(), port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def _get(self, path):
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+        self.addCleanup(conn.close)
+        conn.request("GET", path)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_job_list_limit_is_validated(self):
+        self.queue.add_job("fair", ["Firm name"], _rows("A"), "one")
+        self.assertEqual(self._get("/jobs?limit=abc")[0], 400)
+        status, payload = self._get("/jobs?limit=-1")
+        self.assertEqual((status, payload["jobs"]), (200, []))
+        status, payload = self._get("/jobs?limit=100000")
+        self.assertEqual((status, len(payload["jobs"])), (200, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
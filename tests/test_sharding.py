@@ -0,0 +1,80 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from journal import CheckpointJournal, row_key
+from pipeline import iter_input_rows
+from sharding import merge_shards, parse_shard, shard_journal_paths, shard_of, shard_output_path
+
+
+HEADERS = ["Firm name", "Company Website", "GPT Score"]
+
+
+class ShardTest(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ("0/4", "5/4", "1/0", "x/2", "3"):
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+    def test_duplicates_share_a_shard(self):
+        row = {"Firm name": "Acme", "Company Website": "https://acme.io"}
+        same = {"Firm name": "Acme Europe", "Company Website": "www.acme.io/de"}
+        for count in (2, 3, 8):
+            self.assertEqual(shard_of(row, count), shard_of(same, count))
+            self.assertTrue(1 <= shard_of(row, count) <= count)
+        shards = {shard_of({"Firm name": f"Company {i}"}, 4) for i in range(40)}
+        self.assertEqual(shards, {1, 2, 3, 4})
+
+    def test_output_path(self):
+        self.assertEqual(shard_output_path("Project/output.csv", 2, 4), os.path.join("Project", "output.shard-2-of-4.csv"))
+
+
+class MergeShardsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.input = os.path.join(tmp.name, "input.csv")
+        self.output = os.path.join(tmp.name, "output.csv")
+        with open(self.input, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADERS[:2])
+            for i in range(12):
+                writer.writerow([f"Company {i}", f"company{i}.com"])
+        self.rows = list(iter_input_rows(self.input))
+
+    def _run_shards(self, count, skip=()):
+        for shard, path in enumerate(shard_journal_paths(self.output, count), 1):
+            with CheckpointJournal(path) as journal:
+                # Rows are appended out of order, as concurrent workers finish them
+                for idx, row in reversed(self.rows):
+                    if shard_of(row, count) == shard and idx not in skip:
+                        record_row = dict(zip(HEADERS, [row["Firm name"], row["Company Website"], str(idx)]))
+                        journal.append({"idx": idx, "key": row_key(row), "row": record_row})
+
+    def test_merge_in_input_order(self):
+        self._run_shards(3)
+        merged = []
+        self.assertEqual(merge_shards(self.input, self.output, 3, HEADERS, on_row=lambda idx, row: merged.append(idx)), [])
+        self.assertEqual(merged, [idx for idx, _ in self.rows])
+        with open(self.output, encoding="utf-8-sig", newline="") as f:
+            scores = [row["GPT Score"] for row in csv.DictReader(f)]
+        self.assertEqual(scores, [str(idx) for idx, _ in self.rows])
+
+    def test_missing_rows_keep_the_old_output(self):
+        self._run_shards(3, skip={self.rows[5][0]})
+        problems = merge_shards(self.input, self.output, 3, HEADERS)
+        self.assertEqual(len(problems), 1)
+        self.assertTrue(problems[0].startswith("1 rows missing from every shard"))
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_wrong_shard_count(self):
+        self._run_shards(2)
+        self.assertTrue(merge_shards(self.input, self.output, 3, HEADERS)[0].startswith("shard journal not found"))
+        problems = merge_shards(self.input, self.output, 2, HEADERS, journals=shard_journal_paths(self.output, 2)[::-1])
+        self.assertIn("rows in the wrong shard", problems[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
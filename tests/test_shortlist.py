@@ -0,0 +1,69 @@
+import csv
+import datetime
+import os
+import tempfile
+import unittest
+
+from shortlist import OVERALL, Shortlist, parse_tie_breakers
+
+
+TODAY = datetime.date(2025, 6, 1)
+
+
+def _row(name, score, sector="Fintech", **columns):
+    return dict({"Firm name": name, "GPT Score": score, "Analyzed Sector": sector}, **columns)
+
+
+class ShortlistTest(unittest.TestCase):
+    def _names(self, shortlist):
+        return {name: [columns["Firm name"] for _, _, columns in entries] for name, entries in shortlist.lists()}
+
+    def test_top_k_per_sector_and_overall(self):
+        shortlist = Shortlist(k=2, today=TODAY)
+        rows = [_row("A", "50"), _row("B", "90", "Education"), _row("C", "70"), _row("D", "80"),
+                _row("E", "N/A"), _row("F", "60", "")]
+        kept = [shortlist.add(idx, row) for idx, row in enumerate(rows, 1)]
+        self.assertEqual(kept, [True, True, True, True, False, True])
+        self.assertEqual(self._names(shortlist), {
+            OVERALL: ["B", "D"],
+            "Education": ["B"],
+            "Fintech": ["D", "C"],
+            "Unclassified": ["F"],
+        })
+        self.assertEqual(shortlist.ranked, 5)
+
+    def test_tie_breakers_then_input_order(self):
+        shortlist = Shortlist(k=4, today=TODAY)
+        shortlist.add(1, _row("Old funding", "70", **{"Last funding date": "2019"}))
+        shortlist.add(2, _row("No data", "70"))
+        shortlist.add(3, _row("Recent funding", "70", **{"Last funding date": "2024-11-05"}))
+        shortlist.add(4, _row("Also no data", "70"))
+        self.assertEqual(self._names(shortlist)[OVERALL], ["Recent funding", "Old funding", "No data", "Also no data"])
+
+        shortlist = Shortlist(k=3, tie_breakers=parse_tie_breakers("achilles, growth"), today=TODAY)
+        shortlist.add(1, _row("Shrinking", "70", **{"Employee growth % (last 12 months)": "-5%"}))
+        shortlist.add(2, _row("Growing", "70", **{"Employee growth % (last 12 months)": "12%"}))
+        shortlist.add(3, _row("Achilles", "70", **{"In Achilles": "Yes"}))
+        self.assertEqual(self._names(shortlist)[OVERALL], ["Achilles", "Growing", "Shrinking"])
+
+    def test_unknown_tie_breaker(self):
+        with self.assertRaises(ValueError):
+            parse_tie_breakers("funding,size")
+
+    def test_write(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "out", "output.shortlist.csv")
+        shortlist = Shortlist(k=1, today=TODAY)
+        shortlist.add(7, _row("A", "50", **{"Company Website": "a.io"}))
+        shortlist.write(path)
+        self.assertFalse(shortlist.changed)
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([(row["List"], row["Rank"], row["Row"], row["Company Website"]) for row in rows],
+                         [(OVERALL, "1", "7", "a.io"), ("Fintech", "1", "7", "a.io")])
+        self.assertNotIn("HQ Country", rows[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+import ranking
+from streaming import StreamedAnswer
+
+
+ROW = "| Acme | Generic | | 70 | Fine | | | | Input data |"
+
+
+def _answer(text, finish_reason="stop"):
+    answer = StreamedAnswer()
+    if not answer.feed(text):
+        answer.finish_reason = finish_reason
+        answer.finish()
+    return answer
+
+
+class StreamedCacheTest(unittest.TestCase):
+    def test_row_cut_off_after_the_table_is_cached(self):
+        answer = _answer(ROW + "\nSome prose after the row")
+        self.assertEqual(answer.outcome, "cut off")
+        self.assertTrue(ranking._cacheable(answer))
+
+    def test_answer_truncated_by_max_tokens_is_not_cached(self):
+        answer = _answer("| Acme | Gen", finish_reason="length")
+        self.assertEqual(answer.outcome, "max tokens")
+        self.assertFalse(ranking._cacheable(answer))
+
+    def test_complete_answer_without_a_row_is_not_cached(self):
+        self.assertFalse(ranking._cacheable(_answer("I cannot score this company.")))
+        self.assertTrue(ranking._cacheable(_answer(ROW)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import json
+import unittest
+
+from main import parse_analysis
+from structured import parse_structured, response_format, split_structured_batch
+
+
+ANSWER = {
+    "short_description": "Acme builds sensors",
+    "analyzed_sector": "IT and Cyber",
+    "gpt_score": 80,
+    "explanation": " Strong fit ",
+    "ecosystem_fit": "Good",
+    "utrecht_connections": "UU",
+    "sources": "site"
+}
+
+
+class ParseStructuredTest(unittest.TestCase):
+    def test_valid_answer(self):
+        self.assertEqual(parse_structured(json.dumps(ANSWER)),
+                         ("IT and Cyber", "80", "Strong fit", "Good", "UU", "site"))
+        fields, method = parse_analysis(json.dumps(ANSWER))
+        self.assertEqual((fields[1], method), ("80", "structured"))
+
+    def test_invalid_answers(self):
+        self.assertIsNone(parse_structured("| Acme | IT and Cyber | | 80 |"))
+        self.assertIsNone(parse_structured("{not json"))
+        self.assertIsNone(parse_structured(json.dumps(dict(ANSWER, gpt_score=120))))
+        self.assertIsNone(parse_structured(json.dumps(dict(ANSWER, gpt_score=True))))
+        self.assertIsNone(parse_structured(json.dumps(dict(ANSWER, analyzed_sector="Robotics"))))
+        missing = dict(ANSWER)
+        del missing["sources"]
+        self.assertIsNone(parse_structured(json.dumps(missing)))
+
+    def test_response_format(self):
+        self.assertEqual(response_format()["json_schema"]["name"], "fdi_analysis")
+        batch = response_format(batch=True)["json_schema"]
+        self.assertTrue(batch["strict"])
+        self.assertIn("company_key", batch["schema"]["properties"]["companies"]["items"]["required"])
+
+
+class SplitStructuredBatchTest(unittest.TestCase):
+    def test_companies_are_matched_by_key(self):
+        content = json.dumps({"companies": [
+            dict(ANSWER, company_key="ACME.io "),
+            dict(ANSWER, company_key="beta", gpt_score="high"),
+            dict(ANSWER, company_key="acme.io", gpt_score=10),
+            dict(ANSWER, company_key="other.com"),
+        ]})
+        rows = split_structured_batch(content, ["acme.io", "beta"])
+        self.assertEqual(list(rows), ["acme.io"])
+        self.assertEqual(parse_structured(rows["acme.io"])[1], "80")
+
+    def test_unusable_content(self):
+        self.assertEqual(split_structured_batch("not json", ["a"]), {})
+        self.assertEqual(split_structured_batch("[1, 2]", ["a"]), {})
+        self.assertEqual(split_structured_batch('{"companies": "none"}', ["a"]), {})
+
+
+if __name__ == "__main__":
+    unittest.main()